@@ -0,0 +1,451 @@
+"""Benchmarks MusicBrainzClient methods against the fake server.
+
+For every scenario, the entities it needs are created on the server first,
+then the method is called `--iterations` times. Reported are calls and edits
+(as counted by the server) per second, the p50 and p99 latency of a call,
+errors, and the peak memory allocated by a run of `--memory-iterations`
+calls, measured separately with tracemalloc since tracing slows the calls
+down.
+
+usage: python -m benchmarks.bench [--iterations N] [--latency S] ...
+"""
+
+import argparse
+import functools
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_server import FakeMusicBrainz
+from musicbrainz_bot.concurrency import AIMDConcurrency
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.merges import merge_many
+from musicbrainz_bot.pool import MusicBrainzClientPool
+from musicbrainz_bot.ratelimit import RateLimiter
+from musicbrainz_bot.retry import CircuitBreaker, RetryPolicy
+
+NOTE = "benchmark"
+AREA = {
+    "name": "benchmark area",
+    "comment": "benchmark",
+    "type_id": "3",
+    "iso_3166_3": ["XXBM"],
+    "url": [{"text": "https://www.wikidata.org/wiki/Q152", "link_type_id": 358}],
+}
+ALBUM = {
+    "_id": "cdbaby:benchmark",
+    "artist": "benchmark artist",
+    "title": "benchmark album",
+    "mediums": [
+        {
+            "format": "CD",
+            "position": 1,
+            "tracks": [
+                {"position": i, "title": "track %d" % i, "length": 180}
+                for i in range(1, 13)
+            ],
+        }
+    ],
+}
+
+
+# Each scenario returns `n` calls to time, creating what they need on the
+# server beforehand.
+
+
+def add_area(mb, server, n):
+    return [
+        functools.partial(mb.add_area, dict(AREA, name="area %d" % i), NOTE)
+        for i in range(n)
+    ]
+
+
+def edit_area(mb, server, n):
+    calls = []
+    for i in range(n):
+        gid = server.add_entity("area", name="area %d" % i)
+        update = dict(AREA, name="area %d edited" % i)
+        calls.append(functools.partial(mb.edit_area, gid, AREA, update, NOTE))
+    return calls
+
+
+def get_entity(mb, server, n):
+    gids = [server.add_entity("area", name="area %d" % i) for i in range(n)]
+    return [functools.partial(mb.get_entity, "area", gid) for gid in gids]
+
+
+def get_entity_cached(mb, server, n):
+    gid = server.add_entity("area", name="area")
+    mb.get_entity("area", gid)
+    return [functools.partial(mb.get_entity, "area", gid)] * n
+
+
+def add_url(mb, server, n):
+    gid = server.add_entity("artist", name="artist")
+    return [
+        functools.partial(mb.add_url, "artist", gid, 352, "https://e/%d" % i, NOTE)
+        for i in range(n)
+    ]
+
+
+def add_urls(mb, server, n, batch=50):
+    gid = server.add_entity("artist", name="artist")
+    return [
+        functools.partial(
+            mb.add_urls,
+            "artist",
+            [(gid, 352, "https://e/%d/%d" % (i, j)) for j in range(batch)],
+            NOTE,
+        )
+        for i in range(n)
+    ]
+
+
+def edit_artist(mb, server, n):
+    calls = []
+    for i in range(n):
+        artist = {"gid": server.add_entity("artist", name="artist %d" % i)}
+        artist.update(area=i + 1, type=1, comment="benchmark")
+        update = ["area", "type", "comment"]
+        calls.append(functools.partial(mb.edit_artist, artist, update, NOTE))
+    return calls
+
+
+def set_artist_type(mb, server, n):
+    gids = [server.add_entity("artist", name="artist %d" % i) for i in range(n)]
+    return [functools.partial(mb.set_artist_type, gid, 1, NOTE) for gid in gids]
+
+
+def edit_work(mb, server, n):
+    calls = []
+    for i in range(n):
+        work = {"gid": server.add_entity("work", name="work %d" % i), "type": 1}
+        calls.append(functools.partial(mb.edit_work, work, ["type"], NOTE))
+    return calls
+
+
+def edit_url(mb, server, n):
+    calls = []
+    for i in range(n):
+        old_url = "http://e/%d" % i
+        gid = server.add_entity("url", url=old_url)
+        calls.append(
+            functools.partial(mb.edit_url, gid, old_url, old_url + "/new", NOTE)
+        )
+    return calls
+
+
+def set_release_script(mb, server, n):
+    gids = [server.add_entity("release", name="r %d" % i, script=28) for i in range(n)]
+    return [functools.partial(mb.set_release_script, gid, 28, 29, NOTE) for gid in gids]
+
+
+def add_release(mb, server, n):
+    return [functools.partial(mb.add_release, ALBUM, NOTE) for _ in range(n)]
+
+
+def add_artist(mb, server, n):
+    return [
+        functools.partial(
+            mb.add_artist, {"name": "a %d" % i, "sort_name": "a %d" % i}, NOTE
+        )
+        for i in range(n)
+    ]
+
+
+def merge(mb, server, n):
+    calls = []
+    for i in range(n):
+        target = server.add_entity("artist", name="target %d" % i)
+        source = server.add_entity("artist", name="source %d" % i)
+        calls.append(functools.partial(mb.merge, "artist", [source], target, NOTE))
+    return calls
+
+
+def edits_left_today(mb, server, n):
+    return [mb.edits_left_today] * n
+
+
+SCENARIOS = [
+    add_area,
+    edit_area,
+    get_entity,
+    get_entity_cached,
+    add_url,
+    add_urls,
+    edit_artist,
+    set_artist_type,
+    edit_work,
+    edit_url,
+    set_release_script,
+    add_release,
+    add_artist,
+    merge,
+    edits_left_today,
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def time_calls(calls):
+    """Returns the latency of each call and the number of calls that raised."""
+    latencies, errors = [], 0
+    for call in calls:
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def peak_memory(calls):
+    tracemalloc.start()
+    try:
+        time_calls(calls)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def result(name, latencies, errors, elapsed, edits, memory):
+    return {
+        "scenario": name,
+        "calls": len(latencies),
+        "errors": errors,
+        "calls_per_second": len(latencies) / elapsed,
+        "edits_per_second": edits / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies),
+        "peak_memory": memory,
+    }
+
+
+def bench_scenario(scenario, mb, server, iterations, memory_iterations):
+    calls = scenario(mb, server, iterations)
+    edits = len(server.edits)
+    start = time.perf_counter()
+    latencies, errors = time_calls(calls)
+    elapsed = time.perf_counter() - start
+    edits = len(server.edits) - edits
+    memory = None
+    if memory_iterations:
+        memory = peak_memory(scenario(mb, server, memory_iterations))
+    return result(scenario.__name__, latencies, errors, elapsed, edits, memory)
+
+
+def retry_policy(args):
+    return RetryPolicy(
+        args.attempts,
+        args.backoff,
+        circuit_breaker=CircuitBreaker(args.breaker_threshold, args.breaker_cooldown),
+    )
+
+
+def client_pool(server, args, concurrency=None, cookie_dir=None):
+    return MusicBrainzClientPool(
+        server.username,
+        server.password,
+        server.url,
+        size=args.workers,
+        rate_limiter=RateLimiter(args.rate, args.burst),
+        retry=retry_policy(args),
+        cookie_dir=cookie_dir,
+        concurrency=concurrency,
+    )
+
+
+def bench_pool(server, args):
+    """add_area on a MusicBrainzClientPool, the batch runner's setup."""
+    concurrency = AIMDConcurrency(maximum=args.workers) if args.adaptive else None
+    with client_pool(server, args, concurrency, args.cookie_dir) as pool:
+
+        def timed(client, area):
+            start = time.perf_counter()
+            try:
+                client.add_area(area, NOTE)
+                return time.perf_counter() - start, False
+            except Exception:
+                return time.perf_counter() - start, True
+
+        edits = len(server.edits)
+        start = time.perf_counter()
+        futures = pool.submit_many(
+            (timed, (dict(AREA, name="pool area %d" % i),), {})
+            for i in range(args.iterations)
+        )
+        outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    name = "pool add_area (%d workers)" % args.workers
+    if concurrency is not None:
+        name = "pool add_area (limit %.1f)" % concurrency.limit
+    return result(
+        name,
+        [latency for (latency, _) in outcomes],
+        sum(failed for (_, failed) in outcomes),
+        elapsed,
+        len(server.edits) - edits,
+        None,
+    )
+
+
+def bench_merge_many(server, args):
+    """merge_many() on a pool, checking the groups through the web service."""
+    groups = []
+    for i in range(args.iterations):
+        target = server.add_entity("artist", name="target %d" % i)
+        source = server.add_entity("artist", name="source %d" % i)
+        groups.append(("artist", [target, source], target, NOTE))
+    # a session per client, each with its own merge queue
+    with client_pool(server, args) as pool:
+        edits = len(server.edits)
+        start = time.perf_counter()
+        entries = merge_many(pool, groups)
+        elapsed = time.perf_counter() - start
+    return result(
+        "merge_many (%d workers)" % args.workers,
+        [entry.get("latency", 0.0) for entry in entries],
+        sum(entry["status"] not in ("changed", "noop") for entry in entries),
+        elapsed,
+        len(server.edits) - edits,
+        None,
+    )
+
+
+def print_results(results, file=sys.stdout):
+    columns = "%-28s %7s %7s %9s %9s %9s %9s %10s"
+    print(
+        columns
+        % (
+            "scenario",
+            "calls",
+            "errors",
+            "calls/s",
+            "edits/s",
+            "p50 ms",
+            "p99 ms",
+            "peak KiB",
+        ),
+        file=file,
+    )
+    for r in results:
+        print(
+            columns
+            % (
+                r["scenario"],
+                r["calls"],
+                r["errors"],
+                "%.1f" % r["calls_per_second"],
+                "%.1f" % r["edits_per_second"],
+                "%.2f" % (r["p50"] * 1000),
+                "%.2f" % (r["p99"] * 1000),
+                "-" if r["peak_memory"] is None else "%d" % (r["peak_memory"] // 1024),
+            ),
+            file=file,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench",
+        description="Benchmark MusicBrainzClient against a local fake server.",
+    )
+    names = [scenario.__name__ for scenario in SCENARIOS] + ["pool", "merge_many"]
+    parser.add_argument(
+        "scenarios", nargs="*", metavar="SCENARIO", help="any of: " + ", ".join(names)
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--memory-iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int)
+    parser.add_argument(
+        "--capacity", type=int, help="requests the server handles at once"
+    )
+    parser.add_argument(
+        "--load-latency",
+        type=float,
+        default=0.0,
+        help="seconds of latency added per other request in flight",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--rate", type=float, default=1e6, help="requests per second allowed"
+    )
+    parser.add_argument("--burst", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4, help="pool size")
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="let the pool adapt its concurrency (AIMD), up to --workers",
+    )
+    parser.add_argument(
+        "--attempts", type=int, default=5, help="tries per request (1: no retries)"
+    )
+    parser.add_argument("--backoff", type=float, default=0.1, help="seconds")
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=5,
+        help="failures in a row that pause the client",
+    )
+    parser.add_argument("--breaker-cooldown", type=float, default=1.0, help="seconds")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(names)
+    if unknown:
+        parser.error("unknown scenarios: " + ", ".join(sorted(unknown)))
+
+    results = []
+    with tempfile.TemporaryDirectory() as cookie_dir, FakeMusicBrainz(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        capacity=args.capacity,
+        load_latency=args.load_latency,
+        seed=args.seed,
+    ) as server:
+        args.cookie_dir = cookie_dir
+        mb = MusicBrainzClient(
+            server.username,
+            server.password,
+            server.url,
+            editor_id=1,
+            rate_limiter=RateLimiter(args.rate, args.burst),
+            retry=retry_policy(args),
+            cookie_dir=cookie_dir,
+        )
+        for scenario in SCENARIOS:
+            if args.scenarios and scenario.__name__ not in args.scenarios:
+                continue
+            results.append(
+                bench_scenario(
+                    scenario, mb, server, args.iterations, args.memory_iterations
+                )
+            )
+        if not args.scenarios or "pool" in args.scenarios:
+            results.append(bench_pool(server, args))
+        if not args.scenarios or "merge_many" in args.scenarios:
+            results.append(bench_merge_many(server, args))
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
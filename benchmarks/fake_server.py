@@ -0,0 +1,601 @@
+"""A stand-in for the MusicBrainz website, serving just the pages and
+endpoints MusicBrainzClient uses, with configurable latency and errors.
+
+It keeps its entities in memory and accepts every well-formed edit, so the
+client can be exercised without a musicbrainz-docker instance:
+
+    with FakeMusicBrainz(latency=0.05) as server:
+        mb = MusicBrainzClient(server.username, server.password, server.url,
+                               editor_id=1, rate_limiter=RateLimiter(1e6, 1))
+        mb.add_area({"name": "foo"}, "bar")
+
+Pages follow the structure (form actions, control names, messages) of the
+real ones only as far as the client looks at it.
+"""
+
+import html
+import http.server
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+
+THANK_YOU = "<p>Thank you, your edit has been entered into the edit queue.</p>"
+NO_CHANGES = (
+    "<p>The data you have submitted does not make any changes to the data"
+    " already present.</p>"
+)
+
+# control name (after the "edit-<type>." prefix) -> entity field
+ENTITY_FIELDS = {
+    "artist": {
+        "name": "name",
+        "sort_name": "sort_name",
+        "area_id": "area",
+        "type_id": "type",
+        "gender_id": "gender",
+        "period.begin_date.year": "begin_date_year",
+        "period.begin_date.month": "begin_date_month",
+        "period.begin_date.day": "begin_date_day",
+        "period.end_date.year": "end_date_year",
+        "period.end_date.month": "end_date_month",
+        "period.end_date.day": "end_date_day",
+        "comment": "comment",
+    },
+    "work": {
+        "name": "name",
+        "type_id": "type",
+        "language_id": "language",
+        "comment": "comment",
+    },
+    "url": {"url": "url"},
+}
+RELEASE_FIELDS = {
+    "script_id": "script",
+    "language_id": "language",
+    "packaging_id": "packaging",
+}
+
+_PATH = re.compile(r"^/([a-z-]+)/([0-9a-f-]{36})(?:/([a-z_-]+))?$")
+
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>%s</title></head><body>
+%s
+</body></html>
+"""
+
+
+def _page(title, body):
+    return PAGE % (html.escape(title), body)
+
+
+def _input(name, value="", input_type="text"):
+    return '<input type="%s" name="%s" value="%s">' % (
+        input_type,
+        html.escape(name),
+        html.escape("" if value is None else str(value)),
+    )
+
+
+def _select(name, value, options):
+    return '<select name="%s"><option value=""></option>%s</select>' % (
+        html.escape(name),
+        "".join(
+            '<option value="%s"%s>%s</option>'
+            % (option, " selected" if str(value) == option else "", option)
+            for option in options
+        ),
+    )
+
+
+def _edit_form(action, prefix, controls):
+    return (
+        '<form action="%s" method="post">\n%s\n'
+        '<textarea name="%sedit_note"></textarea>\n'
+        '<input type="checkbox" name="%smake_votable" value="1">\n'
+        '<button type="submit" class="submit">Enter edit</button>\n'
+        "</form>" % (action, "\n".join(controls), prefix, prefix)
+    )
+
+
+def _hidden_form(action, pairs, extra=""):
+    return '<form action="%s" method="post">\n%s\n%s\n</form>' % (
+        action,
+        "\n".join(_input(key, value, "hidden") for (key, value) in pairs),
+        extra,
+    )
+
+
+class FakeMusicBrainz(object):
+    """Serves the fake website on 127.0.0.1 from a background thread.
+
+    Args:
+        latency (float): seconds every response is delayed by.
+        jitter (float): up to this many seconds are added at random.
+        error_rate (float): fraction of requests (other than the login pages)
+            answered with `error_status` instead.
+        error_status (int): e.g. 503 or 500.
+        retry_after (int, optional): Retry-After header sent with errors.
+        capacity (int, optional): requests handled at once; any more are
+            answered with `error_status` straight away, like an overloaded
+            server.
+        load_latency (float): seconds added to the latency for every other
+            request being handled.
+        seed: seed of the random number generator, for repeatable runs.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        retry_after=None,
+        capacity=None,
+        load_latency=0.0,
+        seed=None,
+        username="bot",
+        password="bot",
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.capacity = capacity
+        self.load_latency = load_latency
+        self.username = username
+        self.password = password
+        self.entities = {}
+        self.relationships = set()
+        self.edits = []
+        self.cancelled = set()
+        self.requests = 0
+        self.in_flight = 0
+        self._sessions = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"server_state": self})
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_entity(self, entity_type, **fields) -> str:
+        """Adds an entity and returns its MBID."""
+        gid = str(uuid.uuid4())
+        with self._lock:
+            self.entities.setdefault(entity_type, {})[gid] = dict(fields)
+        return gid
+
+    def get_entity(self, entity_type, gid):
+        return self.entities.get(entity_type, {}).get(gid)
+
+    def _record_edit(self, summary):
+        with self._lock:
+            self.edits.append(summary)
+            return len(self.edits)
+
+    def _delay(self):
+        """Waits out the latency of a request; returns whether to fail it."""
+        with self._lock:
+            self.requests += 1
+            if self.capacity is not None and self.in_flight >= self.capacity:
+                return True
+            self.in_flight += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            delay += self.load_latency * (self.in_flight - 1)
+            failed = self._random.random() < self.error_rate
+        try:
+            time.sleep(delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return failed
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; without TCP_NODELAY every
+    # keep-alive response waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+    server_state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # responses
+
+    def _send(self, status, body, content_type="text/html", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type + "; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _html(self, title, body, status=200):
+        self._send(status, _page(title, body))
+
+    def _redirect(self, path, headers=()):
+        location = self.server_state.url + path
+        self._send(302, "", headers=(("Location", location),) + tuple(headers))
+
+    def _not_found(self):
+        self._html("Not found", "<p>Page not found</p>", 404)
+
+    # requests
+
+    def _session(self):
+        cookies = self.headers.get("Cookie", "")
+        m = re.search(r"(?:^|;\s*)session=([0-9a-f]+)", cookies)
+        return m is not None and m.group(1) in self.server_state._sessions
+
+    def _read_pairs(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        return urllib.parse.parse_qsl(body, keep_blank_values=True)
+
+    def _handle(self, method):
+        state = self.server_state
+        url = urllib.parse.urlsplit(self.path)
+        path = url.path
+        pairs = self._read_pairs() if method == "POST" else []
+        failed = state._delay()
+        if failed and not (path == "/login" or path.startswith("/user/")):
+            headers = ()
+            if state.retry_after is not None:
+                headers = (("Retry-After", str(state.retry_after)),)
+            return self._send(
+                state.error_status, "Service unavailable", "text/plain", headers
+            )
+        if method == "POST" and path != "/login" and not self._session():
+            return self._html("Forbidden", "<p>You need to be logged in.</p>", 403)
+        query = urllib.parse.parse_qs(url.query)
+        handler = getattr(self, "_%s_%s" % (method.lower(), _route(path)), None)
+        if handler is None:
+            return self._not_found()
+        return handler(path, query, pairs)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    # login and edit searches
+
+    def _get_login(self, path, query, pairs):
+        if self._session():
+            return self._redirect("/user/" + self.server_state.username)
+        self._html(
+            "Log in",
+            '<form action="/login" method="post">\n'
+            + _input("username")
+            + _input("password", input_type="password")
+            + '<input type="checkbox" name="remember_me" value="1">'
+            + '<button type="submit">Log in</button>\n</form>',
+        )
+
+    def _post_login(self, path, query, pairs):
+        state = self.server_state
+        fields = dict(pairs)
+        if (fields.get("username"), fields.get("password")) != (
+            state.username,
+            state.password,
+        ):
+            return self._get_login(path, query, pairs)
+        session = uuid.uuid4().hex
+        state._sessions.add(session)
+        cookie = "session=%s; Path=/" % (session,)
+        if fields.get("remember_me"):
+            cookie += "; Max-Age=31536000"
+        self._redirect("/user/" + state.username, [("Set-Cookie", cookie)])
+
+    def _get_user(self, path, query, pairs):
+        self._html("Editor", "<h1>%s</h1>" % html.escape(path.split("/")[2]))
+
+    def _get_search_edits(self, path, query, pairs):
+        self._html(
+            "Search edits", "<p>Found %d edits</p>" % len(self.server_state.edits)
+        )
+
+    def _get_user_edits(self, path, query, pairs):
+        state = self.server_state
+        edits = "\n".join(
+            '<h2><a href="%s/edit/%d">Edit #%d</a></h2>'
+            '<div class="edit-details">%s</div>\n'
+            '<textarea name="enter-vote.vote.%d.edit_note"></textarea>'
+            % (state.url, edit_nr, edit_nr, html.escape(summary), i)
+            for (i, (edit_nr, summary)) in enumerate(
+                reversed(list(enumerate(state.edits, 1))[-50:])
+            )
+        )
+        self._html(
+            "Edits",
+            '<form action="/edit/enter_votes" method="post">\n%s\n</form>' % edits,
+        )
+
+    def _post_edit_enter_votes(self, path, query, pairs):
+        self._html("Edits", "<p>Your votes have been entered.</p>")
+
+    def _get_edit(self, path, query, pairs):
+        edit_nr = int(path.split("/")[2])
+        status = "Cancelled" if edit_nr in self.server_state.cancelled else "Open"
+        self._html("Edit", "<h1>Edit %d</h1><p>%s</p>" % (edit_nr, status))
+
+    def _cancellable(self, path):
+        edit_nr = int(path.split("/")[2])
+        state = self.server_state
+        return 0 < edit_nr <= len(state.edits) and edit_nr not in state.cancelled
+
+    def _get_cancel_edit(self, path, query, pairs):
+        if not self._cancellable(path):
+            return self._html("Cancel edit", "<p>This edit cannot be cancelled.</p>")
+        self._html(
+            "Cancel edit",
+            '<form action="%s" method="post">\n'
+            '<textarea name="confirm.edit_note"></textarea>\n'
+            '<button type="submit">Cancel edit</button>\n</form>' % path,
+        )
+
+    def _post_cancel_edit(self, path, query, pairs):
+        if not self._cancellable(path):
+            return self._html("Cancel edit", "<p>This edit cannot be cancelled.</p>")
+        self.server_state.cancelled.add(int(path.split("/")[2]))
+        self._redirect("/edit/" + path.split("/")[2])
+
+    # web service
+
+    def _get_ws(self, path, query, pairs):
+        _, _, _, entity_type, gid = path.split("/")
+        entity = self.server_state.get_entity(entity_type, gid)
+        if entity is None:
+            return self._send(
+                404, json.dumps({"error": "Not Found"}), "application/json"
+            )
+        self._send(200, json.dumps(dict(entity, id=gid)), "application/json")
+
+    def _post_relationship_editor(self, path, query, pairs):
+        state = self.server_state
+        rels = {}
+        for key, value in pairs:
+            m = re.match(r"rel-editor\.rels\.(\d+)\.(.*)$", key)
+            if m is not None:
+                rels.setdefault(int(m.group(1)), {})[m.group(2)] = value
+        edits = []
+        for _, rel in sorted(rels.items()):
+            rel_key = tuple(sorted((k, v) for (k, v) in rel.items() if k != "action"))
+            with state._lock:
+                exists = rel_key in state.relationships
+                if rel.get("action") == "remove":
+                    state.relationships.discard(rel_key)
+                else:
+                    state.relationships.add(rel_key)
+            if exists and rel.get("action") == "add":
+                edits.append({"message": "no changes"})
+            else:
+                edit_id = state._record_edit("relationship " + rel.get("action", ""))
+                edits.append({"message": "OK", "edit_id": edit_id})
+        if not edits:
+            return self._send(
+                400, json.dumps({"error": "no relationships"}), "application/json"
+            )
+        self._send(200, json.dumps({"edits": edits}), "application/json")
+
+    # areas
+
+    def _post_area_create(self, path, query, pairs):
+        fields = _prefixed(pairs, "edit-area.")
+        fields.pop("edit_note", None)
+        if not fields.get("name"):
+            return self._html("Add area", "<p>Required field.</p>")
+        gid = self.server_state.add_entity("area", **fields)
+        self.server_state._record_edit("add area " + fields["name"])
+        self._redirect("/area/" + gid)
+
+    def _post_entity_edit_area(self, path, query, pairs, gid):
+        area = self.server_state.get_entity("area", gid)
+        fields = _prefixed(pairs, "edit-area.")
+        fields.pop("edit_note", None)
+        urls = {k: v for (k, v) in fields.items() if k.startswith("url.")}
+        changed = urls or any(area.get(k) != v for (k, v) in fields.items())
+        area.update(fields)
+        if changed:
+            self.server_state._record_edit("edit area " + gid)
+        self._redirect("/area/" + gid)
+
+    # artists, works and URLs
+
+    def _get_artist_create(self, path, query, pairs):
+        self._html(
+            "Add artist",
+            _edit_form(
+                "/artist/create",
+                "edit-artist.",
+                [_input("edit-artist.name"), _input("edit-artist.sort_name")],
+            ),
+        )
+
+    def _post_artist_create(self, path, query, pairs):
+        fields = _prefixed(pairs, "edit-artist.")
+        gid = self.server_state.add_entity(
+            "artist", name=fields.get("name"), sort_name=fields.get("sort_name")
+        )
+        self.server_state._record_edit("add artist " + gid)
+        self._redirect("/artist/" + gid)
+
+    def _get_entity_edit(self, path, query, pairs, entity_type, gid, entity):
+        prefix = "edit-%s." % entity_type
+        controls = []
+        for control, field in ENTITY_FIELDS[entity_type].items():
+            if control == "type_id":
+                controls.append(
+                    _select(prefix + control, entity.get(field), ["1", "2", "3", "4"])
+                )
+            else:
+                controls.append(_input(prefix + control, entity.get(field)))
+        self._html("Edit", _edit_form(path, prefix, controls))
+
+    def _post_entity_edit(self, path, query, pairs, entity_type, gid, entity):
+        fields = _prefixed(pairs, "edit-%s." % entity_type)
+        changed = False
+        for control, field in ENTITY_FIELDS[entity_type].items():
+            value = fields.get(control, "")
+            if str(entity.get(field) or "") != value:
+                entity[field] = value or None
+                changed = True
+        if not changed:
+            return self._html("Edit", NO_CHANGES)
+        self.server_state._record_edit("edit %s %s" % (entity_type, gid))
+        self._html("Edit", THANK_YOU)
+
+    # releases
+
+    def _post_release_add(self, path, query, pairs):
+        seed = [(k, v) for (k, v) in pairs if k not in ("save", "make_votable")]
+        if not any(key == "save" for (key, _) in pairs):
+            return self._html(
+                "Add release",
+                _hidden_form(
+                    "/release/add",
+                    seed,
+                    '<input type="checkbox" name="make_votable" value="1">',
+                ),
+            )
+        fields = dict(seed)
+        gid = self.server_state.add_entity("release", name=fields.get("name"))
+        self.server_state._record_edit("add release " + gid)
+        self._redirect("/release/" + gid)
+
+    def _get_release_edit(self, path, query, pairs, gid, release):
+        controls = [
+            _select(control, release.get(field), [str(i) for i in range(1, 30)])
+            for (control, field) in RELEASE_FIELDS.items()
+        ]
+        controls.append('<input type="checkbox" name="barcode_confirm" value="1">')
+        self._html(
+            "Edit release",
+            '<form action="%s" method="post">\n%s\n'
+            '<button type="submit" name="step_editnote">Edit note</button>\n'
+            "</form>" % (path, "\n".join(controls)),
+        )
+
+    def _post_release_edit(self, path, query, pairs, gid, release):
+        keys = [key for (key, _) in pairs]
+        fields = [(k, v) for (k, v) in pairs if k not in ("step_editnote", "save")]
+        if "save" not in keys:
+            return self._html(
+                "Edit release",
+                _hidden_form(
+                    path,
+                    [(k, v) for (k, v) in fields if k not in ("edit_note",)],
+                    '<textarea name="edit_note"></textarea>\n'
+                    '<input type="checkbox" name="make_votable" value="1">',
+                ),
+            )
+        for control, field in RELEASE_FIELDS.items():
+            value = dict(fields).get(control, "")
+            release[field] = int(value) if value else None
+        self.server_state._record_edit("edit release " + gid)
+        self._redirect("/release/" + gid)
+
+    # merges and entity pages
+
+    def _post_merge_queue(self, path, query, pairs):
+        self._html("Merge", "<p>You are about to merge the following entities</p>")
+
+    def _post_merge(self, path, query, pairs):
+        state = self.server_state
+        entity_type = path.split("/")[1]
+        fields = dict(pairs)
+        target = fields.get("merge.target")
+        if state.get_entity(entity_type, target) is None:
+            return self._html("Merge", "<p>Invalid target.</p>")
+        with state._lock:
+            for key, gid in pairs:
+                if key.startswith("merge.merging.") and gid != target:
+                    state.entities[entity_type].pop(gid, None)
+        state._record_edit("merge %s into %s" % (entity_type, target))
+        self._html("Merge", THANK_YOU)
+
+    def _get_entity(self, path, query, pairs, entity_type, gid, entity):
+        title = "Release information" if entity_type == "release" else entity_type
+        self._html(title, "<h1>%s</h1>" % html.escape(str(entity.get("name"))))
+
+    def _get_entity_path(self, path, query, pairs):
+        return self._entity_path("get", path, query, pairs)
+
+    def _post_entity_path(self, path, query, pairs):
+        return self._entity_path("post", path, query, pairs)
+
+    def _entity_path(self, method, path, query, pairs):
+        entity_type, gid, action = _PATH.match(path).groups()
+        entity = self.server_state.get_entity(entity_type, gid)
+        if entity is None:
+            return self._not_found()
+        if action is None and method == "get":
+            return self._get_entity(path, query, pairs, entity_type, gid, entity)
+        if action != "edit":
+            return self._not_found()
+        if entity_type == "release":
+            handler = getattr(self, "_%s_release_edit" % method)
+            return handler(path, query, pairs, gid, entity)
+        if entity_type == "area" and method == "post":
+            return self._post_entity_edit_area(path, query, pairs, gid)
+        if entity_type not in ENTITY_FIELDS:
+            return self._not_found()
+        handler = getattr(self, "_%s_entity_edit" % method)
+        return handler(path, query, pairs, entity_type, gid, entity)
+
+
+def _prefixed(pairs, prefix):
+    end = len(prefix)
+    return {k[end:]: v for (k, v) in pairs if k.startswith(prefix)}
+
+
+def _route(path):
+    if path.startswith("/ws/2/"):
+        return "ws"
+    if _PATH.match(path):
+        return "entity_path"
+    if re.match(r"^/user/[^/]+/edits$", path):
+        return "user_edits"
+    if path.startswith("/user/"):
+        return "user"
+    if re.match(r"^/edit/\d+/cancel$", path):
+        return "cancel_edit"
+    if re.match(r"^/edit/\d+$", path):
+        return "edit"
+    if re.match(r"^/[a-z-]+/merge_queue$", path):
+        return "merge_queue"
+    if re.match(r"^/[a-z-]+/merge$", path):
+        return "merge"
+    return path.strip("/").replace("/", "_").replace("-", "_")
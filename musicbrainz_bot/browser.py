@@ -0,0 +1,61 @@
+import collections
+
+import mechanize
+
+
+class BoundedHistory(object):
+    """mechanize browser history that keeps only the last `maxlen` pages
+    (none by default), closing the responses of the ones it drops.
+    mechanize's own history keeps every page visited, with its body, for
+    the life of the browser.
+    """
+
+    def __init__(self, maxlen=0):
+        self.maxlen = maxlen
+        self._history = collections.deque()
+
+    def add(self, request, response):
+        self._history.append((request, response))
+        while len(self._history) > self.maxlen:
+            _, old = self._history.popleft()
+            if old is not None:
+                old.close()
+
+    def back(self, n, _response):
+        response = _response
+        while n > 0 or response is None:
+            try:
+                request, response = self._history.pop()
+            except IndexError:
+                raise mechanize.BrowserStateError("already at start of history")
+            n -= 1
+        return request, response
+
+    def clear(self):
+        self._history.clear()
+
+    def close(self):
+        for _, response in self._history:
+            if response is not None:
+                response.close()
+        self._history.clear()
+
+    def __copy__(self):
+        copy = self.__class__(self.maxlen)
+        copy._history = collections.deque(self._history)
+        return copy
+
+
+def new_browser(headers, cookiejar, history_size=None) -> mechanize.Browser:
+    """Returns a browser sending `headers` and sharing `cookiejar`, with a
+    BoundedHistory of `history_size` pages, or mechanize's unbounded one if
+    it is None.
+    """
+    history = None if history_size is None else BoundedHistory(history_size)
+    b = mechanize.Browser(history=history)
+    b.set_handle_robots(False)
+    b.set_debug_redirects(False)
+    b.set_debug_http(False)
+    b.addheaders = list(headers)
+    b.set_cookiejar(cookiejar)
+    return b
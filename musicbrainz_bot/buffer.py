@@ -0,0 +1,155 @@
+import collections
+import threading
+import time
+
+# item of an edit_artist() / edit_work() update -> the entity keys holding its value
+DATE_KEYS = {
+    "begin_date": ("begin_date_year", "begin_date_month", "begin_date_day"),
+    "end_date": ("end_date_year", "end_date_month", "end_date_day"),
+}
+
+
+def _value(entity, item):
+    return tuple(
+        None if entity.get(key) is None else str(entity.get(key))
+        for key in DATE_KEYS.get(item, (item,))
+    )
+
+
+class EditBuffer(object):
+    """Collects edit_artist(), set_artist_type() and edit_work() calls and
+    submits the ones for the same entity as a single edit, so that several
+    updates to one artist cost one page fetch, one submit and one edit of
+    the daily quota instead of one each.
+
+    Updates to an entity are merged as long as they set different items, or
+    the same item to the same value; an update that conflicts with a pending
+    one submits the pending edit first. The edit notes of the merged updates
+    are joined, and the edit is an auto-edit only if all of them asked for
+    one. Merged edits are submitted with partial=True, so an item that is
+    already set only drops that item, as it would have dropped its own edit.
+
+    Pending edits are submitted by flush(), when `max_pending` entities have
+    pending edits, when an update is added more than `window` seconds after
+    the oldest pending one, and at the end of a with block:
+
+        with EditBuffer(mb, window=60) as edits:
+            edits.edit_artist(artist, ["area"], "area from Wikidata")
+            edits.set_artist_type(artist["gid"], 1, "type from Wikidata")
+
+    Args:
+        client: a MusicBrainzClient
+        window (float, optional): seconds an edit may stay pending, checked
+            whenever an update is added. Defaults to None, no limit.
+        max_pending (int, optional): entities to collect before submitting.
+    """
+
+    def __init__(self, client, window=None, max_pending=1000):
+        self.client = client
+        self.window = window
+        self.max_pending = max_pending
+        self.results = []
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def edit_artist(self, artist, update, edit_note, auto=False):
+        self._add("artist", artist, update, edit_note, auto)
+
+    def set_artist_type(self, entity_id, type_id, edit_note, auto=False):
+        self._add(
+            "artist", {"gid": entity_id, "type": type_id}, ["type"], edit_note, auto
+        )
+
+    def edit_work(self, work, update, edit_note, auto=False):
+        self._add("work", work, update, edit_note, auto)
+
+    def _add(self, entity_type, entity, update, edit_note, auto):
+        key = (entity_type, entity["gid"])
+        ready = []
+        with self._lock:
+            edit = self._pending.get(key)
+            if edit is not None and any(
+                item in edit["update"]
+                and _value(entity, item) != _value(edit["entity"], item)
+                for item in update
+            ):
+                ready.append(self._pending.pop(key))
+                edit = None
+            if edit is None:
+                edit = self._pending[key] = {
+                    "entity_type": entity_type,
+                    "entity": {},
+                    "update": [],
+                    "edit_notes": [],
+                    "auto": True,
+                    "added": time.monotonic(),
+                }
+            for item in update:
+                if item not in edit["update"]:
+                    edit["update"].append(item)
+                for entity_key in DATE_KEYS.get(item, (item,)):
+                    edit["entity"][entity_key] = entity.get(entity_key)
+            edit["entity"]["gid"] = entity["gid"]
+            if edit_note not in edit["edit_notes"]:
+                edit["edit_notes"].append(edit_note)
+            edit["auto"] = edit["auto"] and auto
+            if len(self._pending) >= self.max_pending or self._expired():
+                ready.extend(self._pending.values())
+                self._pending.clear()
+        self._submit(ready)
+
+    def _expired(self):
+        if self.window is None or not self._pending:
+            return False
+        oldest = next(iter(self._pending.values()))
+        return time.monotonic() - oldest["added"] >= self.window
+
+    def flush(self) -> list:
+        """Submits all pending edits.
+
+        Returns:
+            list: (entity type, MBID, result of the client method) for each
+                edit submitted since the previous flush(), also the ones
+                submitted automatically. If the method raised, the result is
+                the exception; the other edits are still submitted.
+        """
+        with self._lock:
+            ready = list(self._pending.values())
+            self._pending.clear()
+        self._submit(ready)
+        with self._lock:
+            results, self.results = self.results, []
+        return results
+
+    def _submit(self, edits):
+        precheck = getattr(self.client, "precheck", None)
+        if precheck is not None:
+            # one mirror query for the whole batch rather than one per edit
+            precheck.prefetch_calls(
+                ("edit_" + edit["entity_type"], (edit["entity"],), {}) for edit in edits
+            )
+        for edit in edits:
+            method = getattr(self.client, "edit_" + edit["entity_type"])
+            try:
+                result = method(
+                    edit["entity"],
+                    edit["update"],
+                    "\n\n".join(edit["edit_notes"]),
+                    auto=edit["auto"],
+                    partial=True,
+                )
+            except Exception as e:
+                result = e
+            with self._lock:
+                self.results.append(
+                    (edit["entity_type"], edit["entity"]["gid"], result)
+                )
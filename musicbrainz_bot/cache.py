@@ -0,0 +1,107 @@
+import collections
+import json
+import sqlite3
+import threading
+import time
+
+
+class EntityCache(object):
+    """Read-through cache for /ws/2 entity lookups, used by
+    MusicBrainzClient.get_entity().
+
+    Entries are kept in an in-memory LRU of `maxsize` lookups and, if `path`
+    is given, in an SQLite file, so that they survive between runs. An entry
+    expires `ttl` seconds after it was fetched; `ttls` overrides that per
+    entity type, e.g. {"area": 7 * 86400}. Lookups of the same entity with
+    different inc= sets are cached separately, and invalidate() drops all of
+    them. Entries are kept as JSON text, so that every get() returns a copy
+    that the caller may modify.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600, ttls=None, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._incs = collections.defaultdict(set)
+        self._local = threading.local()
+        if path is not None:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS entity ("
+                " entity_type TEXT NOT NULL,"
+                " mbid TEXT NOT NULL,"
+                " inc TEXT NOT NULL,"
+                " fetched REAL NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (entity_type, mbid, inc))"
+            )
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def _fresh(self, entity_type, fetched):
+        return time.time() - fetched < self.ttls.get(entity_type, self.ttl)
+
+    def _remember(self, key, fetched, text):
+        self._entries[key] = (fetched, text)
+        self._entries.move_to_end(key)
+        self._incs[key[:2]].add(key[2])
+        while len(self._entries) > self.maxsize:
+            old, _ = self._entries.popitem(last=False)
+            self._incs[old[:2]].discard(old[2])
+            if not self._incs[old[:2]]:
+                del self._incs[old[:2]]
+
+    def get(self, entity_type, mbid, inc=""):
+        """Returns the cached lookup, or None if it is missing or expired."""
+        key = (entity_type, mbid, inc)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entity_type, entry[0]):
+                self._entries.move_to_end(key)
+                return json.loads(entry[1])
+        if self.path is None:
+            return None
+        row = (
+            self._connection()
+            .execute(
+                "SELECT fetched, data FROM entity"
+                " WHERE entity_type = ? AND mbid = ? AND inc = ?",
+                key,
+            )
+            .fetchone()
+        )
+        if row is None or not self._fresh(entity_type, row[0]):
+            return None
+        with self._lock:
+            self._remember(key, row[0], row[1])
+        return json.loads(row[1])
+
+    def put(self, entity_type, mbid, inc, data):
+        key = (entity_type, mbid, inc)
+        fetched = time.time()
+        text = json.dumps(data)
+        with self._lock:
+            self._remember(key, fetched, text)
+        if self.path is not None:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entity VALUES (?, ?, ?, ?, ?)",
+                key + (fetched, text),
+            )
+
+    def invalidate(self, entity_type, mbid):
+        """Forgets every cached lookup of an entity, e.g. after editing it."""
+        with self._lock:
+            for inc in self._incs.pop((entity_type, mbid), ()):
+                self._entries.pop((entity_type, mbid, inc), None)
+        if self.path is not None:
+            self._connection().execute(
+                "DELETE FROM entity WHERE entity_type = ? AND mbid = ?",
+                (entity_type, mbid),
+            )
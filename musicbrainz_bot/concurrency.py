@@ -0,0 +1,80 @@
+import threading
+
+from musicbrainz_bot.metrics import endpoint
+
+# statuses with which the server says it is overloaded
+OVERLOAD_STATUSES = (429, 503)
+
+
+class AIMDConcurrency(object):
+    """Limits the number of requests in flight, adapting the limit to how
+    the server copes (additive increase, multiplicative decrease).
+
+    Every request that completes in time raises the limit by `increase` /
+    limit, i.e. by `increase` once per round of `limit` requests. An
+    overload (429, 503 or a connection error) or a latency spike (a request
+    taking `latency_tolerance` times the usual latency of its endpoint)
+    multiplies it by `decrease`. Requests sent before a cut cannot cause
+    another one, so that a single burst of errors only halves the limit
+    once. The limit stays between `minimum` and `maximum`.
+
+    Shared by the clients of a MusicBrainzClientPool (of size `maximum`), it
+    lets the pool run as many requests at once as the server can take at
+    the time. This only helps if the rate limiter allows more than one
+    request per round trip.
+    """
+
+    def __init__(
+        self,
+        initial=1,
+        minimum=1,
+        maximum=16,
+        increase=1.0,
+        decrease=0.5,
+        latency_tolerance=2.0,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._sent = 0
+        self._cut_after = 0
+        self._latencies = {}
+
+    def acquire(self) -> int:
+        """Blocks until another request may be sent and returns a ticket
+        to pass to release().
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self._sent += 1
+            return self._sent
+
+    def release(self, ticket, url, seconds, status):
+        """Reports a request as done, with its latency and status ("error"
+        if no response was received).
+        """
+        with self._cond:
+            self.in_flight -= 1
+            key = endpoint(url)
+            usual = self._latencies.get(key)
+            # the usual latency follows lasting changes within some 10 requests
+            self._latencies[key] = (
+                seconds if usual is None else usual + 0.1 * (seconds - usual)
+            )
+            overloaded = status == "error" or status in OVERLOAD_STATUSES
+            if usual is not None and seconds > usual * self.latency_tolerance:
+                overloaded = True
+            if overloaded:
+                if ticket > self._cut_after:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._cut_after = self._sent
+            elif status < 500:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
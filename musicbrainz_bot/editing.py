@@ -1,15 +1,33 @@
+import functools
+import itertools
 import mechanize
+import os
+import requests
 import urllib.error
 import urllib.parse
 import urllib.request
-import time
 import re
-import json
+import tempfile
+import time
 from datetime import datetime
 
-
-def format_time(secs):
-    return "%0d:%02d" % (secs // 60, secs % 60)
+from musicbrainz_bot.browser import new_browser
+from musicbrainz_bot.cache import EntityCache
+from musicbrainz_bot.forms import Form, extract_form
+from musicbrainz_bot.metrics import Metrics, instrumented
+from musicbrainz_bot.payload import format_time  # noqa: F401
+from musicbrainz_bot.payload import (
+    added_items,
+    changed_fields,
+    iter_album_form,
+    iter_payload,
+    urlencode_pairs,
+)
+from musicbrainz_bot.quota import EditQuota
+from musicbrainz_bot.ratelimit import RateLimiter, parse_retry_after
+from musicbrainz_bot.retry import IDEMPOTENT_METHODS, RetryPolicy
+
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
 
 
 def create_payload(template: dict, prefix: str, required_fields: list) -> dict:
@@ -57,76 +75,11 @@ def create_payload(template: dict, prefix: str, required_fields: list) -> dict:
     }
     """
 
-    payload = {}
-    # e.g. field = "edit-area.name", value = "Japan"
-    for field, value in template.items():
-        field = prefix + "." + field
-        # If none, either skip or raise error
-        if value is None:
-            if field in required_fields:
-                raise Exception("Missing required field: " + field)
-            else:
-                pass
-
-        # Check if value is iterable
-        elif isinstance(value, list):
-            # e.g. value = ["JP", "JPN"], value_in_list = "JP"
-            for i, value_in_list in enumerate(value):
-                # Expand field for list of strings (used for ISO codes)
-                if isinstance(value_in_list, str):
-                    # e.g. field = "edit-area.iso_3166_1" field_extension = "edit-area.iso_3166_1.0"
-                    field_extension = f"{field}.{i}"
-                    payload[field_extension] = value_in_list
-
-                # Expand field for list of dicts (used for external links / url)
-                if isinstance(value_in_list, dict):
-                    # e.g. value_in_dict = {"url": "https://www.example.com", "link_type": 1}
-                    # e.g. field = "edit-area.url.0", field_subextension = "edit-area.url.0.url"
-                    for (
-                        field_subextension,
-                        value_in_dict,
-                    ) in value_in_list.items():
-                        field_extension = f"{field}.{i}.{field_subextension}"
-                        payload[field_extension] = value_in_dict
-
-        else:
-            payload[field] = value
-
-    return payload
+    return dict(iter_payload(template, prefix, required_fields))
 
 
 def album_to_form(album):
-    form = {}
-    form["artist_credit.names.0.artist.name"] = album["artist"]
-    form["artist_credit.names.0.name"] = album["artist"]
-    if album.get("artist_mbid"):
-        form["artist_credit.names.0.mbid"] = album["artist_mbid"]
-    form["name"] = album["title"]
-    if album.get("date"):
-        date_parts = album["date"].split("-")
-        if len(date_parts) > 0:
-            form["date.year"] = date_parts[0]
-            if len(date_parts) > 1:
-                form["date.month"] = date_parts[1]
-                if len(date_parts) > 2:
-                    form["date.day"] = date_parts[2]
-    if album.get("label"):
-        form["labels.0.name"] = album["label"]
-    if album.get("barcode"):
-        form["barcode"] = album["barcode"]
-    for medium_no, medium in enumerate(album["mediums"]):
-        form["mediums.%d.format" % medium_no] = medium["format"]
-        form["mediums.%d.position" % medium_no] = medium["position"]
-        for track_no, track in enumerate(medium["tracks"]):
-            form["mediums.%d.track.%d.position" % (medium_no, track_no)] = track[
-                "position"
-            ]
-            form["mediums.%d.track.%d.name" % (medium_no, track_no)] = track["title"]
-            form["mediums.%d.track.%d.length" % (medium_no, track_no)] = format_time(
-                track["length"]
-            )
-    form["edit_note"] = "http://www.cdbaby.com/cd/" + album["_id"].split(":")[1]
-    return form
+    return dict(iter_album_form(album))
 
 
 class MusicBrainzClient(object):
@@ -137,22 +90,140 @@ class MusicBrainzClient(object):
         server="https://musicbrainz.org",
         editor_id=None,
         use_test_db=False,
+        rate_limiter=None,
+        cookie_dir=None,
+        quota=None,
+        timeout=60,
+        precheck=None,
+        cache=None,
+        default_inc=(),
+        metrics=None,
+        retry=None,
+        concurrency=None,
+        history_size=None,
+        recycle_after=None,
+        lookups=None,
     ):
+        """Logs in to `server`.
+
+        With `lookups` (a LookupTables), methods taking type, link type,
+        language, script or packaging IDs also take their names, and reject
+        unknown values before making any request.
+
+        For long runs, `history_size` bounds the number of pages the
+        mechanize browser keeps in its history (e.g. 0, since the client
+        never goes back) and `recycle_after` replaces the browser with a new
+        one, sharing the session cookies, after that many browser requests.
+        By default the browser keeps every page it visits until the client
+        is discarded.
+        """
         self.server = server
         self.username = username
         self.editor_id = editor_id
-        self.b = mechanize.Browser()
-        self.b.set_handle_robots(False)
-        self.b.set_debug_redirects(False)
-        self.b.set_debug_http(False)
-        self.b.addheaders = [
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.quota = quota or EditQuota()
+        self.timeout = timeout
+        self.precheck = precheck
+        self.cache = cache or EntityCache()
+        self.default_inc = default_inc
+        self.metrics = metrics or Metrics()
+        self.retry = retry or RetryPolicy()
+        self.concurrency = concurrency
+        self.history_size = history_size
+        self.recycle_after = recycle_after
+        self.lookups = lookups
+        self.headers = [
             ("User-agent", "musicbrainz-bot/1.0 ( %s/user/%s )" % (server, username)),
         ]
         if use_test_db:
-            self.b.addheaders.append(("mb-set-database", "TEST"))
+            self.headers.append(("mb-set-database", "TEST"))
+        self.cookiejar = mechanize.LWPCookieJar()
+        if cookie_dir is not None:
+            self.cookiejar.filename = self._cookie_file(cookie_dir, server, username)
+            try:
+                self.cookiejar.load(ignore_discard=True)
+            except (OSError, mechanize.LoadError):
+                pass
+        self.b = new_browser(self.headers, self.cookiejar, history_size)
+        self._browser_requests = 0
+
+        # Pages that need no form parsing are posted through a pooled
+        # requests session, which shares the browser's cookies.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.cookies = self.cookiejar
 
         self.login(username, password)
 
+    @staticmethod
+    def _cookie_file(cookie_dir, server, username):
+        key = (
+            urllib.parse.quote(server, safe="")
+            + "_"
+            + urllib.parse.quote(username, safe="")
+        )
+        return os.path.join(cookie_dir, key + ".lwp")
+
+    def _save_cookies(self):
+        if self.cookiejar.filename is None:
+            return
+        directory = os.path.dirname(self.cookiejar.filename)
+        os.makedirs(directory, exist_ok=True)
+        # written to a private temporary file and renamed into place, so that
+        # clients logging in at once never load a half-written file
+        fd, path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        os.close(fd)
+        try:
+            self.cookiejar.save(path, ignore_discard=True)
+            os.replace(path, self.cookiejar.filename)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+    def _lookup(self, table, value, *entity_types):
+        """Resolves a name or ID with self.lookups, if any."""
+        if self.lookups is None or value is None:
+            return value
+        return self.lookups.resolve(table, value, *entity_types)
+
+    def _lookup_items(self, entity, tables):
+        """Returns a copy of `entity` with the items of `tables` (item ->
+        table) resolved."""
+        if self.lookups is None or entity is None:
+            return entity
+        entity = dict(entity.items())
+        for item, table in tables.items():
+            if entity.get(item) is not None:
+                entity[item] = self._lookup(table, entity[item])
+        return entity
+
+    def _lookup_area(self, area):
+        if self.lookups is None or area is None:
+            return area
+        area = self._lookup_items(area, {"type_id": "area_type"})
+        if area.get("url"):
+            area["url"] = [
+                dict(
+                    url.items(),
+                    link_type_id=self._lookup(
+                        "link_type", url.get("link_type_id"), "area", "url"
+                    ),
+                )
+                for url in area["url"]
+            ]
+        return area
+
+    def _lookup_rel(self, rel):
+        if self.lookups is None:
+            return rel
+        link_type = self._lookup(
+            "link_type",
+            rel["link_type"],
+            rel["entity0"]["type"],
+            rel["entity1"]["type"],
+        )
+        return dict(rel, link_type=link_type)
+
     def url(self, path, **kwargs):
         query = ""
         if kwargs:
@@ -161,30 +232,242 @@ class MusicBrainzClient(object):
             )
         return self.server + path + query
 
+    def _begin(self, url):
+        """Waits for the circuit breaker, a free slot of self.concurrency
+        and the rate limiter, in that order. Returns the concurrency ticket
+        and the time the request is sent.
+        """
+        self.retry.wait()
+        ticket = None
+        if self.concurrency is not None:
+            ticket = self.concurrency.acquire()
+        start = time.monotonic()
+        self.rate_limiter.acquire(url)
+        now = time.monotonic()
+        self.metrics.observe_wait(now - start)
+        return ticket, now
+
+    def _done(self, ticket, start, method, url, status, sent=0, received=0):
+        seconds = time.monotonic() - start
+        self.metrics.observe_request(method, url, seconds, status, sent, received)
+        if self.concurrency is not None:
+            self.concurrency.release(ticket, url, seconds, status)
+            self.metrics.set_gauge("concurrency_limit", self.concurrency.limit)
+
+    def _defer(self, url, status, headers):
+        if status in (429, 503):
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                self.rate_limiter.defer(url, retry_after)
+
+    def _back_off(self, method, url, attempt):
+        self.metrics.observe_retry(method, url)
+        time.sleep(self.retry.delay(attempt))
+
+    def _rate_limited(self, url, send, method="GET", sent=0):
+        """Sends a request through the browser, retrying as self.retry
+        allows.
+        """
+        attempt = 0
+        while True:
+            ticket, start = self._begin(url)
+            try:
+                resp = send()
+            except urllib.error.HTTPError as e:
+                self._done(ticket, start, method, url, e.code, sent)
+                self._defer(url, e.code, e.headers)
+                if e.code not in self.retry.statuses:
+                    self.retry.success()
+                    raise
+                self.retry.failure()
+                if method not in IDEMPOTENT_METHODS and e.geturl() != url:
+                    # the request was handled and redirected, and only the
+                    # page it led to failed: fetch that page again instead
+                    url, method, sent = e.geturl(), "GET", 0
+                    send = functools.partial(self.b.open, url)
+                if not self.retry.retryable(method, attempt, status=e.code):
+                    raise
+            except Exception as e:
+                self._done(ticket, start, method, url, "error", sent)
+                if not isinstance(e, OSError):
+                    raise
+                self.retry.failure()
+                if not self.retry.retryable(method, attempt, error=e):
+                    raise
+            else:
+                self._done(
+                    ticket,
+                    start,
+                    method,
+                    url,
+                    resp.code,
+                    sent,
+                    len(resp.get_data()),
+                )
+                self.retry.success()
+                return resp
+            self._back_off(method, url, attempt)
+            attempt += 1
+
+    def _recycle_browser(self):
+        """Replaces the browser with a new one, which shares the cookies."""
+        self.b.close()
+        self.b = new_browser(self.headers, self.cookiejar, self.history_size)
+        self._browser_requests = 0
+
+    def _open(self, url, data=None):
+        # A new page is about to replace the current one, so no form state
+        # is lost by starting over with a new browser here.
+        if (
+            self.recycle_after is not None
+            and self._browser_requests >= self.recycle_after
+        ):
+            self._recycle_browser()
+        self._browser_requests += 1
+        return self._rate_limited(
+            url,
+            lambda: self.b.open(url, data),
+            "GET" if data is None else "POST",
+            len(data or ""),
+        )
+
+    def _submit(self, *args, **kwargs):
+        # The request is built up front: a failed attempt replaces the
+        # browser's page, and with it the selected form.
+        request = self.b.click(*args, **kwargs)
+        self._browser_requests += 1
+        return self._rate_limited(
+            request.get_full_url(),
+            lambda: self.b.open(request),
+            request.get_method(),
+            len(request.data or ""),
+        )
+
+    def _request(self, method, url, **kwargs) -> requests.Response:
+        """Sends a request through self.session, bypassing the browser, and
+        retries it as self.retry allows. Once retries are exhausted, the
+        last error response is returned.
+        """
+        if method == "POST":
+            self._invalidate_url(url)
+            # a redirect tells that the POST was handled: the page it leads
+            # to is fetched by _follow(), as a GET that can be retried
+            kwargs.setdefault("allow_redirects", False)
+        attempt = 0
+        while True:
+            ticket, start = self._begin(url)
+            try:
+                resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                self._done(ticket, start, method, url, "error")
+                self.retry.failure()
+                if not self.retry.retryable(method, attempt, error=e):
+                    raise
+            else:
+                self._done(
+                    ticket,
+                    start,
+                    method,
+                    url,
+                    resp.status_code,
+                    len(resp.request.body or ""),
+                    len(resp.content),
+                )
+                self._defer(url, resp.status_code, resp.headers)
+                if resp.status_code not in self.retry.statuses:
+                    self.retry.success()
+                    return resp
+                self.retry.failure()
+                if not self.retry.retryable(method, attempt, status=resp.status_code):
+                    return resp
+            self._back_off(method, url, attempt)
+            attempt += 1
+
+    @staticmethod
+    def _location(resp) -> str:
+        """The URL a response redirects to, or else its own."""
+        if resp.is_redirect:
+            return urllib.parse.urljoin(resp.url, resp.headers["Location"])
+        return resp.url
+
+    def _follow(self, resp) -> requests.Response:
+        """Fetches the page a POST was redirected to, if it was."""
+        if resp.is_redirect:
+            return self._request("GET", self._location(resp))
+        return resp
+
+    def _invalidate_url(self, url):
+        # posting to an entity's page (e.g. /area/<mbid>/edit) edits it
+        m = re.match(
+            r"/([a-z-]+)/([0-9a-f-]{36})(?:/|$)", urllib.parse.urlsplit(url).path
+        )
+        if m is not None:
+            self.cache.invalidate(m.group(1), m.group(2))
+            if self.precheck is not None:
+                self.precheck.invalidate(m.group(1), m.group(2))
+
+    def _post(self, path, data) -> requests.Response:
+        """POSTs a form, given as a dict or an iterable of (key, value)
+        pairs which is encoded as it is consumed.
+        """
+        if hasattr(data, "items"):
+            data = data.items()
+        return self._request(
+            "POST", self.url(path), data=urlencode_pairs(data), headers=FORM_HEADERS
+        )
+
+    def _fetch_form(self, path, action="/edit") -> Form:
+        """Opens `path` and extracts the form posting to `action`."""
+        resp = self._request("GET", self.url(path))
+        return extract_form(resp.text, action, resp.url)
+
+    def _submit_form(self, form, submit=None) -> requests.Response:
+        return self._request(
+            "POST",
+            form.action,
+            data=urlencode_pairs(form.pairs(submit)),
+            headers=FORM_HEADERS,
+        )
+
     def _select_form(self, action):
         self.b.select_form(
             predicate=lambda f: f.method.lower() == "post" and action in f.action
         )
 
     def login(self, username, password):
-        self.b.open(self.url("/login"))
+        """Logs in, unless the session cookies loaded from `cookie_dir` are
+        still valid: the server redirects a logged-in user from /login to
+        their profile page, so opening /login doubles as the validity probe.
+        """
+        expected = self.url("/user/" + urllib.parse.quote(username))
+        self._open(self.url("/login"))
+        if self.b.geturl() == expected:
+            return
         self._select_form("/login")
         self.b["username"] = username
         self.b["password"] = password
-        self.b.submit()
+        if self.cookiejar.filename is not None:
+            # ask for the long-lived "remember me" cookie so that the cached
+            # session outlives the server-side session timeout
+            try:
+                self.b.find_control("remember_me").items[0].selected = True
+            except (mechanize.ControlNotFoundError, IndexError):
+                pass
+        self._submit()
         resp = self.b.response()
-        expected = self.url("/user/" + urllib.parse.quote(username))
         actual = resp.geturl()
         if actual != expected:
             raise Exception(
                 "unable to login. Ended up on %r instead of %s" % (actual, expected)
             )
+        self._save_cookies()
 
-    # return number of edits that left for today
-    def edits_left_today(self, max_edits=1000):
+    # return number of edits that left for today, or `unknown` if it cannot
+    # be determined
+    def edits_left_today(self, max_edits=1000, unknown=0):
         if self.editor_id is None:
             print("error, pass editor_id to constructor for edits_left_today()")
-            return 0
+            return unknown
         today = datetime.utcnow().strftime("%Y-%m-%d")
         kwargs = {
             "page": "2000",
@@ -200,19 +483,20 @@ class MusicBrainzClient(object):
             "conditions.1.args.0": str(self.editor_id),
         }
         url = self.url("/search/edits", **kwargs)
-        self.b.open(url)
+        self._open(url)
         page = self.b.response().read().decode("utf-8")
         m = re.search(r"Found (?:at least )?([0-9]+(?:,[0-9]+)?) edits", page)
         if not m:
             print("error, could not determine remaining edits")
-            return 0
+            return unknown
         return max(0, max_edits - int(re.sub(r"[^0-9]+", "", m.group(1))))
 
-    # return number of edits left globally
-    def edits_left_globally(self, max_edits=2000):
+    # return number of edits left globally, or `unknown` if it cannot be
+    # determined
+    def edits_left_globally(self, max_edits=2000, unknown=0):
         if self.editor_id is None:
             print("error, pass editor_id to constructor for edits_left_globally()")
-            return 0
+            return unknown
         kwargs = {
             "page": "2000",
             "combinator": "and",
@@ -226,51 +510,103 @@ class MusicBrainzClient(object):
             "conditions.1.args": "1",
         }
         url = self.url("/search/edits", **kwargs)
-        self.b.open(url)
+        self._open(url)
         page = self.b.response().read().decode("utf-8")
         m = re.search(r"Found (?:at least )?([0-9]+(?:,[0-9]+)?) edits", page)
         if not m:
             print("error, could not determine remaining edits")
-            return 0
+            return unknown
         return max(0, max_edits - int(re.sub(r"[^0-9]+", "", m.group(1))))
 
     def edits_left(self):
-        left_today = self.edits_left_today()
-        left_globally = self.edits_left_globally()
-        return min(left_today, left_globally)
+        """Returns the estimated number of edits left, as tracked by
+        self.quota (see EditQuota).
+        """
+        return self.quota.left(self)
 
-    def _extract_mbid(self, entity_type):
-        m = re.search(r"/" + entity_type + r"/([0-9a-f-]{36})$", self.b.geturl())
+    def get_entity(self, entity_type: str, mbid: str, inc=None) -> dict:
+        """Looks an entity up in the web service, going through self.cache.
+
+        Args:
+            entity_type (str): e.g. "area", "artist" or "release-group".
+            mbid (str): MusicBrainz ID of the entity.
+            inc (iterable, optional): inc= parameters of the lookup. Defaults
+                to the client's default_inc.
+
+        Returns:
+            dict: the decoded JSON response, or None if there is no such
+                entity.
+        """
+        inc = "+".join(sorted(self.default_inc if inc is None else inc))
+        data = self.cache.get(entity_type, mbid, inc)
+        if data is not None:
+            return data
+        params = {"fmt": "json"}
+        if inc:
+            params["inc"] = inc
+        resp = self._request(
+            "GET", self.url("/ws/2/%s/%s" % (entity_type, mbid)), params=params
+        )
+        if resp.status_code == 404:
+            return None
+        if not resp.ok:
+            raise Exception(
+                "unable to look up %s %s" % (entity_type, mbid), resp.status_code
+            )
+        data = resp.json()
+        self.cache.put(entity_type, mbid, inc, data)
+        return data
+
+    def _extract_mbid(self, entity_type, url=None):
+        if url is None:
+            url = self.b.geturl()
+        m = re.search(r"/" + entity_type + r"/([0-9a-f-]{36})$", url)
         if m is None:
             raise Exception("unable to post edit")
+        self.quota.record()
         return m.group(1)
 
+    @instrumented
     def add_release(self, album, edit_note, auto=False):
-        form = album_to_form(album)
-        self.b.open(self.url("/release/add"), urllib.parse.urlencode(form))
-        time.sleep(2.0)
-        self._select_form("/release")
-        self.b.submit(name="step_editnote")
-        time.sleep(2.0)
-        self._select_form("/release")
-        print(self.b.response().read())
-        self.b.submit(name="save")
-        return self._extract_mbid("release")
+        """Adds a release seeded from `album` (see album_to_form).
 
-    def add_artist(self, artist, edit_note, auto=False):
-        self.b.open(self.url("/artist/create"))
-        self._select_form("/artist/create")
-        self.b["edit-artist.name"] = artist["name"]
-        self.b["edit-artist.sort_name"] = artist["sort_name"]
-        self.b["edit-artist.edit_note"] = edit_note.encode("utf8")
-        self.b.submit()
-        return self._extract_mbid("artist")
+        The edit note is seeded along with the release data, so the editor
+        is asked to save straight away; only if it insists on showing the
+        edit note step is that step submitted first.
 
+        Returns:
+            str: the MBID of the new release.
+        """
+        seed = iter_album_form(album, edit_note or None)
+        resp = self._follow(self._post("/release/add", seed))
+        form = extract_form(resp.text, "/release", resp.url)
+        self._as_auto_editor(form, "", auto)
+        resp = self._submit_form(form, submit="save")
+        if re.search(r"/release/[0-9a-f-]{36}$", self._location(resp)) is None:
+            resp = self._follow(resp)
+            form = extract_form(resp.text, "/release", resp.url)
+            resp = self._follow(self._submit_form(form, submit="step_editnote"))
+            form = extract_form(resp.text, "/release", resp.url)
+            self._as_auto_editor(form, "", auto)
+            resp = self._submit_form(form, submit="save")
+        return self._extract_mbid("release", self._location(resp))
+
+    @instrumented
+    def add_artist(self, artist, edit_note, auto=False):
+        form = self._fetch_form("/artist/create", "/artist/create")
+        form["edit-artist.name"] = artist["name"]
+        form["edit-artist.sort_name"] = artist["sort_name"]
+        form["edit-artist.edit_note"] = edit_note
+        resp = self._submit_form(form)
+        return self._extract_mbid("artist", self._location(resp))
+
+    @instrumented
     def add_area(self, area: dict, edit_note: str, auto=False) -> str:
         """A method to add a new area to MusicBrainz
 
         Args:
-            area (dict): a dictionary containing the area's data (format below)
+            area (dict): a dictionary containing the area's data (format below),
+                or a models.Area
             edit_note (str): edit note
             auto (bool, optional): Marks if an edit is 'votable' or 'auto-edit'. Defaults to False.
 
@@ -278,8 +614,9 @@ class MusicBrainzClient(object):
             str: returns a area MBID of the newly created area.
 
         Note:
-            Unlike other methods, this one directly requests page using
-            mechanize.Requests to overcome mechanize's lack of javascript support
+            Unlike other methods, this one directly posts the form payload
+            through the requests session to overcome mechanize's lack of
+            javascript support
 
             input dict format:
             area = {
@@ -298,84 +635,102 @@ class MusicBrainzClient(object):
             }
         """
 
-        # update the area dictionary to include edit_note with the key "edit_note"
-        area.update({"edit_note": edit_note})
-
+        area = self._lookup_area(area)
         required_fields = ["name"]
-        payload = create_payload(area, "edit-area", required_fields)
-
-        self.b.open(
-            self.url("/area/create"),
-            data=urllib.parse.urlencode(payload).encode("utf-8"),
+        payload = itertools.chain(
+            iter_payload(area, "edit-area", required_fields),
+            [("edit-area.edit_note", edit_note)],
         )
 
-        return self._extract_mbid("area")
+        resp = self._post("/area/create", payload)
 
+        return self._extract_mbid("area", self._location(resp))
+
+    @instrumented
     def edit_area(
         self, gid: str, area: dict, update: dict, edit_note: str, auto=False
     ) -> str:
         """Posts an edit for an existing area based on existing data and update data.
 
+        Only the fields of `update` that differ from `area`, and URLs the
+        area does not have yet, count as changes; if there are none, no
+        request is made. The area form still needs
+        every scalar field and ISO 3166 list (the server clears fields
+        missing from the form), but of the URLs only those the area does not
+        have yet are sent. Neither `area` nor `update` is modified.
+
         Args:
-            area (dict): Existing data for the area to be edited. Including gid
+            area (dict): Existing data for the area to be edited, or a models.Area
             update (dict): Updated data for the area to be edited. Follows the same structure as the area dict in add_area
             edit_note (str): edit note
             auto (bool, optional): Marks if an edit is 'votable' or 'auto-edit'. Defaults to False.
 
         Returns:
-            str: returns the area MBID of the edited area.
+            str: returns the area MBID of the edited area, or None if nothing
+                had to be changed.
         """
 
-        update.update({"edit_note": edit_note})
-        area.update(update)
+        area = self._lookup_area(area)
+        update = self._lookup_area(update)
+        # URLs can only be added through the form, so only new ones count
+        new_urls = added_items(area.get("url"), update.get("url"))
+        changes = changed_fields(
+            area, {k: v for (k, v) in update.items() if k != "url"}
+        )
+        if not changes and not new_urls:
+            print(" * already set, not changing")
+            return None
 
-        required_fields = ["name"]
-        payload = create_payload(area, "edit-area", required_fields)
+        desired = dict(area.items())
+        desired.update(changes)
+        desired["url"] = new_urls
 
-        self.b.open(
-            self.url("/area/%s/edit" % (gid,)),
-            data=urllib.parse.urlencode(payload).encode("utf-8"),
+        required_fields = ["name"]
+        payload = itertools.chain(
+            iter_payload(desired, "edit-area", required_fields),
+            [("edit-area.edit_note", edit_note)],
         )
 
-        return self._extract_mbid("area")
+        resp = self._post("/area/%s/edit" % (gid,), payload)
 
-    def _as_auto_editor(self, prefix, auto):
-        try:
-            self.b[prefix + "make_votable"] = [] if auto else ["1"]
-        except mechanize.ControlNotFoundError:
-            pass
+        return self._extract_mbid("area", self._location(resp))
+
+    def _as_auto_editor(self, form, prefix, auto):
+        if prefix + "make_votable" in form:
+            form[prefix + "make_votable"] = [] if auto else ["1"]
 
     def _check_response(
-        self, already_done_msg="any changes to the data already present"
+        self, already_done_msg="any changes to the data already present", page=None
     ):
-        page = self.b.response().read().decode("utf-8")
+        if page is None:
+            page = self.b.response().read().decode("utf-8")
         if "Thank you, your " not in page:
             if not already_done_msg or already_done_msg not in page:
                 raise Exception("unable to post edit")
             else:
                 return False
+        self.quota.record()
         return True
 
     def _edit_note_and_auto_editor_and_submit_and_check_response(
-        self, prefix, auto, edit_note, already_done_msg="default"
+        self, form, prefix, auto, edit_note, already_done_msg="default"
     ):
-        self.b[prefix + "edit_note"] = edit_note.encode("utf8")
-        self._as_auto_editor(prefix, auto)
-        self.b.submit()
+        form[prefix + "edit_note"] = edit_note
+        self._as_auto_editor(form, prefix, auto)
+        page = self._follow(self._submit_form(form)).text
         if already_done_msg != "default":
-            return self._check_response(already_done_msg)
+            return self._check_response(already_done_msg, page=page)
         else:
-            return self._check_response()
+            return self._check_response(page=page)
 
-    def _relationship_editor_webservice_action(
+    def _relationship_fields(
         self,
+        index,
         action,
-        rel_id,
         link_type,
-        edit_note,
-        auto,
         entity0,
         entity1,
+        rel_id=None,
         attributes={},
         begin_date={},
         end_date={},
@@ -385,55 +740,128 @@ class MusicBrainzClient(object):
             raise Exception(
                 "Can" "t " + action + " relationship: no Id has been provided"
             )
-        prefix = "rel-editor."
+        prefix = "rel-editor.rels.%d." % index
         dta = {
-            prefix + "rels.0.action": action,
-            prefix + "rels.0.link_type": link_type,
-            prefix + "edit_note": edit_note.encode("utf-8"),
-            prefix + "make_votable": not auto and 1 or 0,
+            prefix + "action": action,
+            prefix + "link_type": link_type,
         }
         if rel_id:
-            dta[prefix + "rels.0.id"] = rel_id
+            dta[prefix + "id"] = rel_id
         entities = sorted([entity0, entity1], key=lambda entity: entity["type"])
         dta.update(
-            (prefix + "rels.0.entity." + repr(x) + "." + k, v)
+            (prefix + "entity." + repr(x) + "." + k, v)
             for x in range(2)
             for (k, v) in entities[x].items()
         )
+        dta.update((prefix + "attrs." + k, str(v)) for k, v in list(attributes.items()))
         dta.update(
-            (prefix + "rels.0.attrs." + k, str(v)) for k, v in list(attributes.items())
-        )
-        dta.update(
-            (prefix + "rels.0.period.begin_date." + k, str(v))
+            (prefix + "period.begin_date." + k, str(v))
             for k, v in list(begin_date.items())
         )
         dta.update(
-            (prefix + "rels.0.period.end_date." + k, str(v))
-            for k, v in list(end_date.items())
+            (prefix + "period.end_date." + k, str(v)) for k, v in list(end_date.items())
         )
         if ended is True:
-            dta[prefix + "rels.0.period.ended"] = "true"
-        try:
-            self.b.open(
-                self.url("/relationship-editor"), data=urllib.parse.urlencode(dta)
-            )
-        except urllib.error.HTTPError as e:
-            if e.getcode() != 400:
-                raise Exception("unable to post edit", e)
+            dta[prefix + "period.ended"] = "true"
+        return dta
+
+    def _post_relationship_edits(self, rels, edit_note, auto):
+        dta = {
+            "rel-editor.edit_note": edit_note,
+            "rel-editor.make_votable": not auto and 1 or 0,
+        }
+        for i, rel in enumerate(rels):
+            dta.update(self._relationship_fields(i, **rel))
+            for entity in (rel["entity0"], rel["entity1"]):
+                if "gid" in entity:
+                    self.cache.invalidate(entity["type"], entity["gid"])
+        resp = self._post("/relationship-editor", dta)
+        if not resp.ok and resp.status_code != 400:
+            raise Exception("unable to post edit", resp.status_code)
         try:
-            jmsg = json.load(self.b.response())
+            jmsg = resp.json()
         except ValueError as e:
             raise Exception("unable to parse response as JSON", e)
         if "edits" not in jmsg or "error" in jmsg:
             raise Exception("unable to post edit", jmsg)
-        else:
-            if (
-                "message" in jmsg["edits"][0]
-                and jmsg["edits"][0]["message"] == "no changes"
-            ):
-                return False
-        return True
+        if len(jmsg["edits"]) != len(rels):
+            raise Exception("unexpected number of edits in response", jmsg)
+        results = [edit.get("message") != "no changes" for edit in jmsg["edits"]]
+        self.quota.record(sum(results))
+        return results
+
+    def _relationship_editor_webservice_action(
+        self,
+        action,
+        rel_id,
+        link_type,
+        edit_note,
+        auto,
+        entity0,
+        entity1,
+        attributes={},
+        begin_date={},
+        end_date={},
+        ended=False,
+    ):
+        rel = {
+            "action": action,
+            "rel_id": rel_id,
+            "link_type": link_type,
+            "entity0": entity0,
+            "entity1": entity1,
+            "attributes": attributes,
+            "begin_date": begin_date,
+            "end_date": end_date,
+            "ended": ended,
+        }
+        rel = self._lookup_rel(rel)
+        return self._post_relationship_edits([rel], edit_note, auto)[0]
+
+    @instrumented
+    def edit_relationships(self, rels, edit_note, auto=False, chunk_size=50) -> list:
+        """Adds, edits and removes many relationships, packing up to
+        `chunk_size` of them into each POST to /relationship-editor.
 
+        Args:
+            rels (iterable): dicts with the keys "action" ("add", "edit" or
+                "remove"), "link_type", "entity0" and "entity1", and
+                optionally "rel_id", "attributes", "begin_date", "end_date"
+                and "ended", as taken by edit_relationship().
+            edit_note (str): edit note, shared by all the edits
+            auto (bool, optional): Marks if the edits are 'votable' or
+                'auto-edit'. Defaults to False.
+            chunk_size (int, optional): relationships per request.
+
+        Returns:
+            list: one bool per relationship, in order: True if an edit was
+                created, False if the server reported no changes.
+
+        Raises:
+            Exception: a request failed. Its `results` attribute holds the
+                results of the relationships of the chunks posted before,
+                in order; the others may or may not have been edited.
+        """
+        return self._edit_relationships(rels, edit_note, auto, chunk_size)
+
+    def _edit_relationships(self, rels, edit_note, auto, chunk_size):
+        # not instrumented itself, so that a call of add_urls() is recorded
+        # once; every link type is checked before the first request
+        rels = [self._lookup_rel(rel) for rel in rels]
+        results = []
+        for start in range(0, len(rels), chunk_size):
+            end = start + chunk_size
+            try:
+                results.extend(
+                    self._post_relationship_edits(rels[start:end], edit_note, auto)
+                )
+            except Exception as e:
+                # the chunks before were posted: tell the caller which
+                e.results = results
+                raise
+        return results
+
+    @instrumented
     def add_url(self, entity_type, entity_id, link_type, url, edit_note="", auto=False):
         return self._relationship_editor_webservice_action(
             "add",
@@ -445,72 +873,112 @@ class MusicBrainzClient(object):
             {"url": url, "type": "url"},
         )
 
+    @instrumented
+    def add_urls(self, entity_type, links, edit_note="", auto=False, chunk_size=50):
+        """Batched add_url(): `links` is an iterable of
+        (entity_id, link_type, url) tuples. Returns one bool per link, see
+        edit_relationships().
+        """
+        return self._edit_relationships(
+            (
+                {
+                    "action": "add",
+                    "link_type": link_type,
+                    "entity0": {"gid": entity_id, "type": entity_type},
+                    "entity1": {"url": url, "type": "url"},
+                }
+                for entity_id, link_type, url in links
+            ),
+            edit_note,
+            auto,
+            chunk_size,
+        )
+
+    # The _update_*_if_not_set() helpers return None if `item` is not in
+    # `update`, False if it is already set and True if they have set it.
+
     def _update_entity_if_not_set(
-        self,
-        update,
-        entity_dict,
-        entity_type,
-        item,
-        suffix="_id",
-        utf8ize=False,
-        inarray=False,
+        self, form, update, entity_dict, entity_type, item, suffix="_id"
     ):
-        if item in update:
-            key = "edit-" + entity_type + "." + item + suffix
-            if self.b[key] != (inarray and [""] or ""):
-                print(" * " + item + " already set, not changing")
-                return False
-            val = (
-                utf8ize and entity_dict[item].encode("utf-8") or str(entity_dict[item])
-            )
-            self.b[key] = inarray and [val] or val
+        if item not in update:
+            return None
+        key = "edit-" + entity_type + "." + item + suffix
+        if form[key] != "":
+            print(" * " + item + " already set, not changing")
+            return False
+        form[key] = str(entity_dict[item])
         return True
 
-    def _update_artist_date_if_not_set(self, update, artist, item_prefix):
+    def _update_artist_date_if_not_set(self, form, update, artist, item_prefix):
         item = item_prefix + "_date"
-        if item in update:
-            prefix = "edit-artist.period." + item
-            if self.b[prefix + ".year"]:
-                print(
-                    " * " + item.replace("_", " ") + " year already set, not changing"
-                )
-                return False
-            self.b[prefix + ".year"] = str(artist[item + "_year"])
-            if artist[item + "_month"]:
-                self.b[prefix + ".month"] = str(artist[item + "_month"])
-                if artist[item + "_day"]:
-                    self.b[prefix + ".day"] = str(artist[item + "_day"])
+        if item not in update:
+            return None
+        prefix = "edit-artist.period." + item
+        if form[prefix + ".year"]:
+            print(" * " + item.replace("_", " ") + " year already set, not changing")
+            return False
+        form[prefix + ".year"] = str(artist[item + "_year"])
+        if artist[item + "_month"]:
+            form[prefix + ".month"] = str(artist[item + "_month"])
+            if artist[item + "_day"]:
+                form[prefix + ".day"] = str(artist[item + "_day"])
         return True
 
-    def edit_artist(self, artist, update, edit_note, auto=False):
-        self.b.open(self.url("/artist/%s/edit" % (artist["gid"],)))
-        self._select_form("/edit")
-        self.b.set_all_readonly(False)
-        if not self._update_entity_if_not_set(update, artist, "artist", "area"):
-            return
-        for item in ["type", "gender"]:
-            if not self._update_entity_if_not_set(
-                update, artist, "artist", item, inarray=True
-            ):
-                return
-        for item_prefix in ["begin", "end"]:
-            if not self._update_artist_date_if_not_set(update, artist, item_prefix):
-                return
-        if not self._update_entity_if_not_set(
-            update, artist, "artist", "comment", "", utf8ize=True
+    @staticmethod
+    def _should_submit(results, partial):
+        """Whether to submit a form given the results of the
+        _update_*_if_not_set() calls on it: not if an item was already set
+        (unless `partial`), nor if no item was set.
+        """
+        if False in results and not partial:
+            return False
+        return True in results
+
+    def _skip_by_precheck(self, noop):
+        if noop:
+            print(" * already set or changed according to the mirror, not changing")
+        return noop
+
+    @instrumented
+    def edit_artist(self, artist, update, edit_note, auto=False, partial=False):
+        """Sets the items of `update` ("area", "type", "gender", "begin_date",
+        "end_date", "comment") to their values in `artist`, if they are not
+        set yet. If any of them is already set, nothing is changed, unless
+        `partial` is true: then only the items already set are left alone.
+        """
+        artist = self._lookup_items(artist, {"type": "artist_type", "gender": "gender"})
+        if self.precheck is not None and self._skip_by_precheck(
+            self.precheck.artist_is_noop(artist, update, partial)
         ):
             return
+        form = self._fetch_form("/artist/%s/edit" % (artist["gid"],))
+        results = [
+            self._update_entity_if_not_set(form, update, artist, "artist", item)
+            for item in ["area", "type", "gender"]
+        ]
+        results += [
+            self._update_artist_date_if_not_set(form, update, artist, prefix)
+            for prefix in ["begin", "end"]
+        ]
+        results.append(
+            self._update_entity_if_not_set(
+                form, update, artist, "artist", "comment", ""
+            )
+        )
+        if not self._should_submit(results, partial):
+            return
         return self._edit_note_and_auto_editor_and_submit_and_check_response(
-            "edit-artist.", auto, edit_note
+            form, "edit-artist.", auto, edit_note
         )
 
+    @instrumented
     def edit_artist_credit(
         self, entity_id, credit_id, ids, names, join_phrases, edit_note
     ):
         assert len(ids) == len(names) == len(join_phrases) + 1
         join_phrases.append("")
 
-        self.b.open(self.url("/artist/%s/credit/%d/edit" % (entity_id, int(credit_id))))
+        self._open(self.url("/artist/%s/credit/%d/edit" % (entity_id, int(credit_id))))
         self._select_form("/edit")
 
         for i in range(len(ids)):
@@ -535,50 +1003,67 @@ class MusicBrainzClient(object):
             )
 
         self.b["split-artist.edit_note"] = edit_note.encode("utf-8")
-        self.b.submit()
+        self.cache.invalidate("artist", entity_id)
+        self._submit()
         return self._check_response()
 
+    @instrumented
     def set_artist_type(self, entity_id, type_id, edit_note, auto=False):
-        self.b.open(self.url("/artist/%s/edit" % (entity_id,)))
-        self._select_form("/edit")
-        if self.b["edit-artist.type_id"] != [""]:
+        type_id = self._lookup("artist_type", type_id)
+        if self.precheck is not None and self._skip_by_precheck(
+            self.precheck.artist_type_is_noop(entity_id)
+        ):
+            return
+        form = self._fetch_form("/artist/%s/edit" % (entity_id,))
+        if form["edit-artist.type_id"] != "":
             print(" * already set, not changing")
             return
-        self.b["edit-artist.type_id"] = [str(type_id)]
+        form["edit-artist.type_id"] = str(type_id)
         return self._edit_note_and_auto_editor_and_submit_and_check_response(
-            "edit-artist.", auto, edit_note
+            form, "edit-artist.", auto, edit_note
         )
 
+    @instrumented
     def edit_url(self, entity_id, old_url, new_url, edit_note, auto=False):
-        self.b.open(self.url("/url/%s/edit" % (entity_id,)))
-        self._select_form("/edit")
-        if self.b["edit-url.url"] != str(old_url):
+        if self.precheck is not None and self._skip_by_precheck(
+            self.precheck.url_is_noop(entity_id, old_url, new_url)
+        ):
+            return
+        form = self._fetch_form("/url/%s/edit" % (entity_id,))
+        if form["edit-url.url"] != str(old_url):
             print(" * value has changed, aborting")
             return
-        if self.b["edit-url.url"] == str(new_url):
+        if form["edit-url.url"] == str(new_url):
             print(" * already set, not changing")
             return
-        self.b["edit-url.url"] = str(new_url)
+        form["edit-url.url"] = str(new_url)
         return self._edit_note_and_auto_editor_and_submit_and_check_response(
-            "edit-url.", auto, edit_note
+            form, "edit-url.", auto, edit_note
         )
 
-    def edit_work(self, work, update, edit_note, auto=False):
-        self.b.open(self.url("/work/%s/edit" % (work["gid"],)))
-        self._select_form("/edit")
-        for item in ["type", "language"]:
-            if not self._update_entity_if_not_set(
-                update, work, "work", item, inarray=True
-            ):
-                return
-        if not self._update_entity_if_not_set(
-            update, work, "work", "comment", "", utf8ize=True
+    @instrumented
+    def edit_work(self, work, update, edit_note, auto=False, partial=False):
+        """Like edit_artist(), for the items "type", "language" and "comment"."""
+        work = self._lookup_items(work, {"type": "work_type", "language": "language"})
+        if self.precheck is not None and self._skip_by_precheck(
+            self.precheck.work_is_noop(work, update, partial)
         ):
             return
+        form = self._fetch_form("/work/%s/edit" % (work["gid"],))
+        results = [
+            self._update_entity_if_not_set(form, update, work, "work", item)
+            for item in ["type", "language"]
+        ]
+        results.append(
+            self._update_entity_if_not_set(form, update, work, "work", "comment", "")
+        )
+        if not self._should_submit(results, partial):
+            return
         return self._edit_note_and_auto_editor_and_submit_and_check_response(
-            "edit-work.", auto, edit_note
+            form, "edit-work.", auto, edit_note
         )
 
+    @instrumented
     def edit_relationship(
         self,
         rel_id,
@@ -606,6 +1091,7 @@ class MusicBrainzClient(object):
             ended,
         )
 
+    @instrumented
     def remove_relationship(
         self,
         rel_id,
@@ -633,13 +1119,14 @@ class MusicBrainzClient(object):
             ended,
         )
 
+    @instrumented
     def merge(self, entity_type, entity_ids, target_id, edit_note):
+        """Merges `entity_ids` into `target_id`. Returns True once the merge
+        edit is created, and raises an exception otherwise.
+        """
         params = [("add-to-merge", id) for id in entity_ids]
-        self.b.open(
-            self.url("/%s/merge_queue" % entity_type), urllib.parse.urlencode(params)
-        )
-        page = self.b.response().read().decode("utf-8")
-        if "You are about to merge" not in page:
+        resp = self._follow(self._post("/%s/merge_queue" % entity_type, params))
+        if "You are about to merge" not in resp.text:
             raise Exception("unable to add items to merge queue")
 
         params = {
@@ -649,41 +1136,49 @@ class MusicBrainzClient(object):
         }
         for idx, val in enumerate(entity_ids):
             params["merge.merging.%s" % idx] = val
-        self.b.open(self.url("/%s/merge" % entity_type), urllib.parse.urlencode(params))
-        self._check_response(None)
+            self.cache.invalidate(entity_type, val)
+        self.cache.invalidate(entity_type, target_id)
+        resp = self._follow(self._post("/%s/merge" % entity_type, params))
+        return self._check_response(None, page=resp.text)
 
     def _edit_release_information(self, entity_id, attributes, edit_note, auto=False):
-        self.b.open(self.url("/release/%s/edit" % (entity_id,)))
-        self._select_form("/edit")
+        if self.precheck is not None and self._skip_by_precheck(
+            self.precheck.release_is_noop(entity_id, attributes)
+        ):
+            return False
+        form = self._fetch_form("/release/%s/edit" % (entity_id,))
         changed = False
         for k, v in list(attributes.items()):
-            self.b.form.find_control(k).readonly = False
-            if self.b[k] != v[0] and v[0] is not None:
-                print(" * %s has changed to %r, aborting" % (k, self.b[k]))
+            if form.getlist(k) != v[0] and v[0] is not None:
+                print(" * %s has changed to %r, aborting" % (k, form.getlist(k)))
                 return False
-            if self.b[k] != v[1]:
+            if form.getlist(k) != v[1]:
                 changed = True
-                self.b[k] = v[1]
+                form[k] = v[1]
         if not changed:
             print(" * already set, not changing")
             return False
-        self.b["barcode_confirm"] = ["1"]
-        self.b.submit(name="step_editnote")
-        self._select_form("/edit")
-        try:
-            self.b["edit_note"] = edit_note.encode("utf8")
-        except mechanize.ControlNotFoundError:
+        form["barcode_confirm"] = ["1"]
+        resp = self._follow(self._submit_form(form, submit="step_editnote"))
+        form = extract_form(resp.text, "/edit", resp.url)
+        if "edit_note" not in form:
             raise Exception("unable to post edit")
-        self._as_auto_editor("", auto)
-        self.b.submit(name="save")
-        page = self.b.response().read().decode("utf-8")
-        if "Release information" not in page:
+        form["edit_note"] = edit_note
+        self._as_auto_editor(form, "", auto)
+        resp = self._submit_form(form, submit="save")
+        # the editor is sent to the release page once the edit is made
+        released = re.search(r"/release/%s$" % entity_id, self._location(resp))
+        if released is None and "Release information" not in resp.text:
             raise Exception("unable to post edit")
+        self.quota.record()
         return True
 
+    @instrumented
     def set_release_script(
         self, entity_id, old_script_id, new_script_id, edit_note, auto=False
     ):
+        old_script_id = self._lookup("script", old_script_id)
+        new_script_id = self._lookup("script", new_script_id)
         return self._edit_release_information(
             entity_id,
             {"script_id": [[str(old_script_id)], [str(new_script_id)]]},
@@ -691,9 +1186,12 @@ class MusicBrainzClient(object):
             auto,
         )
 
+    @instrumented
     def set_release_language(
         self, entity_id, old_language_id, new_language_id, edit_note, auto=False
     ):
+        old_language_id = self._lookup("language", old_language_id)
+        new_language_id = self._lookup("language", new_language_id)
         return self._edit_release_information(
             entity_id,
             {"language_id": [[str(old_language_id)], [str(new_language_id)]]},
@@ -701,9 +1199,12 @@ class MusicBrainzClient(object):
             auto,
         )
 
+    @instrumented
     def set_release_packaging(
         self, entity_id, old_packaging_id, new_packaging_id, edit_note, auto=False
     ):
+        old_packaging_id = self._lookup("release_packaging", old_packaging_id)
+        new_packaging_id = self._lookup("release_packaging", new_packaging_id)
         old_packaging = (
             [str(old_packaging_id)] if old_packaging_id is not None else None
         )
@@ -714,6 +1215,7 @@ class MusicBrainzClient(object):
             auto,
         )
 
+    @instrumented
     def add_edit_note(self, identify, edit_note):
         """Adds an edit note to the last (or very recently) made edit. This
         is necessary e.g. for ISRC submission via web service, as it has no
@@ -721,8 +1223,8 @@ class MusicBrainzClient(object):
             function(str, str) -> bool
         which receives the edit number as first, the raw html body of the edit
         as second argument, and determines if the note should be added to this
-        edit."""
-        self.b.open(self.url("/user/%s/edits" % (self.username,)))
+        edit. Returns True if a note was added, False if no edit matched."""
+        self._open(self.url("/user/%s/edits" % (self.username,)))
         page = self.b.response().read().decode("utf-8")
         self._select_form("/edit")
         edits = re.findall(
@@ -732,15 +1234,28 @@ class MusicBrainzClient(object):
             page,
             re.S,
         )
+        found = False
         for i, (edit_nr, text) in enumerate(edits):
             if identify(edit_nr, text):
                 self.b["enter-vote.vote.%d.edit_note" % i] = edit_note.encode("utf8")
+                found = True
                 break
-        self.b.submit()
+        self._submit()
+        return found
 
+    @instrumented
     def cancel_edit(self, edit_nr, edit_note=""):
-        self.b.open(self.url("/edit/%s/cancel" % (edit_nr,)))
-        self._select_form("/cancel")
+        """Cancels an open edit. Returns True once it is cancelled.
+
+        Raises:
+            Exception: the edit cannot be cancelled (e.g. it is closed), or
+                the server did not accept the cancellation.
+        """
+        form = self._fetch_form("/edit/%s/cancel" % (edit_nr,), "/cancel")
         if edit_note:
-            self.b["confirm.edit_note"] = edit_note.encode("utf8")
-        self.b.submit()
+            form["confirm.edit_note"] = edit_note
+        resp = self._submit_form(form)
+        # the editor is sent back to the edit once it is cancelled
+        if re.search(r"/edit/%s$" % (edit_nr,), self._location(resp)) is None:
+            raise Exception("unable to cancel edit %s" % (edit_nr,))
+        return True
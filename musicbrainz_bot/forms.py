@@ -0,0 +1,198 @@
+import html.parser
+import re
+import urllib.parse
+
+_FORM_TAG = re.compile(r"<form\b[^>]*>", re.I)
+
+# input types that are only submitted when used to submit the form
+_BUTTON_TYPES = ("submit", "image", "button", "reset")
+
+
+class Form(object):
+    """The controls of an HTML form and the values a browser would submit
+    for them.
+
+    form[name] returns the first submitted value of a control ("" if it has
+    none, e.g. an unchecked checkbox), form.getlist(name) all of them.
+    Assigning a string or a list of strings replaces the control's values;
+    the values of a select have to be among its options.
+    """
+
+    def __init__(self, action):
+        self.action = action
+        self.controls = set()
+        self.buttons = {}
+        self.options = {}
+        self.fields = []
+
+    def __contains__(self, name):
+        return name in self.controls
+
+    def getlist(self, name) -> list:
+        return [value for (key, value) in self.fields if key == name]
+
+    def __getitem__(self, name) -> str:
+        for key, value in self.fields:
+            if key == name:
+                return value
+        return ""
+
+    def __setitem__(self, name, value):
+        values = [value] if isinstance(value, str) else list(value)
+        for v in values:
+            if name in self.options and v not in self.options[name]:
+                raise Exception("%r is not an option of %s" % (v, name))
+        keys = [key for (key, _) in self.fields]
+        position = keys.index(name) if name in keys else len(keys)
+        rest = [(key, v) for (key, v) in self.fields[position:] if key != name]
+        self.fields = self.fields[:position] + [(name, v) for v in values] + rest
+        self.controls.add(name)
+
+    def pairs(self, submit=None) -> list:
+        """Returns the (name, value) pairs to post, as if the form had been
+        submitted with the button named `submit`.
+        """
+        if submit is None:
+            return list(self.fields)
+        return self.fields + [(submit, self.buttons.get(submit, ""))]
+
+
+class _Stop(Exception):
+    pass
+
+
+class _FormParser(html.parser.HTMLParser):
+    """Parses the first form matching `action`, skipping the forms before
+    it, and stops at its end tag without looking at the rest of the page.
+    """
+
+    def __init__(self, action, base_url):
+        super().__init__()
+        self.action = action
+        self.base_url = base_url
+        self.form = None
+        self._select = None
+        self._option = None
+        self._textarea = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            if self.form is not None:
+                # forms cannot be nested: this one ends the matching one
+                raise _Stop()
+            action = urllib.parse.urljoin(self.base_url, attrs.get("action") or "")
+            method = (attrs.get("method") or "get").lower()
+            if method == "post" and self.action in action:
+                self.form = Form(action)
+            return
+        name = attrs.get("name")
+        if self.form is None or "disabled" in attrs:
+            return
+        if tag == "input" and name:
+            self._input(name, (attrs.get("type") or "text").lower(), attrs)
+        elif tag == "button" and name:
+            # <button> submits the form unless it is of another type
+            if (attrs.get("type") or "submit").lower() == "submit":
+                self.form.buttons.setdefault(name, attrs.get("value") or "")
+        elif tag == "select" and name:
+            self.form.controls.add(name)
+            self._select = [name, "multiple" in attrs, []]
+        elif tag == "option" and self._select is not None:
+            self._finish_option()
+            self._option = [attrs.get("value"), "selected" in attrs, ""]
+        elif tag == "textarea" and name:
+            self.form.controls.add(name)
+            self._textarea = [name, ""]
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def _input(self, name, input_type, attrs):
+        value = attrs.get("value")
+        if input_type in _BUTTON_TYPES:
+            self.form.buttons.setdefault(name, value or "")
+            return
+        self.form.controls.add(name)
+        if input_type in ("checkbox", "radio"):
+            if "checked" in attrs:
+                self.form.fields.append((name, "on" if value is None else value))
+        elif input_type != "file":
+            self.form.fields.append((name, value or ""))
+
+    def _finish_option(self):
+        if self._option is None:
+            return
+        value, selected, text = self._option
+        self._select[2].append((text.strip() if value is None else value, selected))
+        self._option = None
+
+    def _finish_select(self):
+        self._finish_option()
+        name, multiple, options = self._select
+        self.form.options.setdefault(name, []).extend(value for (value, _) in options)
+        selected = [value for (value, is_selected) in options if is_selected]
+        if not selected and not multiple and options:
+            # browsers submit the first option of a single select by default
+            selected = [options[0][0]]
+        if not multiple:
+            selected = selected[-1:]
+        self.form.fields.extend((name, value) for value in selected)
+        self._select = None
+
+    def finish(self):
+        """Flushes a select left open by a truncated form."""
+        if self.form is not None and self._select is not None:
+            self._finish_select()
+        return self.form
+
+    def handle_endtag(self, tag):
+        if self.form is None:
+            return
+        if tag == "form":
+            raise _Stop()
+        elif tag == "option" and self._select is not None:
+            self._finish_option()
+        elif tag == "select" and self._select is not None:
+            self._finish_select()
+        elif tag == "textarea" and self._textarea is not None:
+            name, text = self._textarea
+            # a newline right after <textarea> is not part of the value
+            if text.startswith("\n"):
+                text = text[1:]
+            self.form.fields.append((name, text))
+            self._textarea = None
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option[2] += data
+        elif self._textarea is not None:
+            self._textarea[1] += data
+
+
+def extract_form(page, action, base_url) -> Form:
+    """Extracts the first POST form of `page` whose action URL contains
+    `action` (the same selection as MusicBrainzClient._select_form).
+
+    Parsing starts at the first <form> tag, located with a regular
+    expression, and stops at the end of the matching form, which makes this
+    much cheaper than having mechanize parse every form on a large edit
+    page.
+
+    Raises:
+        Exception: if there is no such form.
+    """
+    m = _FORM_TAG.search(page)
+    form = None
+    if m is not None:
+        start = m.start()
+        parser = _FormParser(action, base_url)
+        try:
+            parser.feed(page[start:] if start else page)
+            parser.close()
+        except _Stop:
+            pass
+        form = parser.finish()
+    if form is None:
+        raise Exception("unable to find form for %s" % (action,))
+    return form
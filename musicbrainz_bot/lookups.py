@@ -0,0 +1,164 @@
+import psycopg2
+
+# table -> query of (id, name, aliases...) rows; link types are
+# (id, name, entity_type0, entity_type1) rows instead
+QUERIES = {
+    "area_type": "SELECT id, name FROM area_type",
+    "artist_type": "SELECT id, name FROM artist_type",
+    "gender": "SELECT id, name FROM gender",
+    "work_type": "SELECT id, name FROM work_type",
+    "release_packaging": "SELECT id, name FROM release_packaging",
+    "language": "SELECT id, name, iso_code_3, iso_code_1 FROM language",
+    "script": "SELECT id, name, iso_code FROM script",
+    "link_type": "SELECT id, name, entity_type0, entity_type1 FROM link_type",
+}
+
+# a few rows of the tables above, for use without a mirror
+SNAPSHOT = {
+    "area_type": [
+        (1, "Country"),
+        (2, "Subdivision"),
+        (3, "City"),
+        (4, "Municipality"),
+        (5, "District"),
+        (6, "Island"),
+        (7, "County"),
+    ],
+    "artist_type": [
+        (1, "Person"),
+        (2, "Group"),
+        (3, "Other"),
+        (4, "Character"),
+        (5, "Orchestra"),
+        (6, "Choir"),
+    ],
+    "gender": [
+        (1, "Male"),
+        (2, "Female"),
+        (3, "Other"),
+        (4, "Not applicable"),
+        (5, "Non-binary"),
+    ],
+    "script": [(28, "Latin", "Latn")],
+    "link_type": [
+        (352, "wikidata", "artist", "url"),
+        (358, "wikidata", "area", "url"),
+        (713, "geonames", "area", "url"),
+    ],
+}
+
+# tables of which SNAPSHOT has every row
+SNAPSHOT_COMPLETE = ("area_type", "artist_type", "gender")
+
+
+def _key(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def _entity_types(entity_types):
+    # link_type lists the two entity types in alphabetical order
+    return tuple(sorted(t.replace("-", "_") for t in entity_types))
+
+
+class LookupTables(object):
+    """Names and IDs of MusicBrainz types, link types, languages, scripts
+    and the like, loaded once and kept in memory.
+
+    resolve() turns a name (or an alias, such as the ISO code of a language
+    or script) into its ID and checks that an ID exists, so that a bad
+    value is rejected before any request is made. Tables are either
+    complete, as loaded from a mirror by from_mirror(), or partial, as in
+    the bundled snapshot (from_snapshot()): an ID missing from a partial
+    table is taken on trust, but a name has to be known.
+
+    Args:
+        tables (dict): rows per table, in the format of SNAPSHOT.
+        complete (iterable): the tables that have every row.
+    """
+
+    def __init__(self, tables, complete=()):
+        self.complete = set(complete)
+        self._names = {}
+        self._ids = {}
+        for table, rows in tables.items():
+            names = self._names[table] = {}
+            ids = self._ids[table] = {}
+            for id, name, *extra in rows:
+                if table == "link_type":
+                    entity_types = _entity_types(extra)
+                    names[entity_types + (_key(name),)] = id
+                    ids[id] = (name, entity_types)
+                    continue
+                ids[id] = name
+                for alias in [name] + extra:
+                    if alias:
+                        names.setdefault(_key(alias), id)
+
+    @classmethod
+    def from_snapshot(cls):
+        """Returns the tables bundled with the bot (see SNAPSHOT)."""
+        return cls(SNAPSHOT, SNAPSHOT_COMPLETE)
+
+    @classmethod
+    def from_mirror(cls, dsn):
+        """Loads every table from a local mirror of the MusicBrainz
+        database, with one query per table.
+
+        Args:
+            dsn (str): libpq connection string of the mirror.
+        """
+        conn = psycopg2.connect(dsn)
+        try:
+            tables = {}
+            cur = conn.cursor()
+            for table, query in QUERIES.items():
+                cur.execute(query)
+                tables[table] = cur.fetchall()
+            cur.close()
+        finally:
+            conn.close()
+        return cls(tables, QUERIES)
+
+    def resolve(self, table, value, *entity_types) -> int:
+        """Returns the ID of `value`, a name or an ID of a row of `table`.
+        Link types also need the types of the two entities, e.g.
+        resolve("link_type", "wikidata", "area", "url").
+
+        Raises:
+            Exception: unknown name or ID
+        """
+        if table not in self._ids:
+            if str(value).isdigit():
+                return int(value)
+            raise Exception("no %s table loaded to look up %r in" % (table, value))
+        if table == "link_type":
+            if len(entity_types) != 2:
+                raise Exception("link types need the types of both entities")
+            entity_types = _entity_types(entity_types)
+        if not isinstance(value, bool) and str(value).isdigit():
+            id = int(value)
+            if id not in self._ids[table]:
+                if table not in self.complete:
+                    return id
+                raise Exception("unknown %s ID %r" % (table, value))
+            if table == "link_type" and self._ids[table][id][1] != entity_types:
+                raise Exception(
+                    "link type %d is not between %s and %s" % ((id,) + entity_types)
+                )
+            return id
+        key = _key(value)
+        if table == "link_type":
+            key = entity_types + (key,)
+        try:
+            return self._names[table][key]
+        except KeyError:
+            raise Exception("unknown %s %r" % (table, value))
+
+    def name(self, table, id) -> str:
+        """Returns the name of the row of `table` with the given ID, or None
+        if it is unknown.
+        """
+        name = self._ids.get(table, {}).get(int(id))
+        if table == "link_type" and name is not None:
+            return name[0]
+        return name
@@ -0,0 +1,209 @@
+"""Runs many merges on a MusicBrainzClientPool, checking them all first.
+
+Each MusicBrainzClient.merge() call adds a group of entities to the merge
+queue of its session and then submits the merge, two requests that cannot
+overlap within one session. merge_many() first checks every group (known
+entity type, at least two entities, no entity in two groups, every entity
+existing) with a few bulk queries on a mirror (see MirrorPrecheck) or with
+lookups spread over the pool, then runs the valid merges on all the clients
+of the pool at once, each in its own session.
+
+e.g.
+with MusicBrainzClientPool(username, password, size=4) as pool:
+    results = merge_many(
+        pool,
+        [("artist", [mbid1, mbid2], mbid1, note), ...],
+        precheck=MirrorPrecheck(dsn),
+    )
+"""
+
+import concurrent.futures
+import re
+
+from musicbrainz_bot.metrics import outcome
+
+# entity types with a /<type>/merge_queue page (with "-" for "_" in the URL)
+MERGEABLE_TYPES = (
+    "area",
+    "artist",
+    "event",
+    "instrument",
+    "label",
+    "place",
+    "recording",
+    "release",
+    "release_group",
+    "series",
+    "work",
+)
+
+_MBID = re.compile(r"^[0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12}$")
+
+
+def read_group(group) -> tuple:
+    """Returns a merge group as (entity_type, entity_ids, target_id,
+    edit_note), with string IDs (MBIDs in lowercase) and the entity type as
+    in MERGEABLE_TYPES (e.g. "release-group" becomes "release_group").
+
+    Args:
+        group: the arguments of MusicBrainzClient.merge(), as a tuple or as
+            a dict with those keys ("edit_note" optional).
+    """
+    if isinstance(group, dict):
+        entity_type = group["entity_type"]
+        entity_ids = group["entity_ids"]
+        target_id = group["target_id"]
+        edit_note = group.get("edit_note", "")
+    else:
+        entity_type, entity_ids, target_id, edit_note = group
+    entity_type = str(entity_type).replace("-", "_")
+    entity_ids = [str(id).lower() for id in entity_ids]
+    return entity_type, entity_ids, str(target_id).lower(), edit_note
+
+
+def _members(group):
+    entity_type, entity_ids, target_id, edit_note = group
+    return list(dict.fromkeys([target_id] + entity_ids))
+
+
+def check_groups(groups) -> list:
+    """Returns, for each group (as returned by read_group), why it cannot
+    be merged, or None. This needs no request.
+    """
+    problems = []
+    seen = {}
+    for index, group in enumerate(groups):
+        entity_type = group[0]
+        members = _members(group)
+        bad = [id for id in members if not (id.isdigit() or _MBID.match(id))]
+        overlaps = [
+            seen[(entity_type, id)] for id in members if (entity_type, id) in seen
+        ]
+        if entity_type not in MERGEABLE_TYPES:
+            problem = "cannot merge entities of type %r" % (entity_type,)
+        elif len(members) < 2:
+            problem = "nothing to merge"
+        elif bad:
+            problem = "invalid ID %r" % (bad[0],)
+        elif group[2] not in group[1]:
+            # merge() only queues entity_ids
+            problem = "target %s is not one of the entities" % (group[2],)
+        elif overlaps:
+            # merging both at once would make them fail or race
+            problem = "overlaps group %d" % overlaps[0]
+        else:
+            problem = None
+            for id in members:
+                seen[(entity_type, id)] = index
+        problems.append(problem)
+    return problems
+
+
+def _existing(pool, entity_type, ids, precheck):
+    """Returns the IDs of existing entities and the lookup errors per ID."""
+    if precheck is not None:
+        return precheck.existing(entity_type, ids), {}
+    # the web service looks entities up by MBID only: row IDs are taken on
+    # trust
+    futures = {
+        id: pool.submit("get_entity", entity_type.replace("_", "-"), id, inc=())
+        for id in ids
+        if _MBID.match(id)
+    }
+    missing = set()
+    errors = {}
+    for id, future in futures.items():
+        try:
+            if future.result() is None:
+                missing.add(id)
+        except Exception as e:
+            errors[id] = e
+    return set(ids) - missing - set(errors), errors
+
+
+def validate_groups(pool, groups, precheck=None) -> list:
+    """Like check_groups(), also making sure that every entity exists:
+    with one query per MirrorPrecheck.chunk_size IDs if `precheck` is
+    given, or with a web service lookup per MBID, on the clients of `pool`.
+    A group for which a lookup failed gets the exception rather than a
+    reason.
+    """
+    problems = check_groups(groups)
+    ids = {}
+    for group, problem in zip(groups, problems):
+        if problem is None:
+            ids.setdefault(group[0], []).extend(_members(group))
+    existing = {}
+    errors = {}
+    for entity_type, type_ids in ids.items():
+        existing[entity_type], errors[entity_type] = _existing(
+            pool, entity_type, type_ids, precheck
+        )
+    for index, group in enumerate(groups):
+        if problems[index] is None:
+            members = _members(group)
+            failed = [id for id in members if id in errors[group[0]]]
+            missing = [id for id in members if id not in existing[group[0]]]
+            if failed:
+                problems[index] = errors[group[0]][failed[0]]
+            elif missing:
+                problems[index] = "no %s %s" % (group[0], missing[0])
+    return problems
+
+
+def merge_many(pool, groups, precheck=None, validate=True) -> list:
+    """Merges every valid group on `pool`.
+
+    Args:
+        groups (iterable): merge groups, see read_group().
+        precheck (MirrorPrecheck, optional): mirror to check the groups
+            against, rather than the web service.
+        validate (bool): check the groups first (see validate_groups()).
+            Otherwise the server turns invalid merges away, one at a time.
+
+    Returns:
+        list: one entry per group, in order, with a "status" of "changed",
+            "noop", "invalid" or "error" (also when an entity of the group
+            could not be looked up), and the "result" of the merge or the
+            "error".
+    """
+    groups = [read_group(group) for group in groups]
+    if validate:
+        problems = validate_groups(pool, groups, precheck)
+    else:
+        problems = [None] * len(groups)
+    # clients resuming one cached session share its merge queue
+    max_in_flight = 1 if pool.shares_session else pool.size
+    results = [None] * len(groups)
+    pending = {}
+
+    def finish(done):
+        for future in done:
+            index = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                results[index] = {"status": "error", "error": repr(e)}
+            else:
+                results[index] = {"status": outcome(result), "result": result}
+
+    for index, (group, problem) in enumerate(zip(groups, problems)):
+        if isinstance(problem, Exception):
+            results[index] = {"status": "error", "error": repr(problem)}
+            continue
+        if problem is not None:
+            results[index] = {"status": "invalid", "error": problem}
+            continue
+        if len(pending) >= max_in_flight:
+            finish(
+                concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                ).done
+            )
+        entity_type, entity_ids, target_id, edit_note = group
+        future = pool.submit(
+            "merge", entity_type.replace("_", "-"), entity_ids, target_id, edit_note
+        )
+        pending[future] = index
+    finish(concurrent.futures.wait(pending).done)
+    return results
@@ -0,0 +1,285 @@
+import bisect
+import collections
+import functools
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_MBID = re.compile(r"/[0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12}(?=/|$)", re.I)
+
+# row IDs in the paths the client requests: /edit/<id>/cancel and
+# /artist/<id>/credit/<id>/edit (but not the version in /ws/2/...)
+_ROW_ID = re.compile(r"(/(?:edit|credit))/\d+(?=/|$)")
+
+
+def endpoint(url) -> str:
+    """The path of a URL with MBIDs and row IDs replaced, e.g.
+    "/artist/<id>/edit", so that requests to one page are counted together.
+    """
+    path = _MBID.sub("/<id>", urllib.parse.urlsplit(url).path)
+    return _ROW_ID.sub(r"\1/<id>", path) or "/"
+
+
+def outcome(result) -> str:
+    """Classifies the return value of a client method: an MBID or True
+    means an edit was made, False or None that there was nothing to do.
+    Batch methods return a list of those.
+    """
+    if isinstance(result, list):
+        return "changed" if any(result) else "noop"
+    return "changed" if result else "noop"
+
+
+class Histogram(object):
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with "+Inf"."""
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+        totals, total = [], 0
+        for count in self.counts:
+            total += count
+            totals.append(total)
+        return list(zip(bounds, totals))
+
+
+def _labels(**labels):
+    return ",".join(
+        '%s="%s"'
+        % (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for (name, value) in labels.items()
+    )
+
+
+class Metrics(object):
+    """Latency, traffic and outcome counters of MusicBrainzClient.
+
+    Every HTTP request is recorded per method and endpoint() with its
+    latency (excluding the time spent waiting on the rate limiter), its
+    status code ("error" if no response was received) and the bytes sent
+    and received. Every call of a public edit method is recorded with its
+    latency and outcome(): "changed", "noop" or "error". Clients of a
+    MusicBrainzClientPool share one Metrics.
+
+    The counters can be exported with prometheus() in the Prometheus text
+    format, or with snapshot() as a dict, and written to a file (e.g. for
+    the node_exporter textfile collector) with write().
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self.rate_limit_wait = 0.0
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._edits = {}
+        self._gauges = {}
+
+    def set_gauge(self, name, value):
+        """Sets a value that goes up and down, e.g. "concurrency_limit"."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe_wait(self, seconds):
+        with self._lock:
+            self.rate_limit_wait += seconds
+
+    def _request_entry(self, method, url):
+        key = (method, endpoint(url))
+        entry = self._requests.get(key)
+        if entry is None:
+            entry = self._requests[key] = {
+                "latency": Histogram(self.buckets),
+                "status": collections.Counter(),
+                "sent": 0,
+                "received": 0,
+                "retries": 0,
+            }
+        return entry
+
+    def observe_request(self, method, url, seconds, status, sent=0, received=0):
+        with self._lock:
+            entry = self._request_entry(method, url)
+            entry["latency"].observe(seconds)
+            entry["status"][str(status)] += 1
+            entry["sent"] += sent
+            entry["received"] += received
+
+    def observe_retry(self, method, url):
+        with self._lock:
+            self._request_entry(method, url)["retries"] += 1
+
+    def observe_edit(self, method, seconds, result):
+        with self._lock:
+            entry = self._edits.get(method)
+            if entry is None:
+                entry = self._edits[method] = {
+                    "latency": Histogram(self.buckets),
+                    "outcome": collections.Counter(),
+                }
+            entry["latency"].observe(seconds)
+            entry["outcome"][result] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "time": time.time(),
+                "started": self.started,
+                "rate_limit_wait": self.rate_limit_wait,
+                "gauges": dict(self._gauges),
+                "requests": [
+                    {
+                        "method": method,
+                        "endpoint": path,
+                        "count": entry["latency"].count,
+                        "seconds": entry["latency"].sum,
+                        "buckets": dict(entry["latency"].cumulative()),
+                        "status": dict(entry["status"]),
+                        "sent": entry["sent"],
+                        "received": entry["received"],
+                        "retries": entry["retries"],
+                    }
+                    for ((method, path), entry) in sorted(self._requests.items())
+                ],
+                "edits": [
+                    {
+                        "method": method,
+                        "count": entry["latency"].count,
+                        "seconds": entry["latency"].sum,
+                        "buckets": dict(entry["latency"].cumulative()),
+                        "outcome": dict(entry["outcome"]),
+                    }
+                    for (method, entry) in sorted(self._edits.items())
+                ],
+            }
+
+    def prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help):
+            lines.append("# HELP musicbrainz_bot_%s %s" % (name, help))
+            lines.append("# TYPE musicbrainz_bot_%s %s" % (name, kind))
+
+        def histogram(name, entries, **labels):
+            for entry in entries:
+                entry_labels = {k: entry[v] for (k, v) in labels.items()}
+                for bound, count in entry["buckets"].items():
+                    lines.append(
+                        "musicbrainz_bot_%s_bucket{%s} %d"
+                        % (name, _labels(**entry_labels, le=bound), count)
+                    )
+                lines.append(
+                    "musicbrainz_bot_%s_sum{%s} %r"
+                    % (name, _labels(**entry_labels), entry["seconds"])
+                )
+                lines.append(
+                    "musicbrainz_bot_%s_count{%s} %d"
+                    % (name, _labels(**entry_labels), entry["count"])
+                )
+
+        requests = snapshot["requests"]
+        metric("request_duration_seconds", "histogram", "Latency of HTTP requests.")
+        histogram(
+            "request_duration_seconds", requests, method="method", endpoint="endpoint"
+        )
+        metric("requests_total", "counter", "HTTP requests by status code.")
+        for entry in requests:
+            for status, count in sorted(entry["status"].items()):
+                labels = _labels(
+                    method=entry["method"], endpoint=entry["endpoint"], status=status
+                )
+                lines.append("musicbrainz_bot_requests_total{%s} %d" % (labels, count))
+        for direction in ["sent", "received"]:
+            metric(
+                "request_%s_bytes_total" % direction,
+                "counter",
+                "HTTP body bytes %s." % direction,
+            )
+            for entry in requests:
+                labels = _labels(method=entry["method"], endpoint=entry["endpoint"])
+                lines.append(
+                    "musicbrainz_bot_request_%s_bytes_total{%s} %d"
+                    % (direction, labels, entry[direction])
+                )
+        metric("request_retries_total", "counter", "HTTP requests sent again.")
+        for entry in requests:
+            labels = _labels(method=entry["method"], endpoint=entry["endpoint"])
+            lines.append(
+                "musicbrainz_bot_request_retries_total{%s} %d"
+                % (labels, entry["retries"])
+            )
+        metric(
+            "rate_limit_wait_seconds_total",
+            "counter",
+            "Time spent waiting on the rate limiter.",
+        )
+        lines.append(
+            "musicbrainz_bot_rate_limit_wait_seconds_total %r"
+            % snapshot["rate_limit_wait"]
+        )
+        for name, value in sorted(snapshot["gauges"].items()):
+            metric(name, "gauge", name.replace("_", " ").capitalize() + ".")
+            lines.append("musicbrainz_bot_%s %r" % (name, value))
+        metric("edit_duration_seconds", "histogram", "Latency of edit methods.")
+        histogram("edit_duration_seconds", snapshot["edits"], method="method")
+        metric("edits_total", "counter", "Edit method calls by outcome.")
+        for entry in snapshot["edits"]:
+            for result, count in sorted(entry["outcome"].items()):
+                labels = _labels(method=entry["method"], outcome=result)
+                lines.append("musicbrainz_bot_edits_total{%s} %d" % (labels, count))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically replaces `path` with the Prometheus text format if it
+        ends with ".prom", and with a JSON snapshot() otherwise.
+        """
+        if path.endswith(".prom"):
+            data = self.prometheus()
+        else:
+            data = json.dumps(self.snapshot(), indent=2) + "\n"
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+def instrumented(method):
+    """Records the latency and outcome of a MusicBrainzClient method in the
+    client's metrics.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception:
+            self.metrics.observe_edit(
+                method.__name__, time.monotonic() - start, "error"
+            )
+            raise
+        self.metrics.observe_edit(
+            method.__name__, time.monotonic() - start, outcome(result)
+        )
+        return result
+
+    return wrapper
@@ -0,0 +1,144 @@
+import functools
+import sys
+import urllib.parse
+
+
+def format_time(secs):
+    return "%0d:%02d" % (secs // 60, secs % 60)
+
+
+@functools.lru_cache(maxsize=65536)
+def field_key(prefix: str, *parts) -> str:
+    """Returns the interned form key `prefix.part0.part1...`.
+
+    Keys are built once per distinct (prefix, parts) and then shared, so
+    building the payload of a million areas, or of a release with thousands
+    of tracks, does not format the same key strings over and over.
+    """
+    return sys.intern(".".join((prefix,) + tuple(str(part) for part in parts)))
+
+
+def _list_pairs(prefix, field, values):
+    for i, value in enumerate(values):
+        # list of strings (ISO codes), e.g. "edit-area.iso_3166_1.0"
+        if isinstance(value, str):
+            yield field_key(prefix, field, i), value
+        # list of dicts or models.UrlRelationship (external links / url),
+        # e.g. "edit-area.url.0.text"
+        elif hasattr(value, "items"):
+            for subfield, subvalue in value.items():
+                yield field_key(prefix, field, i, subfield), subvalue
+
+
+def iter_payload(template: dict, prefix: str, required_fields=()):
+    """Yields the (key, value) pairs of create_payload() one at a time.
+
+    Raises:
+        Exception: Missing required field - if a required field is None
+    """
+    for field, value in template.items():
+        if value is None:
+            if field in required_fields:
+                raise Exception("Missing required field: " + field_key(prefix, field))
+        elif isinstance(value, (list, tuple)):
+            yield from _list_pairs(prefix, field, value)
+        else:
+            yield field_key(prefix, field), value
+
+
+def _comparable(value):
+    if value is None:
+        return None
+    # sorted by repr, since None, strings and lists do not compare
+    if isinstance(value, (list, tuple)):
+        return sorted((_comparable(v) for v in value), key=repr)
+    if hasattr(value, "items"):
+        return sorted(((k, _comparable(v)) for (k, v) in value.items()), key=repr)
+    return str(value)
+
+
+def changed_fields(current, update) -> dict:
+    """Returns the fields of `update` whose value differs from `current`.
+
+    Values are compared as the form would submit them: scalars as strings
+    (so a type_id of 3 equals "3") and lists regardless of order.
+    """
+    return {
+        field: value
+        for (field, value) in update.items()
+        if _comparable(value) != _comparable(current.get(field))
+    }
+
+
+def added_items(current, desired) -> list:
+    """Returns the entries of the list `desired` that are not in `current`."""
+    known = [_comparable(value) for value in current or ()]
+    return [value for value in desired or () if _comparable(value) not in known]
+
+
+@functools.lru_cache(maxsize=1024)
+def _medium_keys(medium_no):
+    return (
+        field_key("mediums", medium_no, "format"),
+        field_key("mediums", medium_no, "position"),
+    )
+
+
+@functools.lru_cache(maxsize=65536)
+def _track_keys(medium_no, track_no):
+    return (
+        field_key("mediums", medium_no, "track", track_no, "position"),
+        field_key("mediums", medium_no, "track", track_no, "name"),
+        field_key("mediums", medium_no, "track", track_no, "length"),
+    )
+
+
+def iter_album_form(album, edit_note=None):
+    """Yields the (key, value) pairs of album_to_form() one at a time. The
+    edit note defaults to the album's CD Baby page.
+    """
+    yield "artist_credit.names.0.artist.name", album["artist"]
+    yield "artist_credit.names.0.name", album["artist"]
+    if album.get("artist_mbid"):
+        yield "artist_credit.names.0.mbid", album["artist_mbid"]
+    yield "name", album["title"]
+    if album.get("date"):
+        date_parts = album["date"].split("-")
+        for key, part in zip(("date.year", "date.month", "date.day"), date_parts):
+            yield key, part
+    if album.get("label"):
+        yield "labels.0.name", album["label"]
+    if album.get("barcode"):
+        yield "barcode", album["barcode"]
+    for medium_no, medium in enumerate(album["mediums"]):
+        format_key, position_key = _medium_keys(medium_no)
+        yield format_key, medium["format"]
+        yield position_key, medium["position"]
+        for track_no, track in enumerate(medium["tracks"]):
+            position_key, name_key, length_key = _track_keys(medium_no, track_no)
+            yield position_key, track["position"]
+            yield name_key, track["title"]
+            yield length_key, format_time(track["length"])
+    if edit_note is None:
+        edit_note = "http://www.cdbaby.com/cd/" + album["_id"].split(":")[1]
+    yield "edit_note", edit_note
+
+
+@functools.lru_cache(maxsize=65536)
+def _quote_key(key):
+    return urllib.parse.quote_plus(key)
+
+
+def urlencode_pairs(pairs) -> bytes:
+    """application/x-www-form-urlencoded body for an iterable of (key,
+    value) pairs, consumed as it is encoded. Keys are quoted once and
+    reused; values are quoted as str (or bytes) like urllib.parse.urlencode
+    does.
+    """
+    quote = urllib.parse.quote_plus
+    return "&".join(
+        _quote_key(key)
+        + "="
+        + quote(value if isinstance(value, (str, bytes)) else str(value))
+        for key, value in pairs
+    ).encode("ascii")
@@ -0,0 +1,143 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from musicbrainz_bot.cache import EntityCache
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.metrics import Metrics
+from musicbrainz_bot.quota import EditQuota
+from musicbrainz_bot.ratelimit import DEFAULT_BURST, DEFAULT_RATE, RateLimiter
+from musicbrainz_bot.retry import RetryPolicy
+
+
+class MusicBrainzClientPool(object):
+    """A pool of independently logged-in MusicBrainzClient sessions.
+
+    Edits are dispatched to a thread pool, each worker checking out a client
+    for the duration of one call, so a client (and its browser state) is
+    never used by two threads at once. All clients share one RateLimiter,
+    which keeps the pool as a whole within the server's rate limit, and one
+    EditQuota, so edits_left() accounts for the edits of every client, one
+    EntityCache, one Metrics, and one RetryPolicy, whose circuit breaker
+    pauses every client when the server keeps failing. Passing an
+    AIMDConcurrency as `concurrency` makes the clients share it too, so that
+    the number of requests in flight adapts to the server's load, up to
+    `size`.
+
+    Passing `cookie_dir` makes every client resume the same cached session,
+    so avoid it when jobs rely on per-session server state (e.g. the merge
+    queue; merges.merge_many() then runs one merge at a time). The first
+    client then logs in (or resumes) before the others start, so that they
+    load its cookies instead of all logging in at once.
+
+    e.g.
+    with MusicBrainzClientPool(username, password, size=4) as pool:
+        futures = pool.submit_many(
+            ("add_url", ("artist", mbid, 352, url), {"edit_note": note})
+            for mbid, url in links
+        )
+        results = [f.result() for f in futures]
+    """
+
+    def __init__(
+        self,
+        username,
+        password,
+        server="https://musicbrainz.org",
+        size=4,
+        rate=DEFAULT_RATE,
+        burst=DEFAULT_BURST,
+        **client_kwargs
+    ):
+        self.server = server
+        self.size = size
+        self.rate_limiter = client_kwargs.pop("rate_limiter", None) or RateLimiter(
+            rate, burst
+        )
+        self.quota = client_kwargs.pop("quota", None) or EditQuota()
+        self.cache = client_kwargs.pop("cache", None) or EntityCache()
+        self.metrics = client_kwargs.pop("metrics", None) or Metrics()
+        self.retry = client_kwargs.pop("retry", None) or RetryPolicy()
+        self.concurrency = client_kwargs.pop("concurrency", None)
+        self.shares_session = bool(client_kwargs.get("cookie_dir"))
+        self.precheck = client_kwargs.get("precheck")
+        self._executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix="musicbrainz-bot"
+        )
+        self._clients = queue.Queue()
+
+        def login():
+            return self._executor.submit(
+                MusicBrainzClient,
+                username,
+                password,
+                server,
+                rate_limiter=self.rate_limiter,
+                quota=self.quota,
+                cache=self.cache,
+                metrics=self.metrics,
+                retry=self.retry,
+                concurrency=self.concurrency,
+                **client_kwargs
+            )
+
+        try:
+            if self.shares_session:
+                self._clients.put(login().result())
+            logins = [login() for _ in range(self._clients.qsize(), size)]
+            for future in logins:
+                self._clients.put(future.result())
+        except Exception:
+            self._executor.shutdown(wait=False)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _call(self, method, args, kwargs):
+        client = self._clients.get()
+        try:
+            if callable(method):
+                return method(client, *args, **kwargs)
+            return getattr(client, method)(*args, **kwargs)
+        finally:
+            self._clients.put(client)
+
+    def submit(self, method, *args, **kwargs):
+        """Schedules `method` of a pooled client to be called with the given
+        arguments and returns a concurrent.futures.Future for its result.
+
+        `method` is either the name of a MusicBrainzClient method or a
+        callable, which is then called with the client as first argument.
+        """
+        if not callable(method) and not callable(
+            getattr(MusicBrainzClient, method, None)
+        ):
+            raise AttributeError("MusicBrainzClient has no method %r" % (method,))
+        return self._executor.submit(self._call, method, args, kwargs)
+
+    def submit_many(self, jobs) -> list:
+        """Schedules a batch of calls.
+
+        Args:
+            jobs (iterable): (method, args, kwargs) tuples, or dicts with the
+                keys "method", "args" and "kwargs" (the last two optional).
+
+        Returns:
+            list: one Future per job, in the same order as `jobs`.
+        """
+        futures = []
+        for job in jobs:
+            if isinstance(job, dict):
+                method = job["method"]
+                args = job.get("args", ())
+                kwargs = job.get("kwargs", {})
+            else:
+                method, args, kwargs = job
+            futures.append(self.submit(method, *args, **kwargs))
+        return futures
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,230 @@
+import collections
+import threading
+
+import psycopg2
+from psycopg2 import sql
+
+QUERIES = {
+    "artist": """
+        SELECT gid::text, area, type, gender, begin_date_year, end_date_year, comment
+        FROM artist WHERE gid = ANY(%s::uuid[])""",
+    "work": """
+        SELECT gid::text, type, comment,
+            EXISTS (SELECT 1 FROM work_language wl WHERE wl.work = work.id)
+                AS language
+        FROM work WHERE gid = ANY(%s::uuid[])""",
+    "url": """
+        SELECT gid::text, url FROM url WHERE gid = ANY(%s::uuid[])""",
+    "release": """
+        SELECT gid::text, script, language, packaging
+        FROM release WHERE gid = ANY(%s::uuid[])""",
+}
+
+# MusicBrainzClient method checked against the mirror -> type of the entity
+# given (or whose "gid" is given) as its first argument
+CALL_ENTITIES = {
+    "edit_artist": "artist",
+    "set_artist_type": "artist",
+    "edit_work": "work",
+    "edit_url": "url",
+    "set_release_script": "release",
+    "set_release_language": "release",
+    "set_release_packaging": "release",
+}
+
+# release edit form control -> release column
+RELEASE_COLUMNS = {
+    "script_id": "script",
+    "language_id": "language",
+    "packaging_id": "packaging",
+}
+
+# edit_artist() / edit_work() update item -> column that is set once it is
+ARTIST_COLUMNS = {
+    "area": "area",
+    "type": "type",
+    "gender": "gender",
+    "begin_date": "begin_date_year",
+    "end_date": "end_date_year",
+    "comment": "comment",
+}
+WORK_COLUMNS = {"type": "type", "language": "language", "comment": "comment"}
+
+
+def _is_set(value):
+    # NULL ids and dates, empty comments and works without a language
+    return value is not None and value != "" and value is not False
+
+
+def _items_are_set(row, update, columns, partial):
+    items = [_is_set(row[columns[item]]) for item in update if item in columns]
+    if not items:
+        # nothing the mirror can tell about
+        return False
+    return all(items) if partial else any(items)
+
+
+class MirrorPrecheck(object):
+    """Reads entities from a local mirror of the MusicBrainz database to
+    tell, before any request is made, that an edit would be a no-op.
+
+    The checks reproduce the ones MusicBrainzClient makes on the edit
+    pages, so an edit is skipped only when the page would have made the
+    client give up anyway. Entities missing from the mirror are never
+    skipped. Since the mirror can lag behind the server, a value removed on
+    the server since the last replication can still cause a skip.
+
+    Rows are kept in an LRU of `maxsize` entities, and dropped when the
+    client edits the entity; prefetch() loads many entities with one query
+    per `chunk_size` MBIDs, so that a whole batch can be checked without a
+    round trip per entity. The batch runner and EditBuffer prefetch the
+    entities of the edits they are about to make (see prefetch_calls()), so
+    `maxsize` should be well above their batch sizes.
+
+    Args:
+        dsn (str): libpq connection string of the mirror, e.g. the one built
+            by tests.utils.get_db_URI().
+    """
+
+    def __init__(self, dsn, chunk_size=1000, maxsize=100000):
+        self.dsn = dsn
+        self.chunk_size = chunk_size
+        self.maxsize = maxsize
+        self._conn = None
+        self._lock = threading.Lock()
+        # (entity type, MBID) -> row, or None if the mirror has no such entity
+        self._rows = collections.OrderedDict()
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(self.dsn)
+            self._conn.autocommit = True
+        return self._conn
+
+    def _remember(self, key, row):
+        self._rows[key] = row
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+
+    def _fetch(self, entity_type, gids):
+        # returns the rows of `gids`, which may not all stay in the cache
+        fetched = {}
+        with self._lock:
+            cur = self._connection().cursor()
+            try:
+                for start in range(0, len(gids), self.chunk_size):
+                    end = start + self.chunk_size
+                    chunk = gids[start:end]
+                    cur.execute(QUERIES[entity_type], (chunk,))
+                    columns = [column.name for column in cur.description]
+                    found = {row[0]: dict(zip(columns, row)) for row in cur}
+                    for gid in chunk:
+                        fetched[gid] = found.get(gid)
+                        self._remember((entity_type, gid), fetched[gid])
+            finally:
+                cur.close()
+        return fetched
+
+    def prefetch(self, entity_type, gids):
+        """Loads the given entities into the cache, in bulk."""
+        missing = []
+        with self._lock:
+            for gid in dict.fromkeys(gids):
+                if (entity_type, gid) in self._rows:
+                    self._rows.move_to_end((entity_type, gid))
+                else:
+                    missing.append(gid)
+        if missing:
+            self._fetch(entity_type, missing)
+
+    def existing(self, entity_type, ids) -> set:
+        """Returns those of the given row IDs and MBIDs of entities of
+        `entity_type` (e.g. "artist" or "release_group") that are in the
+        mirror, with one query per `chunk_size` of them. Not cached.
+        """
+        query = sql.SQL(
+            "SELECT id, gid::text FROM {} "
+            "WHERE id = ANY(%s::integer[]) OR gid = ANY(%s::uuid[])"
+        ).format(sql.Identifier(entity_type.replace("-", "_")))
+        ids = list(dict.fromkeys(ids))
+        found = set()
+        with self._lock:
+            cur = self._connection().cursor()
+            try:
+                for start in range(0, len(ids), self.chunk_size):
+                    end = start + self.chunk_size
+                    chunk = ids[start:end]
+                    row_ids = [int(id) for id in chunk if str(id).isdigit()]
+                    gids = [str(id) for id in chunk if not str(id).isdigit()]
+                    cur.execute(query, (row_ids, gids))
+                    for row_id, gid in cur:
+                        found.update((row_id, str(row_id), gid))
+            finally:
+                cur.close()
+        return {id for id in ids if id in found}
+
+    def prefetch_calls(self, calls):
+        """Prefetches the entities that the given MusicBrainzClient calls,
+        (method name, args, kwargs) tuples, would check.
+        """
+        gids = {}
+        for method, args, kwargs in calls:
+            if method not in CALL_ENTITIES or not args:
+                continue
+            entity_type = CALL_ENTITIES[method]
+            entity = args[0]
+            gid = entity.get("gid") if hasattr(entity, "get") else entity
+            if gid is not None:
+                gids.setdefault(entity_type, []).append(gid)
+        for entity_type, type_gids in gids.items():
+            self.prefetch(entity_type, type_gids)
+
+    def invalidate(self, entity_type, gid):
+        """Forgets an entity, so that it is read again from the mirror."""
+        with self._lock:
+            self._rows.pop((entity_type, gid), None)
+
+    def get(self, entity_type, gid) -> dict:
+        """Returns the mirror's row for an entity, or None if it has none."""
+        key = (entity_type, gid)
+        with self._lock:
+            if key in self._rows:
+                self._rows.move_to_end(key)
+                return self._rows[key]
+        return self._fetch(entity_type, [gid])[gid]
+
+    def artist_is_noop(self, artist, update, partial=False) -> bool:
+        """Whether an item of `update` is already set, or with `partial`,
+        whether all of them are (see MusicBrainzClient.edit_artist)."""
+        row = self.get("artist", artist["gid"])
+        return row is not None and _items_are_set(row, update, ARTIST_COLUMNS, partial)
+
+    def artist_type_is_noop(self, gid) -> bool:
+        row = self.get("artist", gid)
+        return row is not None and row["type"] is not None
+
+    def url_is_noop(self, gid, old_url, new_url) -> bool:
+        row = self.get("url", gid)
+        if row is None:
+            return False
+        return row["url"] != str(old_url) or row["url"] == str(new_url)
+
+    def work_is_noop(self, work, update, partial=False) -> bool:
+        row = self.get("work", work["gid"])
+        return row is not None and _items_are_set(row, update, WORK_COLUMNS, partial)
+
+    def release_is_noop(self, gid, attributes) -> bool:
+        """`attributes` as taken by MusicBrainzClient._edit_release_information."""
+        row = self.get("release", gid)
+        if row is None or not set(attributes) <= set(RELEASE_COLUMNS):
+            return False
+        changed = False
+        for k, (old, new) in attributes.items():
+            value = row[RELEASE_COLUMNS[k]]
+            current = [""] if value is None else [str(value)]
+            if old is not None and current != old:
+                return True
+            if current != new:
+                changed = True
+        return not changed
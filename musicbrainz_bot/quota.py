@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import datetime
+
+
+class EditQuota(object):
+    """Tracks how many edits an editor has left without scraping the edit
+    search on every check.
+
+    The counts are seeded from MusicBrainzClient.edits_left_today() and
+    edits_left_globally(), then decremented locally for every edit the
+    clients record. They are reconciled with the server again every
+    `reconcile_interval` seconds, when the UTC day changes, and (at most
+    every `near_limit_interval` seconds) once the estimate is within
+    `margin` edits of a limit. Reconciling also picks up edits that were
+    closed meanwhile, which free up the global quota. If a count cannot be
+    scraped, its previous estimate is kept (0 if there is none yet, to be
+    safe) and the scrape is retried after `near_limit_interval` seconds.
+    The clients need an editor_id to search for their edits.
+
+    One instance can be shared by several clients of the same editor.
+    """
+
+    def __init__(
+        self,
+        max_today=1000,
+        max_globally=2000,
+        reconcile_interval=3600,
+        margin=50,
+        near_limit_interval=60,
+    ):
+        self.max_today = max_today
+        self.max_globally = max_globally
+        self.reconcile_interval = reconcile_interval
+        self.margin = margin
+        self.near_limit_interval = near_limit_interval
+        self._lock = threading.Lock()
+        self._left_today = None
+        self._left_globally = None
+        self._reconciled_at = None
+        self._day = None
+        self._unknown = False
+
+    def _needs_reconcile(self, now, today):
+        if self._reconciled_at is None or self._day != today:
+            return True
+        age = now - self._reconciled_at
+        if age >= self.reconcile_interval:
+            return True
+        near_limit = min(self._left_today, self._left_globally) <= self.margin
+        return (near_limit or self._unknown) and age >= self.near_limit_interval
+
+    def left(self, client) -> int:
+        """Returns the estimated number of edits left, reconciling with the
+        server through `client` when needed.
+
+        Raises:
+            Exception: `client` has no editor_id
+        """
+        if client.editor_id is None:
+            raise Exception("pass editor_id to the client to track its edit quota")
+        with self._lock:
+            now = time.monotonic()
+            today = datetime.utcnow().date()
+            if self._needs_reconcile(now, today):
+                left_today = client.edits_left_today(self.max_today, unknown=None)
+                left_globally = client.edits_left_globally(
+                    self.max_globally, unknown=None
+                )
+                self._unknown = left_today is None or left_globally is None
+                if left_today is not None:
+                    self._left_today = left_today
+                elif self._left_today is None or self._day != today:
+                    self._left_today = 0
+                if left_globally is not None:
+                    self._left_globally = left_globally
+                elif self._left_globally is None:
+                    self._left_globally = 0
+                self._reconciled_at = now
+                self._day = today
+            return max(0, min(self._left_today, self._left_globally))
+
+    def record(self, count=1):
+        """Counts `count` successfully submitted edits."""
+        with self._lock:
+            if self._reconciled_at is None:
+                return
+            self._left_today -= count
+            self._left_globally -= count
@@ -0,0 +1,203 @@
+import contextlib
+import email.utils
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+# https://musicbrainz.org/doc/MusicBrainz_API/Rate_Limiting
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 1
+
+
+def parse_retry_after(value) -> float:
+    """Converts the value of a Retry-After header (delay in seconds or an
+    HTTP date) into a number of seconds from now. Returns None if the value
+    cannot be parsed.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket refilled at `rate` tokens per second and
+    holding at most `burst` tokens.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hands out no tokens for the next `seconds` seconds and restarts
+        the refill (with an empty bucket) once the pause is over.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = until
+
+
+class RateLimiter(object):
+    """Keeps one TokenBucket per host.
+
+    Args:
+        rate (float): requests per second allowed for hosts not in `hosts`.
+        burst (int): burst capacity for hosts not in `hosts`.
+        hosts (dict, optional): per-host overrides as {host: (rate, burst)}.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, hosts=None):
+        self.rate = rate
+        self.burst = burst
+        self.hosts = dict(hosts or {})
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def bucket(self, url) -> TokenBucket:
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.hosts.get(host, (self.rate, self.burst))
+                bucket = self._buckets[host] = TokenBucket(rate, burst)
+            return bucket
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
+
+    def defer(self, url, seconds):
+        """Honours a Retry-After of `seconds` sent by the host of `url`."""
+        self.bucket(url).pause(seconds)
+
+
+class SharedRateLimiter(object):
+    """A RateLimiter whose buckets live in an SQLite file, so that every bot
+    process on the host that uses the same `path` draws from the same
+    per-host budget. Bucket state is updated under SQLite's write lock, and
+    times are wall-clock seconds since they are compared across processes.
+
+    Args:
+        path (str, optional): the SQLite file. Defaults to a file in the
+            system temporary directory.
+        rate, burst, hosts: as for RateLimiter. All processes sharing the
+            file should use the same values.
+    """
+
+    def __init__(self, path=None, rate=DEFAULT_RATE, burst=DEFAULT_BURST, hosts=None):
+        self.path = path or os.path.join(
+            tempfile.gettempdir(), "musicbrainz-bot-ratelimit.sqlite3"
+        )
+        self.rate = rate
+        self.burst = burst
+        self.hosts = dict(hosts or {})
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS bucket ("
+                " host TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " paused_until REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._local.db = db
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _load(self, db, host, now):
+        rate, burst = self.hosts.get(host, (self.rate, self.burst))
+        row = db.execute(
+            "SELECT tokens, updated, paused_until FROM bucket WHERE host = ?",
+            (host,),
+        ).fetchone()
+        if row is None:
+            tokens, updated, paused_until = float(burst), now, 0.0
+        else:
+            tokens, updated, paused_until = row
+        if now > updated:
+            tokens = min(burst, tokens + (now - updated) * rate)
+            updated = now
+        return rate, tokens, updated, paused_until
+
+    def _store(self, db, host, tokens, updated, paused_until):
+        db.execute(
+            "INSERT OR REPLACE INTO bucket (host, tokens, updated, paused_until)"
+            " VALUES (?, ?, ?, ?)",
+            (host, tokens, updated, paused_until),
+        )
+
+    def acquire(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        while True:
+            with self._transaction() as db:
+                now = time.time()
+                rate, tokens, updated, paused_until = self._load(db, host, now)
+                if now >= paused_until and tokens >= 1:
+                    self._store(db, host, tokens - 1, updated, paused_until)
+                    return
+                wait = max(paused_until - now, (1 - tokens) / rate)
+            time.sleep(wait)
+
+    def defer(self, url, seconds):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._transaction() as db:
+            now = time.time()
+            rate, tokens, updated, paused_until = self._load(db, host, now)
+            until = now + seconds
+            if until > paused_until:
+                self._store(db, host, min(tokens, 0.0), until, until)
@@ -0,0 +1,148 @@
+import random
+import socket
+import threading
+import time
+import urllib.error
+
+import requests
+import urllib3
+
+# server errors worth trying again after a while
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# statuses with which the server's rate limiting or its front-end proxy turns
+# a request away before it is handled, so that a POST answered with one of
+# them has not made an edit and can safely be sent again
+REJECTED_STATUSES = (429, 503)
+
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+def not_sent(error) -> bool:
+    """Whether a request failed before it reached the server, i.e. no
+    connection could be made.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0] if error.args else None, "reason", None)
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    if isinstance(error, urllib.error.URLError) and not isinstance(
+        error, urllib.error.HTTPError
+    ):
+        return isinstance(error.reason, (ConnectionRefusedError, socket.gaierror))
+    return False
+
+
+class CircuitBreaker(object):
+    """Stops all requests for a while when the server keeps failing.
+
+    After `threshold` failures in a row the circuit opens: wait() blocks
+    every caller for `cooldown` seconds. The first failure after that,
+    unless a request has succeeded in between, opens it again for twice as
+    long (up to `max_cooldown`).
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0, max_cooldown=600.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._tripped = False
+        self._next_cooldown = cooldown
+        self._open_until = 0.0
+
+    def wait(self):
+        """Blocks while the circuit is open."""
+        with self._lock:
+            wait = self._open_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._tripped = False
+            self._next_cooldown = self.cooldown
+
+    def failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._open_until:
+                # a request sent before the circuit opened
+                return
+            self._failures += 1
+            if self._tripped or self._failures >= self.threshold:
+                print(
+                    " * server keeps failing, pausing for %d seconds"
+                    % self._next_cooldown
+                )
+                self._open_until = now + self._next_cooldown
+                self._next_cooldown = min(self.max_cooldown, 2 * self._next_cooldown)
+                self._failures = 0
+                self._tripped = True
+
+
+class RetryPolicy(object):
+    """When and after how long MusicBrainzClient sends a failed request
+    again.
+
+    GET requests are retried on any of `statuses` and on connection errors.
+    POST requests are only retried if they provably did not make an edit:
+    when no connection could be made, or when the server turned them away
+    with 429 or 503. Attempt n (from 0) waits a random time of up to
+    `backoff` * 2**n seconds, at most `max_backoff`; a Retry-After sent by
+    the server is honoured through the client's rate limiter on top of
+    that. Clients sharing a policy share its circuit breaker.
+
+    Args:
+        attempts (int): tries in total, including the first one.
+        circuit_breaker (CircuitBreaker, optional): defaults to a new one;
+            False disables it.
+    """
+
+    def __init__(
+        self,
+        attempts=5,
+        backoff=1.0,
+        max_backoff=60.0,
+        statuses=RETRY_STATUSES,
+        circuit_breaker=None,
+    ):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breaker
+
+    def retryable(self, method, attempt, status=None, error=None) -> bool:
+        """Whether attempt number `attempt` (from 0), which got the response
+        `status` or raised `error`, should be followed by another one.
+        `status` is that of the request itself: a POST that was redirected
+        was handled, and only the page it led to may be fetched again.
+        """
+        if attempt + 1 >= self.attempts:
+            return False
+        if method in IDEMPOTENT_METHODS:
+            return error is not None or status in self.statuses
+        if error is not None:
+            return not_sent(error)
+        return status in REJECTED_STATUSES
+
+    def delay(self, attempt) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def wait(self):
+        if self.circuit_breaker:
+            self.circuit_breaker.wait()
+
+    def success(self):
+        if self.circuit_breaker:
+            self.circuit_breaker.success()
+
+    def failure(self):
+        if self.circuit_breaker:
+            self.circuit_breaker.failure()
@@ -0,0 +1,300 @@
+"""Runs a batch of edits described in a JSON Lines file.
+
+Each line is one job, naming a MusicBrainzClient method and its arguments:
+
+    {"id": "area-1", "method": "add_area", "args": [{"name": "foo"}],
+     "kwargs": {"edit_note": "bar"}}
+
+Every job is recorded in a journal (by default the job file name plus
+".journal"), fsync'ed, once as started, before it is sent, and once with
+its outcome. Jobs already in the journal are skipped, so an interrupted run
+can be restarted with the same command line. Jobs that were started but
+have no outcome may or may not have made their edit: they are not run
+again, but counted as "interrupted", to be checked by hand.
+
+usage: python -m musicbrainz_bot.run jobs.jsonl [--workers N] ...
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import sys
+import time
+
+from musicbrainz_bot.concurrency import AIMDConcurrency
+from musicbrainz_bot.lookups import LookupTables
+from musicbrainz_bot.metrics import outcome
+from musicbrainz_bot.pool import MusicBrainzClientPool
+from musicbrainz_bot.precheck import MirrorPrecheck
+
+try:
+    import musicbrainz_bot.config as cfg
+except ImportError:
+    cfg = None
+
+# jobs read at once, see run()
+PREFETCH_BATCH = 1000
+
+
+def read_jobs(path):
+    """Yields (job_id, job) for each job of a JSON Lines file, one line at a
+    time. Jobs without an "id" are identified by their line number. A line
+    that is not a JSON object yields the error instead of the job.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError("not a JSON object")
+            except ValueError as e:
+                yield "line:%d" % line_no, e
+                continue
+            yield str(job.get("id", "line:%d" % line_no)), job
+
+
+class Journal(object):
+    """Append-only record of started and finished jobs, one JSON object per
+    line. `interrupted` holds the jobs whose last entry is "started", i.e.
+    that an earlier run started but did not finish. With `retry_errors`,
+    jobs whose last entry is an error are in neither set, and run again.
+    """
+
+    def __init__(self, path, retry_errors=False):
+        self.path = path
+        self.done = set()
+        self.interrupted = set()
+        last = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by a crash
+                        continue
+                    last[entry["id"]] = entry["status"]
+        for job_id, status in last.items():
+            if status == "started":
+                self.interrupted.add(job_id)
+            elif not (retry_errors and status == "error"):
+                self.done.add(job_id)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, job_id):
+        return job_id in self.done or job_id in self.interrupted
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def start(self, job_id):
+        self._write({"id": job_id, "status": "started"})
+
+    def record(self, entry):
+        self._write(entry)
+        self.done.add(entry["id"])
+
+    def close(self):
+        self._file.close()
+
+
+def run_job(client, job) -> dict:
+    method = job["method"]
+    if method.startswith("_") or not callable(getattr(client, method, None)):
+        raise Exception("unknown method %r" % (method,))
+    start = time.monotonic()
+    try:
+        result = getattr(client, method)(*job.get("args", ()), **job.get("kwargs", {}))
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": repr(e),
+            "latency": time.monotonic() - start,
+        }
+    return {
+        "status": outcome(result),
+        "result": result,
+        "latency": time.monotonic() - start,
+    }
+
+
+def run(
+    jobs_path, journal, pool, max_pending=None, metrics_path=None, metrics_interval=60
+):
+    """Runs every job of `jobs_path` that is not in `journal` on `pool`.
+    At most `max_pending` jobs (by default twice the pool size) are sent
+    ahead of the ones finished. Jobs are read PREFETCH_BATCH at a time,
+    and if the pool's clients have a MirrorPrecheck, the entities of each
+    batch are loaded from the mirror at once. If `metrics_path` is given, the pool's
+    metrics are written to it every `metrics_interval` seconds and at the
+    end (see Metrics.write).
+
+    Returns:
+        dict: the number of jobs per status, including "skipped" and
+            "interrupted".
+    """
+    max_pending = max_pending or 2 * pool.size
+    counts = {"skipped": 0}
+    pending = {}
+    metrics_written = time.monotonic()
+
+    def finish(done):
+        for future in done:
+            entry = dict(id=pending.pop(future))
+            try:
+                entry.update(future.result())
+            except Exception as e:
+                entry.update(status="error", error=repr(e))
+            journal.record(entry)
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        nonlocal metrics_written
+        if (
+            metrics_path is not None
+            and time.monotonic() - metrics_written >= metrics_interval
+        ):
+            pool.metrics.write(metrics_path)
+            metrics_written = time.monotonic()
+
+    try:
+        jobs = read_jobs(jobs_path)
+        while True:
+            # jobs are read in batches, so that the mirror, if any, can be
+            # queried for all the entities of a batch at once
+            batch = list(itertools.islice(jobs, PREFETCH_BATCH))
+            if not batch:
+                break
+            if pool.precheck is not None:
+                pool.precheck.prefetch_calls(
+                    (job.get("method"), job.get("args", ()), job.get("kwargs", {}))
+                    for job_id, job in batch
+                    if isinstance(job, dict) and job_id not in journal
+                )
+            for job_id, job in batch:
+                if job_id in journal:
+                    if job_id in journal.interrupted:
+                        counts["interrupted"] = counts.get("interrupted", 0) + 1
+                    else:
+                        counts["skipped"] += 1
+                    continue
+                if isinstance(job, Exception):
+                    journal.record(
+                        {"id": job_id, "status": "error", "error": repr(job)}
+                    )
+                    counts["error"] = counts.get("error", 0) + 1
+                    continue
+                journal.start(job_id)
+                pending[pool.submit(run_job, job)] = job_id
+                if len(pending) >= max_pending:
+                    done, _ = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    finish(done)
+    finally:
+        # jobs already sent are recorded whatever happens
+        finish(concurrent.futures.wait(pending).done)
+    if metrics_path is not None:
+        pool.metrics.write(metrics_path)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m musicbrainz_bot.run",
+        description="Run the edits listed in a JSON Lines file.",
+    )
+    parser.add_argument("jobs", help="JSON Lines file of jobs")
+    parser.add_argument("--journal", help="defaults to JOBS.journal")
+    parser.add_argument("--server", default=getattr(cfg, "MB_SITE", None))
+    parser.add_argument("--username", default=getattr(cfg, "MB_USERNAME", None))
+    parser.add_argument("--password", default=getattr(cfg, "MB_PASSWORD", None))
+    parser.add_argument("--editor-id", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="adapt the number of requests in flight to the server's load, "
+        "up to --workers",
+    )
+    parser.add_argument("--cookie-dir")
+    parser.add_argument("--use-test-db", action="store_true")
+    parser.add_argument(
+        "--metrics",
+        help="file to write metrics to, in the Prometheus text format if it "
+        "ends with .prom and as JSON otherwise",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=60,
+        help="seconds between metrics updates (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--lookup-db",
+        help="libpq connection string of a MusicBrainz mirror to load type, "
+        "link type, language and script names from, instead of the bundled "
+        "snapshot",
+    )
+    parser.add_argument(
+        "--precheck-db",
+        help="libpq connection string of a MusicBrainz mirror to skip edits "
+        "that would change nothing, without loading their edit page",
+    )
+    parser.add_argument(
+        "--recycle-after",
+        type=int,
+        default=1000,
+        help="browser requests after which each client starts over with a new "
+        "browser, to keep memory use flat (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--retry-errors",
+        action="store_true",
+        help="run jobs again whose journal entry is an error",
+    )
+    args = parser.parse_args(argv)
+    if not (args.server and args.username and args.password):
+        parser.error("--server, --username and --password are required")
+
+    if args.lookup_db:
+        lookups = LookupTables.from_mirror(args.lookup_db)
+    else:
+        lookups = LookupTables.from_snapshot()
+    journal = Journal(args.journal or args.jobs + ".journal", args.retry_errors)
+    try:
+        with MusicBrainzClientPool(
+            args.username,
+            args.password,
+            args.server,
+            size=args.workers,
+            editor_id=args.editor_id,
+            use_test_db=args.use_test_db,
+            cookie_dir=args.cookie_dir,
+            history_size=0,
+            recycle_after=args.recycle_after,
+            lookups=lookups,
+            precheck=MirrorPrecheck(args.precheck_db) if args.precheck_db else None,
+            concurrency=AIMDConcurrency(maximum=args.workers)
+            if args.adaptive
+            else None,
+        ) as pool:
+            counts = run(
+                args.jobs,
+                journal,
+                pool,
+                metrics_path=args.metrics,
+                metrics_interval=args.metrics_interval,
+            )
+    finally:
+        journal.close()
+    print(", ".join("%s: %d" % item for item in sorted(counts.items())))
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,172 @@
+import os
+import time
+
 import pytest
 import tests.utils as utils
 import psycopg2 as pg
 import musicbrainz_bot.config as cfg
+from benchmarks.fake_server import FakeMusicBrainz
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.ratelimit import RateLimiter
+from musicbrainz_bot.retry import RetryPolicy
 
 MB_TEST_DB = utils.get_test_db_URI()
 
+# pytest-xdist worker ("gw0", "gw1", ...), if running in parallel; each one
+# edits as its own editor and names its entities with its own prefix
+WORKER = os.environ.get("PYTEST_XDIST_WORKER", "")
+PARALLEL = int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1")) > 1
+
+# the test database is cloned into this database once per session and
+# restored from it after every test; if unset, or if the tests run in
+# parallel, each worker deletes the rows in its namespace at the end of the
+# session instead
+TEST_DB_TEMPLATE = None if PARALLEL else getattr(cfg, "TEST_DB_TEMPLATE", None)
+
+
+class FakeClock(object):
+    """Stands in for time.monotonic() and time.time(); sleep() advances it
+    at once.
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    monkeypatch.setattr(time, "time", clock)
+    monkeypatch.setattr(time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def fake_server():
+    # the fake website of the benchmarks, for client tests that need no
+    # MusicBrainz server
+    with FakeMusicBrainz() as server:
+        yield server
+
+
+@pytest.fixture
+def fake_client(fake_server):
+    return MusicBrainzClient(
+        fake_server.username,
+        fake_server.password,
+        fake_server.url,
+        rate_limiter=RateLimiter(1e6, 1000),
+        retry=RetryPolicy(backoff=0.001, circuit_breaker=False),
+    )
+
+
+def _connect(uri):
+    conn = pg.connect(uri)
+    conn.autocommit = True
+    return conn
+
+
+@pytest.fixture(scope="session")
+def namespace():
+    # prefix of the names of the entities created by the tests
+    return utils.worker_namespace(WORKER)
+
+
+@pytest.fixture(scope="session")
+def editor():
+    if WORKER:
+        username = f"{cfg.MB_USERNAME}_{WORKER}"
+    else:
+        username = cfg.MB_USERNAME
+    return {
+        "id": utils.worker_editor_id(WORKER),
+        "username": username,
+        "password": cfg.MB_PASSWORD,
+    }
+
+
+# the database fixtures are only set up for the tests that edit (through
+# mb_client or restore_db) or query (through db_conn) the test database, so
+# that the unit tests run without one
+
 
-@pytest.fixture(scope="session", autouse=True)
-def reset_db(db_conn):
+@pytest.fixture(scope="session")
+def reset_db(request, editor, namespace):
     # utils.reset_db_docker(db_conn)
+    conn = _connect(MB_TEST_DB)
+    # left over by an interrupted session
+    utils.reset_db(conn, editor["id"], namespace)
     utils.create_user(
-        db_conn,
-        username=cfg.MB_USERNAME,
-        password=cfg.MB_PASSWORD,
+        conn,
+        username=editor["username"],
+        password=editor["password"],
+        id=editor["id"],
         use_test_db=True,
     )
+    conn.close()
+    if TEST_DB_TEMPLATE:
+        admin_conn = request.getfixturevalue("admin_conn")
+        utils.snapshot_db(admin_conn, TEST_DB_TEMPLATE)
+    yield
+    conn = _connect(MB_TEST_DB)
+    utils.reset_db(conn, editor["id"], namespace)
+    conn.close()
+
+
+@pytest.fixture
+def restore_db(request, reset_db):
+    if not TEST_DB_TEMPLATE:
+        yield
+        return
+    admin_conn = request.getfixturevalue("admin_conn")
     yield
-    utils.reset_db(db_conn)
+    try:
+        utils.restore_db(admin_conn, TEST_DB_TEMPLATE)
+    except Exception as e:
+        # the next tests would run against a stale database
+        pytest.exit("unable to restore the test database: %r" % (e,), returncode=1)
 
 
 @pytest.fixture(scope="session")
-def db_conn():
-    conn = pg.connect(MB_TEST_DB)
-    conn.autocommit = True
+def cookie_dir(tmp_path_factory):
+    # shared by the function-scoped mb_client fixtures, so that only the
+    # first one goes through the full login flow
+    return str(tmp_path_factory.mktemp("cookies"))
+
+
+@pytest.fixture(scope="function")
+def mb_client(editor, cookie_dir, restore_db):
+    mb = MusicBrainzClient(
+        editor["username"],
+        editor["password"],
+        cfg.MB_SITE,
+        use_test_db=True,
+        cookie_dir=cookie_dir,
+    )
+    return mb
+
+
+@pytest.fixture(scope="session")
+def admin_conn():
+    conn = _connect(utils.get_maintenance_db_URI())
+
+    yield conn
+
+    conn.close()
+
+
+@pytest.fixture
+def db_conn(restore_db):
+    # function-scoped, since restore_db closes every connection to the test
+    # database
+    conn = _connect(MB_TEST_DB)
 
     yield conn
 
@@ -1,23 +1,17 @@
 # A simple test script to add a new area to test .metabrainz.org
 
-from musicbrainz_bot.editing import MusicBrainzClient
 import musicbrainz_bot.config as cfg
 import pytest
 import tests.utils as utils
+from musicbrainz_bot.lookups import LookupTables
 
-
-@pytest.fixture(scope="function")
-def mb_client():
-    mb = MusicBrainzClient(
-        cfg.MB_USERNAME, cfg.MB_PASSWORD, cfg.MB_SITE, use_test_db=True
-    )
-    return mb
+LOOKUPS = LookupTables.from_snapshot()
 
 
 @pytest.fixture(scope="function")
-def area_seed():
+def area_seed(namespace):
     return {
-        "name": "test_area",
+        "name": namespace + "test_area",
         "comment": "disambiguation_comment",
         "type_id": "3",
         "iso_3166_1": ["XX", "YY"],
@@ -47,18 +41,6 @@ def _add_area(
 
 
 def test_add_area(mb_client, reset_db, area_seed):
-    area_types = {
-        "1": "Country",
-        "2": "Subdivision",
-        "3": "City",
-        "4": "Municipality",
-        "5": "District",
-        "6": "Island",
-        "7": "County",
-    }
-
-    link_type_ids = {"wikidata": "358", "geonames": "713"}
-
     try:
         area_mbid = _add_area(area_seed, mb_client)
         posted_data = utils.get_entity_json(area_mbid, "area")
@@ -72,8 +54,8 @@ def test_add_area(mb_client, reset_db, area_seed):
             posted_data["disambiguation"] == area_seed["comment"]
         ), "Area disambiguation is incorrect"
 
-        assert (
-            posted_data["type"] == area_types[area_seed["type_id"]]
+        assert posted_data["type"] == LOOKUPS.name(
+            "area_type", area_seed["type_id"]
         ), "Area type is incorrect"
 
         assert (
@@ -92,12 +74,9 @@ def test_add_area(mb_client, reset_db, area_seed):
             assert (
                 received["url"]["resource"] == original["text"]
             ), "Area URL is incorrect"
-            try:
-                assert (
-                    received["type"] == link_type_ids[original["link_type_id"]]
-                ), "Area URL link type is incorrect"
-            except KeyError:
-                pass
+            assert received["type"] == LOOKUPS.name(
+                "link_type", original["link_type_id"]
+            ), "Area URL link type is incorrect"
 
         print(
             f"""Area Generated with MBID: {area_mbid}\nLink: {cfg.MB_SITE}/area/{area_mbid}"""
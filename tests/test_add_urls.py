@@ -0,0 +1,76 @@
+# A simple test script to add several URLs to an area in one batch
+
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.metrics import Metrics
+import pytest
+import tests.utils as utils
+
+
+@pytest.fixture(scope="function")
+def area_seed(namespace):
+    return {
+        "name": namespace + "test_area_urls",
+        "comment": "disambiguation_comment",
+        "type_id": "3",
+    }
+
+
+def test_add_urls(mb_client, reset_db, area_seed):
+    links = [
+        "https://www.wikidata.org/wiki/Q152",
+        "https://www.wikidata.org/wiki/Q153",
+        "https://www.wikidata.org/wiki/Q154",
+    ]
+
+    try:
+        area_mbid = mb_client.add_area(area_seed, edit_note="Tests batched URLs.")
+        results = mb_client.add_urls(
+            "area",
+            [(area_mbid, 358, link) for link in links],
+            edit_note="Tests adding several URLs in one request.",
+            chunk_size=2,
+        )
+        assert results == [True, True, True], "Not every URL was added"
+
+        # adding the same URLs again changes nothing
+        results = mb_client.add_urls(
+            "area",
+            [(area_mbid, 358, link) for link in links],
+            edit_note="Tests adding several URLs in one request.",
+        )
+        assert results == [False, False, False], "Existing URL was added again"
+
+        edits = {edit["method"]: edit for edit in mb_client.metrics.snapshot()["edits"]}
+        assert edits["add_urls"]["count"] == 2, "add_urls calls miscounted"
+        assert "edit_relationships" not in edits, "add_urls calls counted twice"
+
+        posted_data = utils.get_entity_json(area_mbid, "area")
+        received = sorted(rel["url"]["resource"] for rel in posted_data["relations"])
+        assert received == links, "Area URLs are incorrect"
+    except Exception as e:
+        pytest.fail(str(e))
+
+
+def test_add_urls_partial_failure():
+    # a client that fails on its third relationship editor request, without
+    # logging in
+    mb = MusicBrainzClient.__new__(MusicBrainzClient)
+    mb.lookups = None
+    mb.metrics = Metrics()
+    posted = []
+
+    def post(rels, edit_note, auto):
+        if len(posted) == 2:
+            raise Exception("unable to post edit", 503)
+        posted.append(rels)
+        return [True] * (len(rels) - 1) + [False]
+
+    mb._post_relationship_edits = post
+    links = [(str(i), 358, "https://example.org/%d" % i) for i in range(7)]
+    with pytest.raises(Exception, match="unable to post edit") as e:
+        mb.add_urls("area", links, chunk_size=2)
+    assert e.value.results == [True, False, True, False], "Posted results are lost"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,93 @@
+# Tests the bounded browser history and the recycling of the client's browser
+
+import copy
+
+from musicbrainz_bot.browser import BoundedHistory
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.ratelimit import RateLimiter
+from musicbrainz_bot.retry import RetryPolicy
+import mechanize
+import pytest
+
+
+class Response(object):
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_bounded_history():
+    history = BoundedHistory(2)
+    responses = [Response(n) for n in range(4)]
+    for n, response in enumerate(responses):
+        history.add("request %d" % n, response)
+    assert [r.closed for r in responses] == [
+        True,
+        True,
+        False,
+        False,
+    ], "Dropped pages were not closed"
+    assert history.back(1, responses[3]) == (
+        "request 3",
+        responses[3],
+    ), "Last page was not returned"
+    assert history.back(1, None)[0] == "request 2", "Back went too far"
+    with pytest.raises(mechanize.BrowserStateError):
+        history.back(1, None)
+
+
+def test_empty_history():
+    history = BoundedHistory()
+    response = Response(0)
+    history.add("request", response)
+    assert response.closed, "Page was kept with no history"
+    with pytest.raises(mechanize.BrowserStateError):
+        history.back(1, response)
+
+
+def test_history_close():
+    history = BoundedHistory(2)
+    responses = [Response(n) for n in range(2)]
+    for response in responses:
+        history.add("request", response)
+    history.add("request", None)
+    copied = copy.copy(history)
+    history.close()
+    assert responses[1].closed, "Kept pages were not closed"
+    assert copied.back(1, None)[0] == "request", "Copy was emptied"
+
+
+def test_recycle(fake_server):
+    client = MusicBrainzClient(
+        fake_server.username,
+        fake_server.password,
+        fake_server.url,
+        rate_limiter=RateLimiter(1e6, 1000),
+        retry=RetryPolicy(backoff=0.001, circuit_breaker=False),
+        history_size=1,
+        recycle_after=2,
+    )
+    client.add_area({"name": "test_area_browser", "type_id": "3"}, "")
+    browsers = [client.b]
+    for _ in range(3):
+        # the login took 2 browser requests, and adding a note to an edit
+        # takes 2 more (the user's edits, then the vote form), so that every
+        # note is added with a new browser
+        assert (
+            client.add_edit_note(lambda nr, text: True, "A note.") is True
+        ), "No note added"
+        assert len(client.b._history._history) <= 1, "History was not bounded"
+        assert client.b is not browsers[-1], "Browser was not recycled"
+        browsers.append(client.b)
+    assert client._browser_requests == 2, "Requests were not counted"
+    # a browser without the session would have been refused the notes
+    assert all(
+        b._ua_handlers is None for b in browsers[:-1]
+    ), "Replaced browsers were not closed"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
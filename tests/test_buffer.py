@@ -0,0 +1,130 @@
+# Tests how EditBuffer merges updates to one entity into a single edit
+
+from musicbrainz_bot.buffer import EditBuffer
+import pytest
+
+GID1 = "00000000-0000-0000-0000-000000000001"
+GID2 = "00000000-0000-0000-0000-000000000002"
+GID3 = "00000000-0000-0000-0000-000000000003"
+
+
+class Client(object):
+    # records the edits it is asked to make, failing those of `failing`
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.calls = []
+
+    def _edit(self, entity_type, entity, update, edit_note, auto, partial):
+        self.calls.append((entity_type, dict(entity), list(update), edit_note, auto))
+        if entity["gid"] in self.failing:
+            raise Exception("unable to post edit")
+        assert partial, "Merged edit is not partial"
+        return True
+
+    def edit_artist(self, artist, update, edit_note, auto=False, partial=False):
+        return self._edit("artist", artist, update, edit_note, auto, partial)
+
+    def edit_work(self, work, update, edit_note, auto=False, partial=False):
+        return self._edit("work", work, update, edit_note, auto, partial)
+
+
+def test_merged_updates():
+    client = Client()
+    with EditBuffer(client) as edits:
+        edits.edit_artist({"gid": GID1, "area": 5}, ["area"], "area", auto=True)
+        edits.set_artist_type(GID1, 1, "type", auto=False)
+        # the same value, as the form would submit it
+        edits.edit_artist({"gid": GID1, "type": "1"}, ["type"], "type", auto=True)
+        edits.edit_work({"gid": GID1, "type": 2}, ["type"], "work type")
+        assert len(edits) == 2, "Updates of one entity were not merged"
+        assert client.calls == [], "Edits were submitted before the flush"
+    assert client.calls == [
+        (
+            "artist",
+            {"gid": GID1, "area": 5, "type": "1"},
+            ["area", "type"],
+            "area\n\ntype",
+            False,
+        ),
+        ("work", {"gid": GID1, "type": 2}, ["type"], "work type", False),
+    ], "Merged edits are incorrect"
+
+
+def test_dates_merged():
+    client = Client()
+    with EditBuffer(client) as edits:
+        edits.edit_artist(
+            {"gid": GID1, "begin_date_year": 1990, "begin_date_month": 2},
+            ["begin_date"],
+            "",
+        )
+        edits.edit_artist({"gid": GID1, "comment": "c"}, ["comment"], "")
+    ((_, entity, update, _, _),) = client.calls
+    assert update == ["begin_date", "comment"], "Items are incorrect"
+    assert entity["begin_date_year"] == 1990, "Date was not merged"
+    assert entity["begin_date_day"] is None, "Date was not merged"
+
+
+def test_conflicting_updates():
+    client = Client()
+    edits = EditBuffer(client)
+    edits.set_artist_type(GID1, 1, "a")
+    edits.set_artist_type(GID1, 2, "b")
+    assert [call[1] for call in client.calls] == [
+        {"gid": GID1, "type": 1}
+    ], "Conflicting edit did not submit the pending one"
+    assert len(edits) == 1, "Conflicting update is not pending"
+    results = edits.flush()
+    assert [result[2] for result in results] == [True, True], "Results incorrect"
+    assert client.calls[1][1] == {"gid": GID1, "type": 2}, "Second edit incorrect"
+
+
+def test_failure_mid_flush():
+    client = Client(failing=(GID2,))
+    edits = EditBuffer(client)
+    for gid in (GID1, GID2, GID3):
+        edits.set_artist_type(gid, 1, "")
+    results = edits.flush()
+    assert [gid for (_, gid, _) in results] == [GID1, GID2, GID3], "Edits lost"
+    assert results[0][2] is True and results[2][2] is True, "Edits not made"
+    assert isinstance(results[1][2], Exception), "Failure was not recorded"
+    assert len(edits) == 0 and edits.flush() == [], "Edits left pending"
+
+
+def test_max_pending():
+    client = Client()
+    edits = EditBuffer(client, max_pending=2)
+    edits.set_artist_type(GID1, 1, "")
+    assert client.calls == [], "Edit submitted too early"
+    edits.set_artist_type(GID2, 1, "")
+    assert len(client.calls) == 2 and len(edits) == 0, "Edits were not submitted"
+
+
+def test_window(clock):
+    client = Client()
+    edits = EditBuffer(client, window=60)
+    edits.set_artist_type(GID1, 1, "")
+    clock.sleep(59)
+    edits.set_artist_type(GID2, 1, "")
+    assert client.calls == [], "Edit submitted within the window"
+    clock.sleep(1)
+    edits.set_artist_type(GID3, 1, "")
+    assert len(client.calls) == 3, "Expired edits were not submitted"
+
+
+def test_noop_submit_skipped(fake_client, fake_server):
+    gid = fake_server.add_entity("artist", name="a", type="1", area="5")
+    edits = EditBuffer(fake_client)
+    edits.edit_artist({"gid": gid, "type": 2}, ["type"], "")
+    edits.edit_artist({"gid": gid, "area": 6}, ["area"], "")
+    assert edits.flush() == [("artist", gid, None)], "No-op edit was made"
+    assert fake_server.edits == [], "No-op edit was submitted"
+
+    edits.edit_artist({"gid": gid, "type": 2, "comment": "c"}, ["type", "comment"], "")
+    assert edits.flush() == [("artist", gid, True)], "Partial edit was not made"
+    assert fake_server.get_entity("artist", gid)["comment"] == "c", "Not edited"
+    assert fake_server.get_entity("artist", gid)["type"] == "1", "Type was changed"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
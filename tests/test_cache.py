@@ -0,0 +1,82 @@
+# Tests the read-through cache of web service lookups
+
+from musicbrainz_bot.cache import EntityCache
+import pytest
+
+GID1 = "00000000-0000-0000-0000-000000000001"
+GID2 = "00000000-0000-0000-0000-000000000002"
+GID3 = "00000000-0000-0000-0000-000000000003"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache_path(request, tmp_path):
+    return None if request.param == "memory" else str(tmp_path / "cache.db")
+
+
+def test_get_returns_a_copy(cache_path):
+    cache = EntityCache(path=cache_path)
+    entity = {"name": "Foo", "aliases": [{"name": "Bar"}]}
+    cache.put("artist", GID1, "aliases", entity)
+    entity["aliases"].append({"name": "Changed before"})
+
+    cached = cache.get("artist", GID1, "aliases")
+    cached["name"] = "Changed"
+    cached["aliases"][0]["name"] = "Changed"
+    assert cache.get("artist", GID1, "aliases") == {
+        "name": "Foo",
+        "aliases": [{"name": "Bar"}],
+    }, "Cached entity was modified"
+
+
+def test_ttl(clock, cache_path):
+    cache = EntityCache(ttl=60, ttls={"area": 600}, path=cache_path)
+    cache.put("artist", GID1, "", {"name": "Foo"})
+    cache.put("area", GID1, "", {"name": "Bar"})
+    clock.sleep(59)
+    assert cache.get("artist", GID1) == {"name": "Foo"}, "Entry expired early"
+    clock.sleep(1)
+    assert cache.get("artist", GID1) is None, "Entry did not expire"
+    assert cache.get("area", GID1) == {"name": "Bar"}, "Type TTL was not used"
+
+
+def test_lru():
+    cache = EntityCache(maxsize=2)
+    cache.put("artist", GID1, "", {"name": "1"})
+    cache.put("artist", GID2, "", {"name": "2"})
+    cache.get("artist", GID1)
+    cache.put("artist", GID3, "", {"name": "3"})
+    assert cache.get("artist", GID2) is None, "Least recently used entry kept"
+    assert cache.get("artist", GID1) is not None, "Recently used entry dropped"
+    assert cache.get("artist", GID3) is not None, "New entry dropped"
+
+
+def test_invalidate(cache_path):
+    cache = EntityCache(path=cache_path)
+    cache.put("artist", GID1, "", {"name": "1"})
+    cache.put("artist", GID1, "aliases", {"name": "1"})
+    cache.put("artist", GID2, "", {"name": "2"})
+    cache.invalidate("artist", GID1)
+    assert cache.get("artist", GID1) is None, "Lookup was not invalidated"
+    assert cache.get("artist", GID1, "aliases") is None, "Inc was not invalidated"
+    assert cache.get("artist", GID2) is not None, "Other entity was invalidated"
+    if cache_path is not None:
+        assert (
+            EntityCache(path=cache_path).get("artist", GID1) is None
+        ), "Lookup was not invalidated on disk"
+
+
+def test_sqlite(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    EntityCache(ttl=60, path=path).put("artist", GID1, "", {"name": "Foo"})
+    # a later run, with an empty memory cache
+    cache = EntityCache(ttl=60, maxsize=1, path=path)
+    assert cache.get("artist", GID1) == {"name": "Foo"}, "Entry was not stored"
+    # evicted from memory only
+    cache.put("artist", GID2, "", {"name": "Bar"})
+    assert cache.get("artist", GID1) == {"name": "Foo"}, "Entry was not reloaded"
+    clock.sleep(60)
+    assert EntityCache(ttl=60, path=path).get("artist", GID1) is None, "Expired"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
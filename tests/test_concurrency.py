@@ -0,0 +1,47 @@
+# Tests how the number of requests in flight adapts to the server's load
+
+from musicbrainz_bot.concurrency import AIMDConcurrency
+import pytest
+
+URL = "https://musicbrainz.org/artist/00000000-0000-0000-0000-000000000001"
+
+
+def test_aimd_increase():
+    concurrency = AIMDConcurrency(initial=2, maximum=4, increase=1.0)
+    for _ in range(2):
+        concurrency.release(concurrency.acquire(), URL, 0.1, 200)
+    assert concurrency.limit == pytest.approx(2.9), "Limit did not increase"
+    for _ in range(20):
+        concurrency.release(concurrency.acquire(), URL, 0.1, 200)
+    assert concurrency.limit == 4, "Limit exceeded the maximum"
+    assert concurrency.in_flight == 0, "Requests still in flight"
+
+
+def test_aimd_cut_once_per_burst():
+    concurrency = AIMDConcurrency(initial=8, minimum=1, decrease=0.5)
+    tickets = [concurrency.acquire() for _ in range(8)]
+    assert concurrency.in_flight == 8, "Requests were not let through"
+    # all sent before the first cut: one burst of errors
+    for ticket in tickets:
+        concurrency.release(ticket, URL, 0.1, 503)
+    assert concurrency.limit == 4, "Limit was not halved once"
+
+    concurrency.release(concurrency.acquire(), URL, 0.1, "error")
+    assert concurrency.limit == 2, "Later error did not cut the limit"
+    for _ in range(5):
+        concurrency.release(concurrency.acquire(), URL, 0.1, 429)
+    assert concurrency.limit == 1, "Limit fell below the minimum"
+
+
+def test_aimd_latency_spike():
+    concurrency = AIMDConcurrency(initial=4, latency_tolerance=2.0)
+    concurrency.release(concurrency.acquire(), URL, 0.1, 200)
+    limit = concurrency.limit
+    concurrency.release(concurrency.acquire(), URL + "/edit", 1.0, 200)
+    assert concurrency.limit > limit, "Other endpoint counted as a spike"
+    concurrency.release(concurrency.acquire(), URL, 1.0, 200)
+    assert concurrency.limit < limit, "Latency spike did not cut the limit"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
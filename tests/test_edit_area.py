@@ -1,23 +1,16 @@
 # A simple test script to edit an existing area in musicbrainz.org
 
-from musicbrainz_bot.editing import MusicBrainzClient
-import musicbrainz_bot.config as cfg
 import pytest
 import tests.utils as utils
+from musicbrainz_bot.lookups import LookupTables
 
-
-@pytest.fixture(scope="function")
-def mb_client():
-    mb = MusicBrainzClient(
-        cfg.MB_USERNAME, cfg.MB_PASSWORD, cfg.MB_SITE, use_test_db=True
-    )
-    return mb
+LOOKUPS = LookupTables.from_snapshot()
 
 
 @pytest.fixture(scope="function")
-def area_updatable():
+def area_updatable(namespace):
     return {
-        "name": "test_area_edit",
+        "name": namespace + "test_area_edit",
         "comment": "disambiguation_comment",
         "type_id": "3",
         "iso_3166_1": ["AA", "BB"],
@@ -37,9 +30,9 @@ def area_updatable():
 
 
 @pytest.fixture(scope="function")
-def area_update():
+def area_update(namespace):
     return {
-        "name": "test_area_edit_edited",
+        "name": namespace + "test_area_edit_edited",
         "comment": "disambiguation_comment",
         "type_id": "3",
         "iso_3166_1": ["AX", "BX"],
@@ -77,18 +70,6 @@ def _edit_area(area, update, gid, mb):
 
 
 def test_edit_area(mb_client, reset_db, area_updatable, area_update):
-    area_types = {
-        "1": "Country",
-        "2": "Subdivision",
-        "3": "City",
-        "4": "Municipality",
-        "5": "District",
-        "6": "Island",
-        "7": "County",
-    }
-
-    link_type_ids = {"wikidata": "358", "geonames": "713"}
-
     try:
         area_mbid_og = _add_area(area_updatable, mb_client)
         area_mbid = _edit_area(area_updatable, area_update, area_mbid_og, mb_client)
@@ -100,8 +81,8 @@ def test_edit_area(mb_client, reset_db, area_updatable, area_update):
             posted_data["disambiguation"] == area_update["comment"]
         ), "Area disambiguation is incorrect"
 
-        assert (
-            posted_data["type"] == area_types[area_update["type_id"]]
+        assert posted_data["type"] == LOOKUPS.name(
+            "area_type", area_update["type_id"]
         ), "Area type is incorrect"
 
         assert (
@@ -120,12 +101,9 @@ def test_edit_area(mb_client, reset_db, area_updatable, area_update):
             assert (
                 received["url"]["resource"] == original["text"]
             ), "Area URL is incorrect"  # area URL correct?
-            try:
-                assert (
-                    received["type"] == link_type_ids[original["link_type_id"]]
-                ), "Area URL link type is incorrect"  # area URL link type correct?
-            except KeyError:
-                pass
+            assert received["type"] == LOOKUPS.name(
+                "link_type", original["link_type_id"]
+            ), "Area URL link type is incorrect"  # area URL link type correct?
 
         assert area_mbid is not None, "Area MBID is None"
         print(
@@ -135,5 +113,18 @@ def test_edit_area(mb_client, reset_db, area_updatable, area_update):
         pytest.fail(str(e))
 
 
+def test_edit_area_unchanged(mb_client, area_updatable):
+    # same data, lists in another order: nothing to post
+    update = dict(area_updatable, type_id=3, url=area_updatable["url"][::-1])
+    expected = dict(update)
+
+    area_mbid = _edit_area(
+        area_updatable, update, "00000000-0000-0000-0000-000000000000", mb_client
+    )
+
+    assert area_mbid is None, "An edit was posted for unchanged data"
+    assert update == expected, "The update was modified"
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
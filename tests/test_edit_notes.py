@@ -0,0 +1,79 @@
+# A simple test script to add an edit note to an edit, cancel it and merge
+
+import pytest
+import tests.utils as utils
+
+
+def _add_areas(mb_client, namespace, count):
+    return [
+        mb_client.add_area(
+            {"name": namespace + "test_area_notes_%d" % i, "type_id": "3"},
+            edit_note="Tests edit notes.",
+        )
+        for i in range(count)
+    ]
+
+
+def test_add_edit_note_and_cancel_edit(mb_client, reset_db, namespace):
+    try:
+        (area_mbid,) = _add_areas(mb_client, namespace, 1)
+        edit_nrs = []
+
+        def identify(edit_nr, text):
+            if area_mbid in text:
+                edit_nrs.append(edit_nr)
+                return True
+            return False
+
+        assert mb_client.add_edit_note(identify, "A note.") is True, "No note added"
+        assert (
+            mb_client.add_edit_note(lambda edit_nr, text: False, "A note.") is False
+        ), "Note added to no edit"
+        assert (
+            mb_client.cancel_edit(edit_nrs[0], "Cancelled by a test.") is True
+        ), "Edit not cancelled"
+
+        outcomes = {
+            edit["method"]: edit["outcome"]
+            for edit in mb_client.metrics.snapshot()["edits"]
+        }
+        assert outcomes["add_edit_note"] == {
+            "changed": 1,
+            "noop": 1,
+        }, "Edit note outcomes are incorrect"
+        assert outcomes["cancel_edit"] == {"changed": 1}, "Cancel outcome is incorrect"
+    except Exception as e:
+        pytest.fail(str(e))
+
+
+def test_merge(mb_client, reset_db, namespace):
+    try:
+        area_mbids = _add_areas(mb_client, namespace, 2)
+        assert (
+            mb_client.merge("area", area_mbids, area_mbids[0], "Tests merging.") is True
+        ), "Merge edit not created"
+        assert utils.get_entity_json(area_mbids[0], "area"), "Merge target is gone"
+    except Exception as e:
+        pytest.fail(str(e))
+
+
+def test_cancel_edit_refused(fake_client, fake_server):
+    fake_client.add_area({"name": "test_area_notes", "type_id": "3"}, "")
+    assert fake_client.cancel_edit(1) is True, "Edit not cancelled"
+    assert 1 in fake_server.cancelled, "Server did not cancel the edit"
+    with pytest.raises(Exception, match="unable to find form"):
+        fake_client.cancel_edit(1)
+    with pytest.raises(Exception, match="unable to find form"):
+        fake_client.cancel_edit(2)
+    outcomes = {
+        edit["method"]: edit["outcome"]
+        for edit in fake_client.metrics.snapshot()["edits"]
+    }
+    assert outcomes["cancel_edit"] == {
+        "changed": 1,
+        "error": 2,
+    }, "Cancel outcomes are incorrect"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,123 @@
+# Tests the HTML form parser used on the edit pages
+
+from musicbrainz_bot.forms import extract_form
+import pytest
+
+BASE_URL = "http://localhost:5000/artist/1/edit"
+
+PAGE = """
+<html><body>
+<form action="/search" method="get"><input name="query" value="q"></form>
+<form action="/logout" method="post"><input name="token" value="t"></form>
+<form action="/artist/1/edit" method="post">
+  <input type="hidden" name="edit-artist.id" value="1">
+  <input name="edit-artist.name" value="Foo">
+  <input name="edit-artist.disabled" value="x" disabled>
+  <select name="edit-artist.type_id">
+    <option value="">(none)</option>
+    <option value="1" selected>Person</option>
+    <option value="2">Group</option>
+  </select>
+  <select name="edit-artist.gender_id">
+    <option value="1">Male</option>
+    <option value="2">Female</option>
+  </select>
+  <select name="edit-artist.ipi_codes" multiple>
+    <option selected>00000000001</option>
+    <option value="00000000002" selected>two</option>
+    <option value="00000000003">three</option>
+  </select>
+  <input type="checkbox" name="edit-artist.ended" value="1">
+  <input type="checkbox" name="edit-artist.make_votable" value="1" checked>
+  <input type="checkbox" name="edit-artist.flag" checked>
+  <input type="radio" name="edit-artist.kind" value="a">
+  <input type="radio" name="edit-artist.kind" value="b" checked>
+  <textarea name="edit-artist.edit_note">
+first line
+second &amp; last</textarea>
+  <input type="submit" name="save" value="Enter edit">
+  <button name="step_editnote" value="1">Next</button>
+  <button type="button" name="add_alias" value="1">Add alias</button>
+  <button name="cancel">Cancel</button>
+</form>
+<form action="/artist/1/edit" method="post"><input name="second" value="2"></form>
+</body></html>
+"""
+
+
+@pytest.fixture(scope="function")
+def form():
+    return extract_form(PAGE, "/artist/1/edit", BASE_URL)
+
+
+def test_several_forms(form):
+    assert (
+        form.action == "http://localhost:5000/artist/1/edit"
+    ), "Form action is incorrect"
+    assert "query" not in form, "GET form was parsed"
+    assert "token" not in form, "Form with another action was parsed"
+    assert "second" not in form, "Form after the matching one was parsed"
+    assert form["edit-artist.name"] == "Foo", "Text input is incorrect"
+    assert form["edit-artist.id"] == "1", "Hidden input is incorrect"
+    assert "edit-artist.disabled" not in form, "Disabled input was parsed"
+    with pytest.raises(Exception, match="unable to find form"):
+        extract_form(PAGE, "/work/1/edit", BASE_URL)
+
+
+def test_selects(form):
+    assert form["edit-artist.type_id"] == "1", "Selected option is incorrect"
+    assert form["edit-artist.gender_id"] == "1", "Default option is incorrect"
+    assert form.getlist("edit-artist.ipi_codes") == [
+        "00000000001",
+        "00000000002",
+    ], "Multiple select is incorrect"
+
+    form["edit-artist.type_id"] = "2"
+    assert form["edit-artist.type_id"] == "2", "Select was not set"
+    with pytest.raises(Exception, match="not an option"):
+        form["edit-artist.type_id"] = "9"
+    assert form["edit-artist.type_id"] == "2", "Invalid option was set"
+
+
+def test_checkboxes_and_radios(form):
+    assert "edit-artist.ended" in form, "Unchecked checkbox is unknown"
+    assert form.getlist("edit-artist.ended") == [], "Unchecked checkbox is sent"
+    assert form["edit-artist.make_votable"] == "1", "Checked checkbox is incorrect"
+    assert form["edit-artist.flag"] == "on", "Checkbox without value is incorrect"
+    assert form.getlist("edit-artist.kind") == ["b"], "Radio is incorrect"
+
+    form["edit-artist.make_votable"] = []
+    assert (
+        "edit-artist.make_votable",
+        "1",
+    ) not in form.pairs(), "Unchecked checkbox is sent"
+
+
+def test_textarea(form):
+    assert (
+        form["edit-artist.edit_note"] == "first line\nsecond & last"
+    ), "Textarea is incorrect"
+
+
+def test_buttons(form):
+    assert "save" not in dict(form.pairs()), "Button is sent without submitting"
+    assert form.pairs("save")[-1] == ("save", "Enter edit"), "Input button is incorrect"
+    assert form.pairs("step_editnote")[-1] == (
+        "step_editnote",
+        "1",
+    ), "Button value is incorrect"
+    assert form.pairs("cancel")[-1] == ("cancel", ""), "Empty button is incorrect"
+    assert "add_alias" not in form.buttons, "Non-submit button was registered"
+
+
+def test_field_order(form):
+    keys = [key for (key, _) in form.pairs()]
+    assert keys.index("edit-artist.id") < keys.index(
+        "edit-artist.type_id"
+    ), "Fields are out of order"
+    form["edit-artist.name"] = "Bar"
+    assert [key for (key, _) in form.pairs()] == keys, "Setting a field moved it"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
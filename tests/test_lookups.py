@@ -0,0 +1,59 @@
+# A simple test script to edit with type and link type names rather than IDs
+
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.lookups import LookupTables
+import musicbrainz_bot.config as cfg
+import pytest
+import tests.utils as utils
+
+
+@pytest.fixture(scope="function")
+def mb_client_lookups(editor, cookie_dir, restore_db):
+    mb = MusicBrainzClient(
+        editor["username"],
+        editor["password"],
+        cfg.MB_SITE,
+        use_test_db=True,
+        cookie_dir=cookie_dir,
+        lookups=LookupTables.from_snapshot(),
+    )
+    return mb
+
+
+def test_add_area_by_name(mb_client_lookups, namespace):
+    area = {
+        "name": namespace + "test_area_lookups",
+        "type_id": "city",
+        "url": [
+            {
+                "text": "https://www.wikidata.org/wiki/Q152",
+                "link_type_id": "Wikidata",
+            },
+        ],
+    }
+
+    try:
+        area_mbid = mb_client_lookups.add_area(area, edit_note="Tests type names.")
+        posted_data = utils.get_entity_json(area_mbid, "area")
+
+        assert posted_data["type"] == "City", "Area type is incorrect"
+        assert [rel["type"] for rel in posted_data["relations"]] == [
+            "wikidata"
+        ], "Area URL link type is incorrect"
+    except Exception as e:
+        pytest.fail(str(e))
+
+
+def test_unknown_names_rejected(mb_client_lookups):
+    with pytest.raises(Exception, match="unknown area_type"):
+        mb_client_lookups.add_area(
+            {"name": "test_area_lookups", "type_id": "Town"}, edit_note=""
+        )
+    with pytest.raises(Exception, match="not between area and url"):
+        mb_client_lookups.add_url(
+            "area", "00000000-0000-0000-0000-000000000000", 352, "https://example.org"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,146 @@
+# Tests the checks merge_many() runs on merge groups before any merge
+
+import concurrent.futures
+
+from musicbrainz_bot.merges import check_groups, merge_many, read_group
+import pytest
+
+MBID1 = "00000000-0000-0000-0000-000000000001"
+MBID2 = "00000000-0000-0000-0000-000000000002"
+MBID3 = "00000000-0000-0000-0000-000000000003"
+
+
+class FailingPool(object):
+    # a pool whose lookups fail, as on a server error
+    size = 2
+    shares_session = False
+
+    def submit(self, method, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_exception(Exception("500 Internal Server Error"))
+        return future
+
+
+class RecordingPool(object):
+    # a pool on which every entity exists and every merge is made
+    size = 2
+    shares_session = False
+
+    def __init__(self):
+        self.merges = []
+
+    def submit(self, method, *args, **kwargs):
+        future = concurrent.futures.Future()
+        if method == "merge":
+            self.merges.append(args)
+        future.set_result({} if method == "get_entity" else True)
+        return future
+
+
+def groups(*groups):
+    return [read_group(group) for group in groups]
+
+
+def test_read_group():
+    group = {
+        "entity_type": "artist",
+        "entity_ids": [MBID1.upper(), 2],
+        "target_id": MBID1.upper(),
+    }
+    assert read_group(group) == (
+        "artist",
+        [MBID1, "2"],
+        MBID1,
+        "",
+    ), "Group was not normalized"
+    assert check_groups([read_group(group)]) == [None], "Uppercase MBID rejected"
+    assert (
+        read_group(("release-group", ["1", "2"], "1", ""))[0] == "release_group"
+    ), "Entity type was not normalized"
+
+
+def test_valid_groups():
+    problems = check_groups(
+        groups(
+            ("artist", [MBID1, MBID2], MBID1, ""),
+            ("work", [MBID1, MBID2], MBID2, ""),
+            ("release_group", ["1", "2"], "1", ""),
+        )
+    )
+    assert problems == [None, None, None], "Valid group rejected"
+
+
+def test_overlap():
+    problems = check_groups(
+        groups(
+            ("artist", [MBID1, MBID2], MBID1, ""),
+            ("artist", [MBID2, MBID3], MBID2, ""),
+            ("artist", [MBID3, "x"], MBID3, ""),
+        )
+    )
+    assert problems[0] is None, "First group rejected"
+    assert problems[1] == "overlaps group 0", "Overlap not found"
+    # an invalid group reserves none of its entities
+    assert problems[2] == "invalid ID 'x'", "Invalid ID not found"
+
+
+def test_invalid_id():
+    problems = check_groups(groups(("artist", [MBID1, "Foo"], MBID1, "")))
+    assert problems == ["invalid ID 'foo'"], "Invalid ID not found"
+
+
+def test_target_not_merged():
+    problems = check_groups(groups(("artist", [MBID1, MBID2], MBID3, "")))
+    assert problems == [
+        "target %s is not one of the entities" % MBID3
+    ], "Target outside the group accepted"
+
+
+def test_unknown_type():
+    problems = check_groups(groups(("genre", [MBID1, MBID2], MBID1, "")))
+    assert problems == ["cannot merge entities of type 'genre'"], "Type accepted"
+
+
+def test_too_few_members():
+    problems = check_groups(
+        groups(
+            ("artist", [MBID1], MBID1, ""),
+            ("artist", [], MBID2, ""),
+        )
+    )
+    assert problems == ["nothing to merge"] * 2, "Single entity accepted"
+
+
+def test_failed_lookup():
+    results = merge_many(
+        FailingPool(),
+        [("artist", [MBID1, MBID2], MBID1, ""), ("genre", [MBID1], MBID1, "")],
+    )
+    assert results[0]["status"] == "error", "Failed lookup was not an error"
+    assert "500" in results[0]["error"], "Lookup error is missing"
+    assert results[1]["status"] == "invalid", "Other group was not checked"
+
+
+def test_merge_many():
+    pool = RecordingPool()
+    results = merge_many(
+        pool,
+        [
+            ("release_group", [MBID1, MBID2], MBID1, "a"),
+            ("release-group", [MBID3, "4"], MBID3, "b"),
+            ("artist", [MBID1], MBID1, "c"),
+        ],
+    )
+    assert [result["status"] for result in results] == [
+        "changed",
+        "changed",
+        "invalid",
+    ], "Merge statuses are incorrect"
+    assert sorted(pool.merges) == [
+        ("release-group", [MBID1, MBID2], MBID1, "a"),
+        ("release-group", [MBID3, "4"], MBID3, "b"),
+    ], "Merges were not made with the URL form of the entity type"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
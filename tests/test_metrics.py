@@ -0,0 +1,40 @@
+# Tests how requests and edits are grouped in the metrics
+
+from musicbrainz_bot.metrics import Metrics, endpoint, outcome
+import pytest
+
+MBID = "0ab3c5d7-0000-4000-8000-00000000000f"
+
+
+def test_endpoint():
+    assert endpoint("https://mb.org/ws/2/area/%s?fmt=json" % MBID) == (
+        "/ws/2/area/<id>"
+    ), "Web service version was replaced"
+    assert endpoint("https://mb.org/area/%s/edit" % MBID.upper()) == (
+        "/area/<id>/edit"
+    ), "Uppercase MBID was not replaced"
+    assert endpoint("https://mb.org/artist/%s/credit/3/edit" % MBID) == (
+        "/artist/<id>/credit/<id>/edit"
+    ), "Artist credit ID was not replaced"
+    assert endpoint("https://mb.org/edit/123/cancel") == (
+        "/edit/<id>/cancel"
+    ), "Edit ID was not replaced"
+    assert endpoint("https://mb.org/release/add") == "/release/add"
+    assert endpoint("https://mb.org") == "/"
+
+
+def test_outcomes():
+    assert outcome(MBID) == "changed", "MBID is not a change"
+    assert outcome(None) == "noop" and outcome(False) == "noop"
+    assert outcome([False, True]) == "changed" and outcome([]) == "noop"
+
+    metrics = Metrics()
+    metrics.observe_request("GET", "https://mb.org/area/%s" % MBID, 0.2, 200)
+    metrics.observe_request("GET", "https://mb.org/area/%s" % MBID.upper(), 0.2, 503)
+    (request,) = metrics.snapshot()["requests"]
+    assert request["count"] == 2, "Requests to one page were not grouped"
+    assert request["status"] == {"200": 1, "503": 1}, "Statuses are incorrect"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
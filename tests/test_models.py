@@ -0,0 +1,76 @@
+# Tests the compact input records against the dicts they replace
+
+from musicbrainz_bot.editing import album_to_form, create_payload
+from musicbrainz_bot.models import Album, Area, Track, UrlRelationship
+import pytest
+
+ALBUM = {
+    "_id": "cdbaby:foo",
+    "artist": "Foo",
+    "title": "Bar",
+    "mediums": [
+        {
+            "format": "CD",
+            "position": 1,
+            "tracks": [
+                {"position": 1, "title": "One", "length": 61},
+                {"position": 2, "title": "Two", "length": 125},
+            ],
+        }
+    ],
+    "date": "2001-02-03",
+    "barcode": "0123456789012",
+}
+
+AREA = {
+    "name": "Foo",
+    "type_id": 3,
+    "iso_3166_1": ["FO"],
+    "url": [{"text": "https://www.wikidata.org/wiki/Q152", "link_type_id": 358}],
+}
+
+
+def test_item_access():
+    album = Album.from_dict(ALBUM)
+    assert album["_id"] == "cdbaby:foo", "Aliased key is incorrect"
+    assert album.id == "cdbaby:foo", "Aliased attribute is incorrect"
+    assert album["mediums"][0]["tracks"][1]["title"] == "Two", "Nested item"
+    assert "_id" in album.keys() and "id" not in album.keys(), "Keys incorrect"
+    with pytest.raises(KeyError):
+        album["no_such_key"]
+    with pytest.raises(KeyError):
+        album["__slots__"]
+
+
+def test_get():
+    album = Album.from_dict(ALBUM)
+    assert album.get("title") == "Bar", "Present value is incorrect"
+    assert album.get("no_such_key", "x") == "x", "Unknown key default incorrect"
+    # a missing optional key is stored as None, and gets the default
+    assert album.get("label") is None, "Missing value is incorrect"
+    assert album.get("label", "x") == "x", "Missing value default incorrect"
+    assert album.get("label", "x") == dict(ALBUM).get("label", "x"), "Not a dict"
+
+
+def test_round_trip():
+    album = Album.from_dict(ALBUM)
+    assert Album.from_dict(album.to_dict()) == album, "Album did not round-trip"
+    area = Area.from_dict(AREA)
+    assert area.to_dict()["url"] == AREA["url"], "Nested records not converted"
+    assert area == Area.from_dict(AREA), "Equal records differ"
+    assert area != Area.from_dict(dict(AREA, name="Bar")), "Different records equal"
+    assert Track(1, "One", 61) != UrlRelationship("One", 61), "Types not compared"
+    assert repr(Track(1, "One", 61)) == "Track(position=1, title='One', length=61)"
+
+
+def test_serialized_like_dicts():
+    assert album_to_form(Album.from_dict(ALBUM)) == album_to_form(
+        ALBUM
+    ), "Album form differs from the dict's"
+    assert create_payload(Area.from_dict(AREA), "edit-area", ["name"]) == (
+        create_payload(AREA, "edit-area", ["name"])
+    ), "Area payload differs from the dict's"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,68 @@
+# Tests the form payload helpers used by the edit methods
+
+from musicbrainz_bot.models import UrlRelationship
+from musicbrainz_bot.payload import added_items, changed_fields, iter_payload
+import pytest
+
+
+def test_iter_payload():
+    template = {
+        "name": "Foo",
+        "type_id": 3,
+        "comment": None,
+        "iso_3166_1": ("FO", "BA"),
+        "url": [{"text": "https://example.org", "link_type_id": 358}],
+    }
+    assert list(iter_payload(template, "edit-area")) == [
+        ("edit-area.name", "Foo"),
+        ("edit-area.type_id", 3),
+        ("edit-area.iso_3166_1.0", "FO"),
+        ("edit-area.iso_3166_1.1", "BA"),
+        ("edit-area.url.0.text", "https://example.org"),
+        ("edit-area.url.0.link_type_id", 358),
+    ], "Payload is incorrect"
+
+
+def test_iter_payload_subclasses():
+    class Codes(list):
+        pass
+
+    template = {"iso_3166_1": Codes(["FO"])}
+    assert list(iter_payload(template, "edit-area")) == [
+        ("edit-area.iso_3166_1.0", "FO")
+    ], "List subclass was not expanded"
+
+
+def test_iter_payload_required():
+    with pytest.raises(Exception, match="Missing required field: edit-area.name"):
+        list(iter_payload({"name": None}, "edit-area", ("name",)))
+
+
+def test_changed_fields():
+    current = {"name": "Foo", "type_id": "3", "iso_3166_1": ["FO", "BA"]}
+    update = {"name": "Foo", "type_id": 3, "iso_3166_1": ["BA", "FO"]}
+    assert changed_fields(current, update) == {}, "Unchanged fields reported"
+
+    update = {"name": "Bar", "comment": "c", "iso_3166_1": ["FO"]}
+    assert changed_fields(current, update) == update, "Changed fields missed"
+
+
+def test_changed_fields_mixed_types():
+    current = {"codes": ["FO", None, ["x"]]}
+    assert changed_fields(current, {"codes": [None, ["x"], "FO"]}) == {}
+    assert changed_fields(current, {"codes": [None, "FO"]}) == {
+        "codes": [None, "FO"]
+    }, "Mixed lists compared incorrectly"
+
+
+def test_added_items():
+    current = [{"text": "https://example.org/a", "link_type_id": "358"}]
+    desired = [
+        UrlRelationship(text="https://example.org/a", link_type_id=358),
+        {"text": "https://example.org/b", "link_type_id": 358},
+    ]
+    assert added_items(current, desired) == desired[1:], "Added items incorrect"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
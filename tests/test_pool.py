@@ -0,0 +1,86 @@
+# Tests MusicBrainzClientPool against the fake server of the benchmarks
+
+import threading
+import time
+
+from musicbrainz_bot.pool import MusicBrainzClientPool
+from musicbrainz_bot.ratelimit import RateLimiter
+from musicbrainz_bot.retry import RetryPolicy
+import pytest
+
+
+def pool(server, password=None, **kwargs):
+    return MusicBrainzClientPool(
+        server.username,
+        password or server.password,
+        server.url,
+        rate_limiter=RateLimiter(1e6, 1000),
+        retry=RetryPolicy(backoff=0.001, circuit_breaker=False),
+        **kwargs
+    )
+
+
+def logins(pool):
+    return sum(
+        request["count"]
+        for request in pool.metrics.snapshot()["requests"]
+        if (request["method"], request["endpoint"]) == ("POST", "/login")
+    )
+
+
+def test_logins(fake_server, tmp_path):
+    with pool(fake_server, size=3) as separate:
+        assert logins(separate) == 3, "Every client did not log in"
+        assert not separate.shares_session, "Session is shared without cookies"
+
+    with pool(fake_server, size=4, cookie_dir=str(tmp_path)) as shared:
+        assert logins(shared) == 1, "Shared session was logged in more than once"
+        assert shared.shares_session, "Session is not shared"
+    with pool(fake_server, size=2, cookie_dir=str(tmp_path)) as resumed:
+        assert logins(resumed) == 0, "Cached session was not resumed"
+
+
+def test_failed_login(fake_server):
+    with pytest.raises(Exception, match="unable to login"):
+        pool(fake_server, password="wrong", size=2)
+
+
+def test_one_call_per_client(fake_server):
+    lock = threading.Lock()
+    busy = set()
+    used = set()
+
+    def call(client, n):
+        with lock:
+            assert client not in busy, "Client was used by two threads at once"
+            busy.add(client)
+            used.add(client)
+        time.sleep(0.01)
+        with lock:
+            busy.remove(client)
+        return n, client.rate_limiter, client.metrics
+
+    with pool(fake_server, size=3) as clients:
+        futures = clients.submit_many((call, (n,), {}) for n in range(12))
+        results = [future.result() for future in futures]
+    assert [n for n, _, _ in results] == list(range(12)), "Results out of order"
+    assert len(used) == 3, "Calls were not spread over the clients"
+    assert all(
+        rate_limiter is clients.rate_limiter and metrics is clients.metrics
+        for _, rate_limiter, metrics in results
+    ), "Clients do not share the rate limiter and metrics"
+
+
+def test_submit(fake_server):
+    gid = fake_server.add_entity("artist", name="Artist")
+    with pool(fake_server, size=2) as clients:
+        (future,) = clients.submit_many(
+            [{"method": "get_entity", "args": ("artist", gid)}]
+        )
+        assert future.result()["name"] == "Artist", "Method was not called"
+        with pytest.raises(AttributeError):
+            clients.submit("no_such_method")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
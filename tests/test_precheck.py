@@ -0,0 +1,167 @@
+# Tests the no-op checks MirrorPrecheck makes on mirror rows, and its row cache
+
+import collections
+
+from musicbrainz_bot.precheck import QUERIES, MirrorPrecheck
+import pytest
+
+MBID1 = "00000000-0000-0000-0000-000000000001"
+MBID2 = "00000000-0000-0000-0000-000000000002"
+MBID3 = "00000000-0000-0000-0000-000000000003"
+
+Column = collections.namedtuple("Column", "name")
+
+
+class Cursor(object):
+    # answers the QUERIES from `tables`, {entity type: {gid: row dict}}
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def execute(self, query, params):
+        entity_type = next(k for k, v in QUERIES.items() if v == query)
+        (gids,) = params
+        self.conn.queries.append((entity_type, list(gids)))
+        table = self.conn.tables.get(entity_type, {})
+        rows = [dict(table[gid], gid=gid) for gid in gids if gid in table]
+        columns = ["gid"] + sorted(set().union(*rows) - {"gid"}) if rows else ["gid"]
+        self.description = [Column(column) for column in columns]
+        self._rows = [tuple(row[column] for column in columns) for row in rows]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def close(self):
+        pass
+
+
+class Connection(object):
+    closed = False
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+
+    def cursor(self):
+        return Cursor(self)
+
+
+def precheck(tables, **kwargs):
+    precheck = MirrorPrecheck("", **kwargs)
+    precheck._conn = Connection(tables)
+    return precheck
+
+
+ARTIST = {
+    "area": None,
+    "type": 1,
+    "gender": None,
+    "begin_date_year": 1970,
+    "end_date_year": None,
+    "comment": "",
+}
+
+
+def test_artist_is_noop():
+    check = precheck({"artist": {MBID1: ARTIST}})
+    artist = {"gid": MBID1}
+    assert check.artist_is_noop(artist, ["type"]), "Set type not a no-op"
+    assert not check.artist_is_noop(artist, ["area"]), "Unset area is a no-op"
+    assert check.artist_is_noop(artist, ["area", "begin_date"]), "Any set item"
+    assert not check.artist_is_noop(
+        artist, ["area", "begin_date"], partial=True
+    ), "With partial, an unset item is not a no-op"
+    assert not check.artist_is_noop(artist, ["comment"]), "Empty comment is set"
+    assert not check.artist_is_noop(artist, ["name"]), "Unknown item is a no-op"
+    assert not check.artist_is_noop({"gid": MBID2}, ["type"]), "Missing artist"
+    assert check.artist_type_is_noop(MBID1), "Set type not a no-op"
+
+
+def test_work_is_noop():
+    check = precheck(
+        {
+            "work": {
+                MBID1: {"type": None, "comment": "", "language": True},
+                MBID2: {"type": None, "comment": "", "language": False},
+            }
+        }
+    )
+    assert check.work_is_noop({"gid": MBID1}, ["language"]), "Language set"
+    assert not check.work_is_noop({"gid": MBID2}, ["language"]), "No language"
+
+
+def test_url_is_noop():
+    check = precheck({"url": {MBID1: {"url": "http://example.com/new"}}})
+    assert (
+        check.url_is_noop(MBID1, "http://example.com/new", "http://example.com/newer")
+        is False
+    ), "Unchanged URL is a no-op"
+    assert check.url_is_noop(
+        MBID1, "http://example.com/old", "http://example.com/newer"
+    ), "URL changed since is not a no-op"
+    assert check.url_is_noop(
+        MBID1, "http://example.com/old", "http://example.com/new"
+    ), "URL already set is not a no-op"
+    assert not check.url_is_noop(MBID2, "a", "b"), "Missing URL is a no-op"
+
+
+def test_release_is_noop():
+    row = {"script": 28, "language": None, "packaging": None}
+    check = precheck({"release": {MBID1: row}})
+    assert check.release_is_noop(MBID1, {"script_id": (None, ["28"])}), "Same"
+    assert not check.release_is_noop(
+        MBID1, {"language_id": ([""], ["120"])}
+    ), "Change is a no-op"
+    assert check.release_is_noop(
+        MBID1, {"script_id": (["12"], ["28"])}
+    ), "Old value differing is not a no-op"
+    assert not check.release_is_noop(
+        MBID1, {"status_id": (None, ["1"])}
+    ), "Unknown attribute is a no-op"
+
+
+def test_prefetch():
+    check = precheck({"artist": {MBID1: ARTIST, MBID2: ARTIST}}, chunk_size=2)
+    conn = check._conn
+    check.prefetch_calls(
+        [
+            ("edit_artist", ({"gid": MBID1},), {}),
+            ("set_artist_type", (MBID2,), {}),
+            ("edit_artist", ({"gid": MBID3},), {}),
+            ("add_url", ("x",), {}),
+        ]
+    )
+    assert conn.queries == [
+        ("artist", [MBID1, MBID2]),
+        ("artist", [MBID3]),
+    ], "Entities were not prefetched in chunks"
+    assert check.artist_type_is_noop(MBID2), "Prefetched row is wrong"
+    assert check.get("artist", MBID3) is None, "Missing entity has a row"
+    assert len(conn.queries) == 2, "Prefetched entities were queried again"
+
+    check.invalidate("artist", MBID1)
+    check.get("artist", MBID1)
+    assert conn.queries[2:] == [("artist", [MBID1])], "Invalidated row was kept"
+
+
+def test_maxsize():
+    check = precheck({"artist": {MBID1: ARTIST, MBID2: ARTIST}}, maxsize=2)
+    conn = check._conn
+    check.prefetch("artist", [MBID1, MBID2])
+    check.get("artist", MBID1)
+    check.get("artist", MBID3)
+    assert len(check._rows) == 2, "Cache grew beyond maxsize"
+    check.get("artist", MBID1)
+    assert len(conn.queries) == 2, "Recently used row was evicted"
+    check.get("artist", MBID2)
+    assert conn.queries[2:] == [("artist", [MBID2])], "Oldest row was kept"
+
+    # a batch larger than the cache is still checked with the rows read
+    check = precheck({"artist": {MBID1: ARTIST, MBID2: ARTIST}}, maxsize=1)
+    check.prefetch("artist", [MBID1, MBID2])
+    assert check.artist_type_is_noop(MBID1), "Evicted row was not read again"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
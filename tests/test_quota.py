@@ -0,0 +1,78 @@
+# Tests the local accounting of the edit quota between scrapes
+
+from musicbrainz_bot.quota import EditQuota
+import pytest
+
+
+class Client(object):
+    # stands in for a MusicBrainzClient, counting the edit searches
+    editor_id = 1
+
+    def __init__(self, today=900, globally=1500):
+        self.today = today
+        self.globally = globally
+        self.scrapes = 0
+
+    def edits_left_today(self, max_edits=1000, unknown=0):
+        self.scrapes += 1
+        return unknown if self.today is None else self.today
+
+    def edits_left_globally(self, max_edits=2000, unknown=0):
+        return unknown if self.globally is None else self.globally
+
+
+def test_local_accounting(clock):
+    client = Client()
+    quota = EditQuota(reconcile_interval=3600)
+    assert quota.left(client) == 900, "Quota was not seeded"
+    quota.record(10)
+    quota.record()
+    assert quota.left(client) == 889, "Edits were not counted"
+    assert client.scrapes == 1, "Quota was scraped before the interval"
+
+    clock.sleep(3600)
+    client.today = 850
+    assert quota.left(client) == 850, "Quota was not reconciled"
+    assert client.scrapes == 2, "Quota was not scraped after the interval"
+
+
+def test_near_limit(clock):
+    client = Client(today=60)
+    quota = EditQuota(margin=50, near_limit_interval=60)
+    quota.left(client)
+    quota.record(20)
+    assert quota.left(client) == 40, "Edits were not counted"
+    clock.sleep(59)
+    quota.left(client)
+    assert client.scrapes == 1, "Quota was scraped too soon"
+    clock.sleep(1)
+    client.today = 45
+    assert quota.left(client) == 45, "Quota was not reconciled near the limit"
+
+
+def test_failed_scrape(clock):
+    client = Client(today=None)
+    quota = EditQuota(near_limit_interval=60)
+    assert quota.left(client) == 0, "Unknown quota was not taken as spent"
+    clock.sleep(60)
+    client.today = 900
+    assert quota.left(client) == 900, "Failed scrape was not retried"
+
+    # a later failure keeps the last estimate
+    quota.record(100)
+    clock.sleep(3600)
+    client.today = None
+    assert quota.left(client) == 800, "Last estimate was not kept"
+    assert client.scrapes == 3, "Quota was not scraped"
+
+
+def test_no_editor_id():
+    client = Client()
+    client.editor_id = None
+    with pytest.raises(Exception, match="editor_id"):
+        EditQuota().left(client)
+    assert client.scrapes == 0, "Quota was scraped without an editor ID"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,126 @@
+# Tests the token buckets that space out requests, on a fake clock
+
+import os
+import subprocess
+import sys
+import time
+
+from musicbrainz_bot.ratelimit import (
+    RateLimiter,
+    SharedRateLimiter,
+    TokenBucket,
+    parse_retry_after,
+)
+import pytest
+
+URL = "https://musicbrainz.org/ws/2/artist"
+OTHER_URL = "https://coverartarchive.org/release"
+
+
+def acquire_times(clock, acquire, n):
+    times = []
+    for _ in range(n):
+        acquire()
+        times.append(clock.now - 1000)
+    return pytest.approx(times)
+
+
+def test_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    times = acquire_times(clock, bucket.acquire, 5)
+    assert times == [0, 0, 0, 0.5, 1.0], "Burst or rate was not honoured"
+
+
+def test_refill(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    acquire_times(clock, bucket.acquire, 2)
+    clock.sleep(1.5)
+    times = acquire_times(clock, bucket.acquire, 2)
+    assert times == [1.5, 2.0], "Bucket was not refilled at the rate"
+
+    clock.sleep(60)
+    times = acquire_times(clock, bucket.acquire, 3)
+    assert times == [62, 62, 63], "Bucket was refilled beyond the burst"
+
+
+def test_pause(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    bucket.pause(10)
+    bucket.pause(5)
+    times = acquire_times(clock, bucket.acquire, 2)
+    assert times == [11, 12], "Pause was not honoured with an empty bucket"
+
+
+def test_rate_limiter_hosts(clock):
+    limiter = RateLimiter(rate=1, burst=1, hosts={"coverartarchive.org": (10, 1)})
+    assert limiter.bucket(URL) is limiter.bucket(URL + "/x"), "Bucket not per host"
+    times = acquire_times(clock, lambda: limiter.acquire(OTHER_URL), 3)
+    assert times == [0, 0.1, 0.2], "Host override was not used"
+    limiter.defer(URL, 30)
+    times = acquire_times(clock, lambda: limiter.acquire(URL), 1)
+    assert times == [31.2], "Retry-After was not honoured"
+    assert acquire_times(clock, lambda: limiter.acquire(OTHER_URL), 1) == [
+        31.2
+    ], "Retry-After delayed another host"
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(" 120 ") == 120, "Delay was not parsed"
+    assert parse_retry_after("soon") is None, "Invalid value was parsed"
+    assert parse_retry_after(None) is None, "Missing header was parsed"
+    assert (
+        parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    ), "Past date is not now"
+
+
+def test_shared_burst(clock, tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite3")
+    # two limiters on one file stand in for two bot processes
+    first = SharedRateLimiter(path, rate=2, burst=3)
+    second = SharedRateLimiter(path, rate=2, burst=3)
+    times = acquire_times(clock, lambda: first.acquire(URL), 2)
+    assert times == [0, 0], "Burst was not honoured"
+    times = acquire_times(clock, lambda: second.acquire(URL), 3)
+    assert times == [0, 0.5, 1.0], "Budget was not shared"
+
+    clock.sleep(1.5)
+    times = acquire_times(clock, lambda: first.acquire(URL), 4)
+    assert times == [2.5, 2.5, 2.5, 3.0], "Bucket was not refilled at the rate"
+
+
+def test_shared_defer(clock, tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite3")
+    first = SharedRateLimiter(path, hosts={"coverartarchive.org": (4, 1)})
+    second = SharedRateLimiter(path, hosts={"coverartarchive.org": (4, 1)})
+    first.defer(URL, 30)
+    times = acquire_times(clock, lambda: second.acquire(URL), 1)
+    assert times == [31], "Retry-After was not shared"
+    times = acquire_times(clock, lambda: second.acquire(OTHER_URL), 2)
+    assert times == [31, 31.25], "Retry-After delayed another host"
+
+
+def test_shared_across_processes(tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite3")
+    # at this rate, a token taken by the child is not given back in the test
+    code = (
+        "from musicbrainz_bot.ratelimit import SharedRateLimiter\n"
+        "limiter = SharedRateLimiter(%r, rate=0.001, burst=2)\n"
+        "limiter.acquire(%r)\n"
+        "limiter.acquire(%r)\n" % (path, URL, URL)
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        timeout=60,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    limiter = SharedRateLimiter(path, rate=0.001, burst=2)
+    with limiter._transaction() as db:
+        rate, tokens, updated, paused_until = limiter._load(
+            db, "musicbrainz.org", time.time()
+        )
+    assert tokens < 1, "Tokens taken by another process were not shared"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
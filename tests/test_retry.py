@@ -0,0 +1,107 @@
+# Tests when requests are sent again, and the circuit breaker that pauses
+# them while the server keeps failing
+
+import socket
+import urllib.error
+
+from benchmarks.fake_server import FakeMusicBrainz
+from musicbrainz_bot.editing import MusicBrainzClient
+from musicbrainz_bot.ratelimit import RateLimiter
+from musicbrainz_bot.retry import CircuitBreaker, RetryPolicy
+import pytest
+import requests
+
+URL = "https://musicbrainz.org/artist/00000000-0000-0000-0000-000000000001"
+
+
+def test_retryable():
+    policy = RetryPolicy(attempts=3, circuit_breaker=False)
+    assert policy.retryable("GET", 0, status=500), "GET not retried on 500"
+    assert policy.retryable("GET", 1, status=503), "GET not retried on 503"
+    assert not policy.retryable("GET", 2, status=503), "Attempts not limited"
+    assert not policy.retryable("GET", 0, status=404), "GET retried on 404"
+    assert policy.retryable("GET", 0, error=requests.ReadTimeout()), "Timeout"
+
+    # a POST may have made its edit, unless it was turned away
+    assert policy.retryable("POST", 0, status=503), "Rejected POST not retried"
+    assert policy.retryable("POST", 0, status=429), "Rejected POST not retried"
+    assert not policy.retryable("POST", 0, status=500), "Failed POST retried"
+    assert not policy.retryable("POST", 0, status=502), "Failed POST retried"
+    assert not policy.retryable(
+        "POST", 0, error=requests.ReadTimeout()
+    ), "POST retried after it was sent"
+    refused = urllib.error.URLError(ConnectionRefusedError())
+    assert policy.retryable("POST", 0, error=refused), "Unsent POST not retried"
+    unresolved = urllib.error.URLError(socket.gaierror())
+    assert policy.retryable("POST", 0, error=unresolved), "Unsent POST not retried"
+    assert not policy.retryable("POST", 2, error=refused), "Attempts not limited"
+
+
+def test_delay():
+    policy = RetryPolicy(backoff=1.0, max_backoff=5.0, circuit_breaker=False)
+    for attempt, bound in [(0, 1.0), (1, 2.0), (2, 4.0), (3, 5.0), (10, 5.0)]:
+        for _ in range(20):
+            assert 0 <= policy.delay(attempt) <= bound, "Backoff out of bounds"
+
+
+def test_circuit_breaker(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10.0, max_cooldown=25.0)
+    for _ in range(2):
+        breaker.failure()
+    start = clock.now
+    breaker.wait()
+    assert clock.now == start, "Circuit opened before the threshold"
+
+    breaker.failure()
+    breaker.wait()
+    assert clock.now == start + 10, "Circuit did not open"
+    # the first failure after a cooldown opens it again, for longer
+    breaker.failure()
+    breaker.wait()
+    assert clock.now == start + 30, "Cooldown did not double"
+    breaker.failure()
+    breaker.wait()
+    assert clock.now == start + 55, "Cooldown is not bounded"
+
+    breaker.success()
+    start = clock.now
+    for _ in range(2):
+        breaker.failure()
+    breaker.wait()
+    assert clock.now == start, "Success did not reset the circuit"
+    breaker.failure()
+    breaker.wait()
+    assert clock.now == start + 10, "Cooldown was not reset"
+
+
+def test_circuit_breaker_ignores_requests_in_flight(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10.0)
+    breaker.failure()
+    # requests sent before the circuit opened fail while it is open
+    breaker.failure()
+    breaker.failure()
+    start = clock.now
+    breaker.wait()
+    assert clock.now == start + 10, "Failures in flight extended the cooldown"
+
+
+def test_handled_post_not_failed():
+    # with a page load failing now and then, every edit the server made is
+    # reported, and none twice
+    with FakeMusicBrainz(error_rate=0.3, seed=1) as server:
+        mb = MusicBrainzClient(
+            server.username,
+            server.password,
+            server.url,
+            rate_limiter=RateLimiter(1e6, 1000),
+            retry=RetryPolicy(attempts=20, backoff=0.001, circuit_breaker=False),
+        )
+        mbids = [
+            mb.add_artist({"name": "a%d" % i, "sort_name": "a"}, "") for i in range(30)
+        ]
+        assert sorted(mbids) == sorted(server.entities["artist"]), "Edits lost"
+        assert len(server.edits) == 30, "Edits were made twice"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,110 @@
+# A simple test script to run a JSON Lines batch of edits
+
+import json
+
+import musicbrainz_bot.config as cfg
+import musicbrainz_bot.run as run
+import pytest
+
+
+def _run(jobs_path, editor, cookie_dir, *args):
+    return run.main(
+        [
+            str(jobs_path),
+            "--server",
+            cfg.MB_SITE,
+            "--username",
+            editor["username"],
+            "--password",
+            editor["password"],
+            "--cookie-dir",
+            cookie_dir,
+            "--use-test-db",
+            *args,
+        ]
+    )
+
+
+def test_run(tmp_path, editor, namespace, cookie_dir, restore_db):
+    jobs_path = tmp_path / "jobs.jsonl"
+    jobs = [
+        {
+            "id": "area",
+            "method": "add_area",
+            "args": [{"name": namespace + "test_area_run", "type_id": "3"}],
+            "kwargs": {"edit_note": "Tests the JSON Lines runner."},
+        },
+        {"id": "bad", "method": "no_such_method"},
+    ]
+    jobs_path.write_text(
+        "".join(json.dumps(job) + "\n" for job in jobs) + "{not json\n"
+    )
+
+    try:
+        metrics_path = tmp_path / "metrics.json"
+        assert (
+            _run(jobs_path, editor, cookie_dir, "--metrics", str(metrics_path)) == 1
+        ), "Failed job was not reported"
+
+        journal_path = tmp_path / "jobs.jsonl.journal"
+        entries = {
+            entry["id"]: entry
+            for entry in map(json.loads, journal_path.read_text().splitlines())
+        }
+        assert entries["area"]["status"] == "changed", "Area was not added"
+        assert len(entries["area"]["result"]) == 36, "Area MBID is incorrect"
+        assert entries["bad"]["status"] == "error", "Bad job did not fail"
+        assert (
+            entries["line:3"]["status"] == "error"
+        ), "Malformed line was not journaled"
+
+        metrics = json.loads(metrics_path.read_text())
+        edits = {entry["method"]: entry for entry in metrics["edits"]}
+        assert edits["add_area"]["outcome"] == {
+            "changed": 1
+        }, "Area edit was not counted"
+        assert any(
+            entry["method"] == "POST" and entry["endpoint"] == "/area/create"
+            for entry in metrics["requests"]
+        ), "Area request was not counted"
+
+        # a second run finds every job in the journal
+        journal_lines = len(journal_path.read_text().splitlines())
+        _run(jobs_path, editor, cookie_dir)
+        assert (
+            len(journal_path.read_text().splitlines()) == journal_lines
+        ), "Journaled jobs were run again"
+    except Exception as e:
+        pytest.fail(str(e))
+
+
+def test_journal_retry_errors(tmp_path):
+    journal_path = tmp_path / "jobs.jsonl.journal"
+    entries = [
+        {"id": "ok", "status": "started"},
+        {"id": "ok", "status": "changed"},
+        {"id": "failed", "status": "started"},
+        {"id": "failed", "status": "error"},
+        {"id": "crashed", "status": "started"},
+        {"id": "retried", "status": "started"},
+        {"id": "retried", "status": "error"},
+        {"id": "retried", "status": "started"},
+    ]
+    journal_path.write_text(
+        "".join(json.dumps(entry) + "\n" for entry in entries) + '{"id": "cut'
+    )
+
+    journal = run.Journal(str(journal_path))
+    assert journal.done == {"ok", "failed"}, "Finished jobs are incorrect"
+    assert journal.interrupted == {"crashed", "retried"}, "Interrupted jobs"
+    journal.close()
+
+    journal = run.Journal(str(journal_path), retry_errors=True)
+    assert "failed" not in journal, "Failed job is not run again"
+    assert "ok" in journal, "Finished job is run again"
+    assert journal.interrupted == {"crashed", "retried"}, "Interrupted jobs"
+    journal.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
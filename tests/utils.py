@@ -1,5 +1,7 @@
 import musicbrainz_bot.config as cfg
+import psycopg2 as pg
 import requests
+from psycopg2 import sql
 
 
 """
@@ -17,6 +19,15 @@ def get_db_URI():
     return MB_DB
 
 
+def get_maintenance_db_URI():
+    """
+    Returns the URI of the server's `postgres` database, from which the test
+    database can be dropped and cloned.
+    """
+    MB_MAINTENANCE_DB = f"postgresql://{cfg.TEST_DB_USERNAME}:{cfg.TEST_DB_PASSWD}@{cfg.TEST_DB_HOST}:{cfg.TEST_DB_PORT}/postgres"
+    return MB_MAINTENANCE_DB
+
+
 def _get_free_editor_id(db_conn):
     """
     Returns the lowest editor ID that is not currently in use.
@@ -75,15 +86,15 @@ def delete_user(
     try:
         cur = db_conn.cursor()
         del_query = """
-        DELETE from edit_area where edit = ANY (SELECT edit FROM edit where editor = 1000);
-        DELETE from edit_data where edit = ANY (SELECT edit FROM edit where editor = 1000);
-        DELETE from edit_note where edit = ANY (SELECT edit FROM edit where editor = 1000);
-        DELETE from edit_url where edit = ANY (SELECT edit FROM edit where editor = 1000);
-        DELETE FROM edit where editor = 1000;
-        DELETE FROM editor where ID = 1000;
+        DELETE from edit_area where edit = ANY (SELECT id FROM edit where editor = %(id)s);
+        DELETE from edit_data where edit = ANY (SELECT id FROM edit where editor = %(id)s);
+        DELETE from edit_note where edit = ANY (SELECT id FROM edit where editor = %(id)s);
+        DELETE from edit_url where edit = ANY (SELECT id FROM edit where editor = %(id)s);
+        DELETE FROM edit where editor = %(id)s;
+        DELETE FROM editor where ID = %(id)s;
         """
 
-        cur.execute(del_query)
+        cur.execute(del_query, {"id": id})
         cur.close()
 
     except Exception as e:
@@ -125,10 +136,146 @@ def delete_area(db_conn, area_name: str = "test_area"):
         raise (e)
 
 
-def reset_db(db_conn):
-    delete_user(db_conn, id=1000)
-    delete_area(db_conn, area_name="test_area")
-    delete_area(db_conn, area_name="test_area_edit_edited")
+def delete_areas(db_conn, name_prefix: str = "test_area"):
+    """
+    Deletes every area on the database whose name starts with the given prefix.
+    """
+    pattern = (
+        name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    )
+
+    cur = db_conn.cursor()
+    del_query = """
+    delete from iso_3166_1 where area = ANY (SELECT id FROM area where name LIKE %(pattern)s);
+    delete from iso_3166_2 where area = ANY (SELECT id FROM area where name LIKE %(pattern)s);
+    delete from iso_3166_3 where area = ANY (SELECT id FROM area where name LIKE %(pattern)s);
+    delete from l_area_url where entity0 = ANY (SELECT id FROM area where name LIKE %(pattern)s);
+    delete from area where name LIKE %(pattern)s;
+    """
+    cur.execute(del_query, {"pattern": pattern})
+    cur.close()
+
+
+def worker_namespace(worker: str = "") -> str:
+    """
+    Returns the prefix of the names of the entities created by the given
+    pytest-xdist worker ("gw0", "gw1", ...; "" without xdist).
+    """
+    return f"{worker}_" if worker else ""
+
+
+def worker_editor_id(worker: str = "") -> int:
+    """
+    Returns the ID of the editor of the given pytest-xdist worker: 1000 for
+    "" or "gw0", 1001 for "gw1" and so on. Unlike _get_free_editor_id(),
+    this needs no coordination between the workers.
+    """
+    return 1000 + int(worker[2:] or 0)
+
+
+def reset_db(db_conn, id: int = 1000, namespace: str = ""):
+    """
+    Deletes the given editor, with their edits, and the test areas in the
+    given namespace.
+    """
+    delete_user(db_conn, id=id)
+    delete_areas(db_conn, name_prefix=namespace + "test_area")
+
+
+def _terminate_connections(admin_conn, db_name: str):
+    """
+    Closes every other session on the given database (such as the
+    MusicBrainz server's, which reconnects on its next request), since a
+    database cannot be dropped or cloned while in use.
+    """
+    cur = admin_conn.cursor()
+    query = """
+    SELECT pg_terminate_backend(pid) FROM pg_stat_activity
+    WHERE datname = %s AND pid <> pg_backend_pid();"""
+    cur.execute(query, (db_name,))
+    cur.close()
+
+
+def snapshot_db(
+    admin_conn,
+    template_name: str,
+    db_name: str = cfg.TEST_DB_NAME,
+):
+    """
+    Copies the given database into the template database `template_name`,
+    replacing any earlier copy.
+    """
+    cur = admin_conn.cursor()
+    cur.execute(
+        sql.SQL("DROP DATABASE IF EXISTS {};").format(sql.Identifier(template_name))
+    )
+    _terminate_connections(admin_conn, db_name)
+    cur.execute(
+        sql.SQL("CREATE DATABASE {} TEMPLATE {};").format(
+            sql.Identifier(template_name), sql.Identifier(db_name)
+        )
+    )
+    cur.close()
+
+
+def restore_db(
+    admin_conn,
+    template_name: str,
+    db_name: str = cfg.TEST_DB_NAME,
+):
+    """
+    Replaces the given database with a fresh copy of the template database
+    `template_name`, undoing every change since snapshot_db().
+
+    Sequences keep their current values, so that no row ID is handed out
+    twice: the MusicBrainz server caches entities by ID. If the database
+    cannot be dropped, it is left as it is and the error is raised.
+    """
+    db_conn = pg.connect(get_test_db_URI())
+    cur = db_conn.cursor()
+    cur.execute(
+        "SELECT schemaname, sequencename, last_value FROM pg_sequences "
+        "WHERE last_value IS NOT NULL;"
+    )
+    sequences = cur.fetchall()
+    cur.close()
+    db_conn.close()
+
+    # the copy is made under a temporary name first, so that the database
+    # is only dropped once its replacement exists
+    copy_name = db_name + "_restore"
+    cur = admin_conn.cursor()
+    cur.execute(
+        sql.SQL("DROP DATABASE IF EXISTS {};").format(sql.Identifier(copy_name))
+    )
+    cur.execute(
+        sql.SQL("CREATE DATABASE {} TEMPLATE {};").format(
+            sql.Identifier(copy_name), sql.Identifier(template_name)
+        )
+    )
+    try:
+        _terminate_connections(admin_conn, db_name)
+        cur.execute(sql.SQL("DROP DATABASE {};").format(sql.Identifier(db_name)))
+    except Exception:
+        cur.execute(sql.SQL("DROP DATABASE {};").format(sql.Identifier(copy_name)))
+        raise
+    cur.execute(
+        sql.SQL("ALTER DATABASE {} RENAME TO {};").format(
+            sql.Identifier(copy_name), sql.Identifier(db_name)
+        )
+    )
+    cur.close()
+
+    if sequences:
+        db_conn = pg.connect(get_test_db_URI())
+        db_conn.autocommit = True
+        cur = db_conn.cursor()
+        query = """
+        SELECT setval(format('%%I.%%I', s, n)::regclass, v)
+        FROM unnest(%s::text[], %s::text[], %s::bigint[]) AS t(s, n, v);"""
+        cur.execute(query, [list(column) for column in zip(*sequences)])
+        cur.close()
+        db_conn.close()
 
 
 def get_entity_json(mbid: str, entity_type: str, payload: dict = {""}) -> dict: